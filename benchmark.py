@@ -0,0 +1,589 @@
+"""Mesure des performances de l'analyseur sur des captures synthétiques.
+generate_capture() écrit une sortie tcpdump -X réaliste (ARP, STP, diffusions UDP, DNS, ICMP,
+flux TCP, balayages de ports, SYN flood) de taille et de composition réglables ;
+run_benchmark() mesure chaque étape (décodage, statistiques, rapports) dans un processus neuf :
+débit en lignes/s et Mo/s, mémoire maximale (RSS). Les résultats s'ajoutent à un fichier
+JSON Lines pour suivre les régressions d'une version à l'autre."""
+
+import argparse
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from timestamps import format_us, parse_clock
+
+# Part des paquets de chaque scénario (poids relatifs) : requêtes ARP, BPDU STP, diffusions UDP,
+# DNS, ping, flux TCP complets, balayages de ports et SYN flood
+DEFAULT_MIX = {'arp': 6, 'stp': 2, 'broadcast': 6, 'dns': 8, 'icmp': 3, 'tcp': 70, 'scan': 3, 'flood': 2}
+# Paquets produits en moyenne par une occurrence de chaque scénario
+SCENARIO_PACKETS = {'arp': 1.3, 'stp': 1, 'broadcast': 1, 'dns': 2, 'icmp': 4, 'tcp': 30, 'scan': 165, 'flood': 900}
+DEFAULT_RESULTS = 'benchmark_results.jsonl'
+# Colonne ASCII de tcpdump -X : les octets non imprimables deviennent des points
+PRINTABLE = bytes(byte if 32 <= byte < 127 else 46 for byte in range(256))
+TCP_SERVICES = (('http', 80), ('https', 443), ('https', 443), ('ssh', 22), ('imaps', 993), ('smtp', 25),
+                ('http-alt', 8080), ('microsoft-ds', 445))
+BROADCAST_SERVICES = (('netbios-ns', 137, 50), ('gvcp', 3956, 8), ('ssdp', 1900, 133), ('mdns', 5353, 92),
+                      ('llmnr', 5355, 38), ('bootps', 67, 300))
+DOMAINS = ('univ-st-etienne.fr', 'lacampora.org', 'example.org', 'wikipedia.org', 'debian.org',
+           'ujmse.local', 'github.com', 'python.org')
+# BPDU Rapid STP relevé sur le réseau de DumpFile05.txt
+STP_FRAME = bytes.fromhex('00000202 3c808000 21d76e55 80000000 0c80804c 710cad79 80800e03 00140002 '
+                          '000f0000 00000002 0080')
+
+
+def hex_dump(data):
+    """Vidage hexadécimal au format tcpdump -X : offset, 8 groupes de 2 octets, colonne ASCII"""
+    text = data.hex()
+    ascii_column = data.translate(PRINTABLE).decode('ascii')
+    lines = []
+    for offset in range(0, len(data), 16):
+        digits = text[2 * offset:2 * offset + 32]
+        groups = ' '.join([digits[i:i + 4] for i in range(0, len(digits), 4)])
+        lines.append(f'\t0x{offset:04x}:  {groups:<39}  {ascii_column[offset:offset + 16]}\n')
+    return ''.join(lines)
+
+
+def parse_size(text):
+    """"500k", "100M", "2G" -> octets"""
+    units = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+    text = text.strip().lower().rstrip('bo')
+    try:
+        if text[-1:] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"taille invalide: {text} (exemple: 100M)")
+
+
+def parse_mix(text):
+    """"tcp=50,scan=2" -> poids des scénarios (les scénarios absents gardent leur poids par défaut)"""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"scénario inconnu: {name} ({', '.join(DEFAULT_MIX)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"poids invalide: {item} (exemple: tcp=50,scan=2)")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"poids invalide: {item}")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("au moins un scénario doit avoir un poids positif")
+    return mix
+
+
+class TrafficGenerator:
+    """
+    Produit les paquets d'un réseau local fictif : postes 10.0.1.0/24, serveurs 10.0.0.0/24
+    (certains affichés sous leur nom, comme le fait tcpdump), hôtes extérieurs quelconques.
+    Les conversations TCP, DNS et ICMP s'entremêlent (`concurrency` en cours au plus) ;
+    balayages et inondations sont émis d'un bloc, à un rythme bien plus élevé.
+    Chaque paquet est une ligne d'en-tête suivie, avec `dump`, de son vidage hexadécimal.
+    """
+
+    def __init__(self, mix=None, rate=1000, start_us=18 * 3600 * 1000000, seed=0, dump=True, concurrency=50):
+        self.random = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.scenarios = [name for name, weight in self.mix.items() if weight > 0]
+        # Un scénario est tiré en proportion de sa part des paquets, rapportée à sa longueur
+        self.weights = [self.mix[name] / SCENARIO_PACKETS[name] for name in self.scenarios]
+        self.gap_us = 1000000 / rate
+        self.clock = float(start_us)
+        self.dump = dump
+        self.concurrency = concurrency
+        self.active = []
+        self.ident = 0
+        self.clients = [f'10.0.1.{host}' for host in range(2, 230)]
+        self.servers = [f'10.0.0.{host}' for host in range(10, 40)]
+        # Noms affichés par tcpdump pour quelques serveurs (résolution inverse)
+        self.names = {self.servers[0]: 'srv-web.lan', self.servers[1]: 'srv-mail.lan',
+                      self.servers[2]: 'ns1.lan', self.servers[3]: 'BP-Linux8'}
+        self.dns_server = self.servers[2]
+        self.gateway = '10.0.1.1'
+
+    def _name(self, host):
+        return self.names.get(host, host)
+
+    def _external(self):
+        random_ = self.random
+        return f'{random_.randint(11, 223)}.{random_.randint(0, 255)}.{random_.randint(0, 255)}.{random_.randint(1, 254)}'
+
+    def _tick(self, factor=1.0):
+        self.clock += self.random.expovariate(1.0) * self.gap_us * factor
+        return format_us(int(self.clock))
+
+    def _ip_packet(self, src, dst, protocol, header, payload):
+        """Octets du paquet IP (en-tête IPv4 sans somme de contrôle, en-tête de transport, données)"""
+        self.ident = (self.ident + 1) & 0xffff
+        total = 20 + len(header) + len(payload)
+        ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, total, self.ident, 0x4000, 64, protocol, 0,
+                         bytes(map(int, src.split('.'))), bytes(map(int, dst.split('.'))))
+        return ip + header + payload
+
+    def _packet(self, line, data):
+        return line + '\n' + hex_dump(data) if self.dump else line + '\n'
+
+    # Scénarios : chaque générateur produit (ligne d'en-tête, octets du paquet) à la demande
+
+    def _arp(self):
+        asker, target = self.random.sample(self.clients + [self.gateway], 2)
+        body = struct.pack('!HHBBH6s4s6s4s', 1, 0x0800, 6, 4, 1, self.random.randbytes(6),
+                           bytes(map(int, asker.split('.'))), bytes(6), bytes(map(int, target.split('.'))))
+        yield f'ARP, Request who-has {self._name(target)} tell {self._name(asker)}, length 46', body + bytes(18)
+        if self.random.random() < 0.3:
+            mac = self.random.randbytes(6)
+            yield (f"ARP, Reply {self._name(target)} is-at {':'.join(f'{byte:02x}' for byte in mac)}, length 46",
+                   body + bytes(18))
+
+    def _stp(self):
+        yield 'STP 802.1w, Rapid STP, Flags [Learn, Forward], bridge-id 8080.4c:71:0c:ad:79:80.800e, length 42', \
+            STP_FRAME
+
+    def _broadcast(self):
+        source = self.random.choice(self.clients)
+        service, port, length = self.random.choice(BROADCAST_SERVICES)
+        target = 'broadcasthost' if port in (3956, 67) else '10.0.1.255'
+        sport = self.random.randint(1024, 65535)
+        payload = self.random.randbytes(length)
+        header = struct.pack('!HHHH', sport, port, 8 + length, 0)
+        yield (f'IP {source}.{sport} > {target}.{service}: UDP, length {length}',
+               self._ip_packet(source, '255.255.255.255', 17, header, payload))
+
+    def _dns(self):
+        client = self.random.choice(self.clients)
+        sport = self.random.randint(1024, 65535)
+        query_id = self.random.randint(1, 65535)
+        name = f'{self.random.choice(("www", "mail", "api", "cdn", "ftp"))}.{self.random.choice(DOMAINS)}'
+        question = b''.join(bytes([len(label)]) + label.encode() for label in name.split('.')) + b'\0\0\1\0\1'
+        query = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0) + question
+        yield (f'IP {client}.{sport} > {self._name(self.dns_server)}.domain: {query_id}+ A? {name}. ({len(query)})',
+               self._ip_packet(client, self.dns_server, 17, struct.pack('!HHHH', sport, 53, 8 + len(query), 0), query))
+        address = self._external()
+        answer = (struct.pack('!HHHHHH', query_id, 0x8180, 1, 1, 0, 0) + question
+                  + struct.pack('!HHHIH', 0xc00c, 1, 1, 300, 4) + bytes(map(int, address.split('.'))))
+        yield (f'IP {self._name(self.dns_server)}.domain > {client}.{sport}: {query_id} 1/0/0 A {address} ({len(answer)})',
+               self._ip_packet(self.dns_server, client, 17, struct.pack('!HHHH', 53, sport, 8 + len(answer), 0), answer))
+
+    def _icmp(self):
+        client = self.random.choice(self.clients)
+        target = self.random.choice(self.servers + [self.gateway])
+        ident = self.random.randint(1, 65535)
+        for sequence in range(1, self.random.randint(2, 5)):
+            payload = bytes(range(8, 64))
+            request = struct.pack('!BBHHH', 8, 0, 0, ident, sequence) + payload
+            yield (f'IP {client} > {self._name(target)}: ICMP echo request, id {ident}, seq {sequence}, length 64',
+                   self._ip_packet(client, target, 1, request, b''))
+            yield (f'IP {self._name(target)} > {client}: ICMP echo reply, id {ident}, seq {sequence}, length 64',
+                   self._ip_packet(target, client, 1, b'\0' + request[1:], b''))
+
+    def _tcp_segment(self, src, sport, dst, dport, flags, seq, ack, payload):
+        bits = sum(bit for flag, bit in (('F', 1), ('S', 2), ('R', 4), ('P', 8), ('.', 16)) if flag in flags)
+        header = (struct.pack('!HHIIBBHHH', sport, dport, seq & 0xffffffff, ack & 0xffffffff, 0x80, bits, 502, 0, 0)
+                  + b'\x01\x01\x08\x0a' + self.random.randbytes(8))
+        return self._ip_packet(src, dst, 6, header, payload)
+
+    def _tcp(self):
+        random_ = self.random
+        client, sport = random_.choice(self.clients), random_.randint(1024, 65535)
+        if random_.random() < 0.7:
+            server = random_.choice(self.servers)
+        else:
+            server = self._external()
+        service, port = random_.choice(TCP_SERVICES)
+        source, target = f'{client}.{sport}', f'{self._name(server)}.{service}'
+        client_isn, server_isn = random_.getrandbits(32), random_.getrandbits(32)
+        timestamp = random_.getrandbits(30)
+        options = f'options [nop,nop,TS val {timestamp} ecr 0]'
+
+        yield (f'IP {source} > {target}: Flags [S], seq {client_isn}, win 64240, {options}, length 0',
+               self._tcp_segment(client, sport, server, port, 'S', client_isn, 0, b''))
+        if random_.random() < 0.05:
+            # Port fermé ou filtré : refus du serveur
+            yield (f'IP {target} > {source}: Flags [R.], seq 0, ack {client_isn + 1}, win 0, length 0',
+                   self._tcp_segment(server, port, client, sport, 'R.', 0, client_isn + 1, b''))
+            return
+        yield (f'IP {target} > {source}: Flags [S.], seq {server_isn}, ack {client_isn + 1}, win 65160, {options}, '
+               f'length 0', self._tcp_segment(server, port, client, sport, 'S.', server_isn, client_isn + 1, b''))
+        yield (f'IP {source} > {target}: Flags [.], ack 1, win 502, {options}, length 0',
+               self._tcp_segment(client, sport, server, port, '.', client_isn + 1, server_isn + 1, b''))
+
+        sent, received = 1, 1
+        for _ in range(random_.randint(1, 12)):
+            if service == 'http' and sent == 1:
+                request = f'GET /{random_.choice(("", "index.html", "api/v1/status"))} HTTP/1.1\r\nHost: ' \
+                          f'{self._name(server)}\r\nUser-Agent: curl/8.0\r\n\r\n'.encode()
+            else:
+                request = random_.randbytes(random_.choice((36, 52, 100, 180, 517)))
+            yield (f'IP {source} > {target}: Flags [P.], seq {sent}:{sent + len(request)}, ack {received}, win 502, '
+                   f'{options}, length {len(request)}',
+                   self._tcp_segment(client, sport, server, port, 'P.', sent, received, request))
+            sent += len(request)
+            for _ in range(random_.choice((1, 1, 2, 4))):
+                response = random_.randbytes(random_.choice((36, 108, 600, 1448, 1448)))
+                yield (f'IP {target} > {source}: Flags [P.], seq {received}:{received + len(response)}, ack {sent}, '
+                       f'win 509, {options}, length {len(response)}',
+                       self._tcp_segment(server, port, client, sport, 'P.', received, sent, response))
+                received += len(response)
+            yield (f'IP {source} > {target}: Flags [.], ack {received}, win 502, {options}, length 0',
+                   self._tcp_segment(client, sport, server, port, '.', sent, received, b''))
+
+        yield (f'IP {source} > {target}: Flags [F.], seq {sent}, ack {received}, win 502, {options}, length 0',
+               self._tcp_segment(client, sport, server, port, 'F.', sent, received, b''))
+        yield (f'IP {target} > {source}: Flags [F.], seq {received}, ack {sent + 1}, win 509, {options}, length 0',
+               self._tcp_segment(server, port, client, sport, 'F.', received, sent + 1, b''))
+        yield (f'IP {source} > {target}: Flags [.], ack {received + 1}, win 502, {options}, length 0',
+               self._tcp_segment(client, sport, server, port, '.', sent + 1, received + 1, b''))
+
+    def _scan(self):
+        """Balayage vertical (ports d'un serveur) ou horizontal (un port sur les postes)"""
+        random_ = self.random
+        scanner, sport = self._external(), random_.randint(1024, 65535)
+        if random_.random() < 0.5:
+            target = random_.choice(self.servers)
+            probes = [(target, port) for port in random_.sample(range(1, 10000), random_.randint(25, 200))]
+        else:
+            port = random_.choice((22, 445, 3389, 23))
+            probes = [(target, port) for target in random_.sample(self.clients, random_.randint(25, 120))]
+        for target, port in probes:
+            isn = random_.getrandbits(32)
+            yield (f'IP {scanner}.{sport} > {target}.{port}: Flags [S], seq {isn}, win 1024, options [mss 1460], '
+                   f'length 0', self._tcp_segment(scanner, sport, target, port, 'S', isn, 0, b''))
+            if random_.random() < 0.8:
+                yield (f'IP {target}.{port} > {scanner}.{sport}: Flags [R.], seq 0, ack {isn + 1}, win 0, length 0',
+                       self._tcp_segment(target, port, scanner, sport, 'R.', 0, isn + 1, b''))
+
+    def _flood(self):
+        """SYN flood vers un serveur web, depuis des adresses usurpées"""
+        random_ = self.random
+        target = random_.choice(self.servers[:4])
+        payload = bytes(120)
+        for _ in range(random_.randint(300, 1500)):
+            source, sport, isn = self._external(), random_.randint(1024, 65535), random_.getrandbits(32)
+            yield (f'IP {source}.{sport} > {self._name(target)}.http: Flags [S], seq {isn}:{isn + 120}, win 512, '
+                   f'length 120: HTTP', self._tcp_segment(source, sport, target, 80, 'S', isn, 0, payload))
+
+    def packets(self):
+        """Paquets de la capture, sans fin : texte d'un paquet (en-tête et vidage)"""
+        random_ = self.random
+        while True:
+            if len(self.active) < self.concurrency:
+                scenario = random_.choices(self.scenarios, self.weights)[0]
+                packets = getattr(self, f'_{scenario}')()
+                if scenario in ('scan', 'flood'):
+                    # Rafale : émise d'un bloc, beaucoup plus vite que le trafic ordinaire
+                    factor = 0.02 if scenario == 'flood' else 0.2
+                    for line, data in packets:
+                        yield self._packet(f'{self._tick(factor)} {line}', data)
+                    continue
+                self.active.append(packets)
+            conversation = random_.randrange(len(self.active))
+            try:
+                line, data = next(self.active[conversation])
+            except StopIteration:
+                self.active[conversation] = self.active[-1]
+                self.active.pop()
+                continue
+            yield self._packet(f'{self._tick()} {line}', data)
+
+
+def generate_capture(path, size=None, packets=None, mix=None, rate=1000, start='18:00:00', seed=0, dump=True):
+    """
+    Écrit une capture tcpdump (-X avec `dump`, sinon en-têtes seuls) d'au moins `size` octets
+    ou de `packets` paquets. `mix` : poids des scénarios (voir DEFAULT_MIX), `rate` : paquets
+    par seconde du trafic ordinaire, `start` : heure du premier paquet ("23:59:30" pour passer
+    minuit). Renvoie {'path', 'bytes', 'lines', 'packets'}.
+    """
+    if size is None and packets is None:
+        raise ValueError("Indiquer la taille ou le nombre de paquets de la capture")
+    generator = TrafficGenerator(mix, rate, parse_clock(start), seed, dump)
+    written = lines = count = 0
+    with open(path, 'w', encoding='ascii', newline='\n') as file:
+        batch = []
+        for text in generator.packets():
+            batch.append(text)
+            count += 1
+            if len(batch) == 1000 or count == packets:
+                chunk = ''.join(batch)
+                file.write(chunk)
+                written += len(chunk)
+                lines += chunk.count('\n')
+                batch = []
+                if count == packets or (size is not None and written >= size):
+                    break
+    return {'path': path, 'bytes': written, 'lines': lines, 'packets': count}
+
+
+def _peak_rss_mb():
+    """Mémoire maximale du processus (et de ses processus de travail) en Mo, None sans le module resource"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def measure(stage, capture, mode='streaming', options=None, report=True):
+    """
+    Une mesure, dans le processus courant (lancée par run_benchmark dans un processus neuf) :
+    - 'parse' : lecture du fichier et décodage des en-têtes seulement ;
+    - 'analyze' : analyse complète (analyze_tcpdump), puis rapports HTML et CSV si `report`.
+    """
+    import projet_final
+    result = {'rss_start_mb': _peak_rss_mb()}
+    started = time.perf_counter()
+    if stage == 'parse':
+        packets = 0
+        with open(capture, 'rb') as file:
+            for line, _, _, _ in projet_final._iter_packets(file):
+                if projet_final.tokenize_line(line):
+                    packets += 1
+        result.update(parse=time.perf_counter() - started, packets=packets, peak_rss_mb=_peak_rss_mb())
+        return result
+
+    stats = projet_final.analyze_tcpdump(capture, mode, options=options)
+    if stats is None:
+        raise RuntimeError(f"Échec de l'analyse de {capture}")
+    result.update(analyze=time.perf_counter() - started, packets=stats['network_stats']['packets_analyzed'],
+                  anomalies=stats['network_stats']['anomalies']['count'], peak_rss_mb=_peak_rss_mb())
+    if report:
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            projet_final.generate_reports(stats, os.path.join(directory, 'rapport.html'),
+                                          os.path.join(directory, 'rapport.csv'), open_browser=False)
+            result['report'] = time.perf_counter() - started
+        result['report_peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def _measure_in_subprocess(stage, capture, mode, options, report):
+    """Mesure dans un interpréteur neuf : temps et mémoire ne dépendent pas des mesures précédentes"""
+    task = json.dumps({'stage': stage, 'capture': capture, 'mode': mode, 'options': options, 'report': report})
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), 'measure', task],
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Échec de la mesure {stage} ({mode}):\n{completed.stderr.strip()}")
+    # La dernière ligne est le résultat, les précédentes viennent de l'analyse elle-même
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _count_lines(path):
+    lines = 0
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            lines += block.count(b'\n')
+    return lines
+
+
+def _git_commit():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def run_benchmark(capture, modes=('streaming',), repeat=3, report=True, options=None, description=None):
+    """
+    Mesure l'analyse de `capture` dans chacun des `modes`, `repeat` fois (meilleur temps,
+    mémoire maximale). Étapes : parse (lecture et décodage), stats (compteurs et détections,
+    soit l'analyse complète moins le décodage) et report (rapports HTML et CSV).
+    Renvoie un enregistrement par mode, au format du fichier de résultats.
+    """
+    size, lines = os.path.getsize(capture), _count_lines(capture)
+    parse = [_measure_in_subprocess('parse', capture, 'streaming', options, False) for _ in range(repeat)]
+    parse_time = min(run['parse'] for run in parse)
+    records = []
+    for mode in modes:
+        runs = [_measure_in_subprocess('analyze', capture, mode, options, report) for _ in range(repeat)]
+        analyze = min(run['analyze'] for run in runs)
+        stages = {'parse': parse_time, 'stats': max(analyze - parse_time, 0.0), 'analyze': analyze}
+        if report:
+            stages['report'] = min(run['report'] for run in runs)
+        peaks = [run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None]
+        report_peaks = [run['report_peak_rss_mb'] for run in runs if run.get('report_peak_rss_mb') is not None]
+        records.append({
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'capture': {'name': os.path.basename(capture), 'bytes': size, 'lines': lines,
+                        'packets': runs[0]['packets'], 'description': description},
+            'mode': mode,
+            'repeat': repeat,
+            'anomalies': runs[0]['anomalies'],
+            'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()},
+            'lines_per_s': round(lines / analyze),
+            'mb_per_s': round(size / 1e6 / analyze, 2),
+            'packets_per_s': round(runs[0]['packets'] / analyze),
+            'rss_start_mb': runs[0]['rss_start_mb'],
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'report_peak_rss_mb': max(report_peaks) if report_peaks else None,
+        })
+    return records
+
+
+def load_results(path):
+    """Enregistrements du fichier de résultats (JSON Lines), du plus ancien au plus récent"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def save_results(path, records):
+    with open(path, 'a', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def _same_benchmark(record, other):
+    return (record['mode'] == other['mode'] and record['capture']['bytes'] == other['capture']['bytes']
+            and record['capture']['lines'] == other['capture']['lines'])
+
+
+def compare_results(record, history, threshold=0.15):
+    """
+    Compare une mesure à la dernière mesure de la même capture et du même mode dans `history` :
+    renvoie (mesure précédente ou None, [(étape, avant, après, rapport)...] des étapes plus lentes
+    de plus de `threshold`, et de la mémoire maximale).
+    """
+    previous = next((other for other in reversed(history) if _same_benchmark(record, other)), None)
+    if previous is None:
+        return None, []
+    regressions = []
+    for stage, seconds in record['stages'].items():
+        before = previous['stages'].get(stage)
+        # Les étapes de moins de 10 ms sont trop bruitées pour être comparées
+        if before and max(before, seconds) >= 0.01 and seconds > before * (1 + threshold):
+            regressions.append((stage, before, seconds, seconds / before))
+    before, after = previous.get('peak_rss_mb'), record.get('peak_rss_mb')
+    if before and after and after > before * (1 + threshold):
+        regressions.append(('peak_rss_mb', before, after, after / before))
+    return previous, regressions
+
+
+def print_record(record, previous=None):
+    capture = record['capture']
+    print(f"{capture['name']} ({capture['bytes'] / 1e6:.1f} Mo, {capture['lines']} lignes, "
+          f"{capture['packets']} paquets) - mode {record['mode']}")
+    for stage, seconds in record['stages'].items():
+        change = ''
+        if previous is not None and previous['stages'].get(stage):
+            change = f"  ({(seconds / previous['stages'][stage] - 1) * 100:+.1f} % depuis {previous['commit'] or previous['date']})"
+        print(f"  {stage:<8} {seconds:9.3f} s{change}")
+    print(f"  débit    {record['lines_per_s']} lignes/s, {record['mb_per_s']} Mo/s, {record['packets_per_s']} paquets/s")
+    if record['peak_rss_mb'] is not None:
+        report_peak = f", {record['report_peak_rss_mb']} Mo avec les rapports" if record['report_peak_rss_mb'] else ''
+        print(f"  mémoire  {record['peak_rss_mb']} Mo au plus pendant l'analyse{report_peak} "
+              f"(interpréteur seul: {record['rss_start_mb']} Mo)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Captures synthétiques et mesure des performances de l'analyseur (projet_final.py).")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='{generate,run}')
+
+    generate = commands.add_parser('generate', help="écrit une capture tcpdump -X synthétique")
+    generate.add_argument('output', help="fichier texte à écrire")
+    _add_capture_arguments(generate)
+
+    run = commands.add_parser('run', help="mesure l'analyse d'une capture et enregistre les résultats")
+    run.add_argument('capture', nargs='?',
+                     help="capture à analyser ; sans capture, une capture synthétique de --size octets est générée")
+    _add_capture_arguments(run)
+    run.add_argument('--mode', dest='modes', action='append', choices=('streaming', 'parallel', 'table'),
+                     help="mode d'analyse, répétable (défaut: streaming)")
+    run.add_argument('--repeat', type=int, default=3, help="mesures par mode, le meilleur temps est gardé (défaut: 3)")
+    run.add_argument('--no-report', action='store_true', help="ne mesure pas la génération des rapports")
+    run.add_argument('--results', default=DEFAULT_RESULTS, help="fichier des résultats (défaut: %(default)s)")
+    run.add_argument('--no-save', action='store_true', help="n'ajoute pas la mesure au fichier des résultats")
+    run.add_argument('--threshold', type=float, default=0.15,
+                     help="ralentissement signalé comme régression, par rapport à la mesure précédente "
+                          "de la même capture (défaut: %(default)s, soit 15 %%)")
+
+    measure_ = commands.add_parser('measure', help=argparse.SUPPRESS)
+    measure_.add_argument('task')
+    return parser
+
+
+def _add_capture_arguments(parser):
+    parser.add_argument('--size', type=parse_size, help="taille de la capture générée (500k, 100M, 1G...)")
+    parser.add_argument('--packets', type=int, help="nombre de paquets de la capture générée")
+    parser.add_argument('--mix', type=parse_mix,
+                        help="poids des scénarios, les autres gardent leur poids par défaut "
+                             f"({','.join(f'{name}={weight:g}' for name, weight in DEFAULT_MIX.items())})")
+    parser.add_argument('--rate', type=float, default=1000, help="paquets par seconde du trafic ordinaire (défaut: 1000)")
+    parser.add_argument('--start', default='18:00:00', help="heure du premier paquet (défaut: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="graine du générateur : même graine, même capture")
+    parser.add_argument('--no-hex', action='store_true', help="en-têtes seuls, sans vidage hexadécimal")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'measure':
+        task = json.loads(args.task)
+        print(json.dumps(measure(**task)))
+        return 0
+    if args.rate <= 0:
+        parser.error("--rate doit être positif")
+    try:
+        parse_clock(args.start)
+    except ValueError as error:
+        parser.error(f"--start: {error} (exemple: 23:59:30)")
+
+    capture_options = {'mix': args.mix, 'rate': args.rate, 'start': args.start, 'seed': args.seed,
+                       'dump': not args.no_hex}
+    if args.command == 'generate':
+        if args.size is None and args.packets is None:
+            parser.error("indiquer --size ou --packets")
+        result = generate_capture(args.output, args.size, args.packets, **capture_options)
+        print(f"{result['path']}: {result['bytes'] / 1e6:.1f} Mo, {result['lines']} lignes, {result['packets']} paquets")
+        return 0
+
+    if args.repeat < 1:
+        parser.error("--repeat doit être positif")
+    with tempfile.TemporaryDirectory() as directory:
+        capture, description = args.capture, None
+        if capture is None:
+            if args.size is None and args.packets is None:
+                args.size = parse_size('50M')
+            capture = os.path.join(directory, 'synthetique.txt')
+            generate_capture(capture, args.size, args.packets, **capture_options)
+            # La capture générée est décrite par ses paramètres : même description, même capture
+            description = {**capture_options, 'mix': args.mix or DEFAULT_MIX, 'size': args.size,
+                           'packets': args.packets}
+        elif not os.path.exists(capture):
+            print(f"Capture introuvable: {capture}")
+            return 1
+        records = run_benchmark(os.path.abspath(capture), tuple(args.modes or ('streaming',)), args.repeat,
+                                not args.no_report, description=description)
+
+    history = load_results(args.results)
+    status = 0
+    for record in records:
+        previous, regressions = compare_results(record, history, args.threshold)
+        print_record(record, previous)
+        for stage, before, after, ratio in regressions:
+            print(f"  RÉGRESSION {stage}: {before} -> {after} (x{ratio:.2f})")
+            status = 2
+    if not args.no_save:
+        save_results(args.results, records)
+        print(f"Résultats ajoutés à {args.results}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Index de réseaux CIDR (listes blanches, listes noires, regroupement par sous-réseau).
+Les préfixes, éventuellement imbriqués, sont aplatis en intervalles d'adresses disjoints triés :
+chaque intervalle porte le préfixe le plus long qui le couvre, et une recherche est un bisect
+en O(log n), même avec des dizaines de milliers de préfixes."""
+
+import ipaddress
+from bisect import bisect_right
+from functools import lru_cache
+
+# Les IPv6 sont rangées après toutes les IPv4 sur le même axe d'entiers
+IPV6_OFFSET = 1 << 128
+
+
+@lru_cache(maxsize=65536)
+def address_value(host):
+    """Adresse IP sous forme d'entier, None pour un nom d'hôte"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return None
+    return int(address) if address.version == 4 else int(address) | IPV6_OFFSET
+
+
+def network_range(network):
+    """Réseau CIDR -> (première, dernière adresse) sur l'axe de address_value"""
+    network = ipaddress.ip_network(network, strict=False)
+    offset = 0 if network.version == 4 else IPV6_OFFSET
+    return int(network.network_address) | offset, int(network.broadcast_address) | offset
+
+
+def subnet_of(host, prefix=24):
+    """Sous-réseau /prefix d'une adresse IPv4 ("161.3.128.0/24"), None si ce n'en est pas une"""
+    value = address_value(host)
+    if value is None or value >= IPV6_OFFSET:
+        return None
+    shift = 32 - prefix
+    return f'{ipaddress.IPv4Address(value >> shift << shift)}/{prefix}'
+
+
+def read_networks(file_path):
+    """Lit un fichier de réseaux : un préfixe CIDR par ligne, commentaires après '#'"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        lines = (line.split('#', 1)[0].strip() for line in file)
+        return [line for line in lines if line]
+
+
+class CidrIndex:
+    """
+    Ensemble de réseaux CIDR avec recherche du préfixe le plus long.
+    lookup(hôte) renvoie le réseau (sous sa forme normalisée) qui contient l'hôte, ou None.
+    """
+
+    def __init__(self, networks=()):
+        self.networks = {}
+        for network in networks:
+            self.add(network)
+        self._bounds = None
+        self._labels = None
+
+    def add(self, network):
+        self.networks[str(ipaddress.ip_network(network, strict=False))] = network_range(network)
+        self._bounds = None
+
+    def _build(self):
+        # Tri par début croissant puis fin décroissante : un réseau précède ceux qu'il contient
+        prefixes = sorted(self.networks.items(), key=lambda item: (item[1][0], -item[1][1]))
+        bounds, labels = [], []
+
+        def emit(position, label):
+            if bounds and bounds[-1] == position:
+                labels[-1] = label
+            else:
+                bounds.append(position)
+                labels.append(label)
+
+        stack = []   # réseaux ouverts, du plus large au plus spécifique : (fin, nom)
+        for name, (start, end) in prefixes:
+            while stack and stack[-1][0] < start:
+                closed, _ = stack.pop()
+                emit(closed + 1, stack[-1][1] if stack else None)
+            emit(start, name)
+            stack.append((end, name))
+        while stack:
+            closed, _ = stack.pop()
+            emit(closed + 1, stack[-1][1] if stack else None)
+        self._bounds, self._labels = bounds, labels
+
+    def lookup(self, host):
+        if self._bounds is None:
+            self._build()
+        value = address_value(host)
+        if value is None:
+            return None
+        index = bisect_right(self._bounds, value) - 1
+        return self._labels[index] if index >= 0 else None
+
+    def __contains__(self, host):
+        return self.lookup(host) is not None
+
+    def __len__(self):
+        return len(self.networks)
@@ -0,0 +1,142 @@
+"""Export des paquets décodés vers un fichier interrogeable sans relire la capture :
+base SQLite indexée (.db, .sqlite) ou fichier en colonnes Parquet / Feather (.parquet,
+.feather, pyarrow nécessaire). Les paquets sont accumulés puis écrits par lots."""
+
+import os
+import sqlite3
+
+# Colonnes exportées : horodatage en microsecondes (croissant, passage de minuit compris),
+# puis les champs du PacketRecord
+COLUMNS = ('timestamp_us', 'timestamp', 'kind', 'src_host', 'src_port', 'dst_host', 'dst_port',
+           'protocol', 'flags', 'length')
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+ARROW_EXTENSIONS = ('.parquet', '.feather', '.arrow')
+# Paquets par bloc des index de la base SQLite (voir query.py)
+BLOCK_ROWS = 4096
+
+
+class PacketExporter:
+    """Accumule les paquets et les écrit par lots de `batch_size` ; close() termine le fichier"""
+
+    def __init__(self, path, batch_size=50000):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def add(self, record, timestamp_us):
+        self.rows.append((timestamp_us, *record))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self._write(self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SqliteExporter(PacketExporter):
+    """
+    Table `packets` d'une base SQLite, dans l'ordre de la capture (rowid croissant avec le temps).
+    Les index sont construits en fin d'export, par blocs de BLOCK_ROWS paquets :
+    - blocks : premier et dernier rowid, horodatages min et max de chaque bloc (index creux) ;
+    - postings : pour chaque hôte (source ou destination), les blocs où il apparaît.
+    Avec `append`, la table existante est complétée (analyse reprise depuis un point de
+    reprise) et seuls les derniers blocs sont réindexés ; sinon elle est remplacée.
+    """
+
+    def __init__(self, path, batch_size=50000, append=False):
+        super().__init__(path, batch_size)
+        self.connection = sqlite3.connect(path)
+        # Écriture en masse : le journal et la synchronisation disque ne servent qu'en cas de panne
+        self.connection.execute('PRAGMA journal_mode = OFF')
+        self.connection.execute('PRAGMA synchronous = OFF')
+        if not append:
+            for table in ('packets', 'blocks', 'postings'):
+                self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS packets (timestamp_us INTEGER, timestamp TEXT, kind TEXT, '
+            'src_host TEXT, src_port TEXT, dst_host TEXT, dst_port TEXT, protocol TEXT, flags TEXT, '
+            'length INTEGER)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS blocks (block INTEGER PRIMARY KEY, first_rowid INTEGER, '
+            'last_rowid INTEGER, min_us INTEGER, max_us INTEGER)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS postings (host TEXT, block INTEGER, PRIMARY KEY (host, block)) '
+            'WITHOUT ROWID')
+        self.first_rowid = self.connection.execute('SELECT COALESCE(MAX(rowid), 0) + 1 FROM packets').fetchone()[0]
+        self._insert = f"INSERT INTO packets VALUES ({', '.join('?' * len(COLUMNS))})"
+
+    def _write(self, rows):
+        with self.connection:
+            self.connection.executemany(self._insert, rows)
+
+    def _finish(self):
+        # Le dernier bloc de l'export précédent a pu être complété : il est réindexé
+        block = (self.first_rowid - 1) // BLOCK_ROWS
+        first = block * BLOCK_ROWS
+        with self.connection:
+            self.connection.execute('DELETE FROM blocks WHERE block >= ?', (block,))
+            self.connection.execute('DELETE FROM postings WHERE block >= ?', (block,))
+            self.connection.execute(
+                f'INSERT INTO blocks SELECT (rowid - 1) / {BLOCK_ROWS} AS block, MIN(rowid), MAX(rowid), '
+                f'MIN(timestamp_us), MAX(timestamp_us) FROM packets WHERE rowid > ? GROUP BY block', (first,))
+            for column in ('src_host', 'dst_host'):
+                self.connection.execute(
+                    f'INSERT OR IGNORE INTO postings SELECT {column}, (rowid - 1) / {BLOCK_ROWS} FROM packets '
+                    f'WHERE rowid > ? AND {column} IS NOT NULL', (first,))
+        self.connection.close()
+
+
+class ArrowExporter(PacketExporter):
+    """Fichier Parquet (un groupe de lignes par lot) ou Feather / Arrow IPC (un lot Arrow par lot)"""
+
+    def __init__(self, path, batch_size=50000):
+        super().__init__(path, batch_size)
+        import pyarrow as pa
+        self.pa = pa
+        text = pa.string()
+        self.schema = pa.schema([('timestamp_us', pa.int64()), ('timestamp', text), ('kind', text),
+                                 ('src_host', text), ('src_port', text), ('dst_host', text),
+                                 ('dst_port', text), ('protocol', text), ('flags', text),
+                                 ('length', pa.int64())])
+        if os.path.splitext(path)[1].lower() == '.parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def _write(self, rows):
+        columns = [self.pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def _finish(self):
+        self.writer.close()
+
+
+def open_exporter(path, batch_size=50000, append=False):
+    """
+    Exporteur choisi d'après l'extension du fichier. `append` : compléter un export
+    existant (SQLite seulement, un fichier Parquet ou Feather ne peut être que réécrit).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SqliteExporter(path, batch_size, append)
+    if extension in ARROW_EXTENSIONS:
+        if append:
+            raise ValueError(f"{path}: un export Parquet/Feather ne peut pas être complété, "
+                             f"utiliser une base SQLite (.db) avec le point de reprise")
+        return ArrowExporter(path, batch_size)
+    raise ValueError(f"Format d'export inconnu: {path} "
+                     f"({', '.join(SQLITE_EXTENSIONS + ARROW_EXTENSIONS)})")
@@ -0,0 +1,148 @@
+"""Instrumentation facultative de l'analyse : durée de chaque étape (lecture, décodage,
+comptage, statistiques, rapports), compteurs (lignes, paquets, anomalies, en-têtes non
+reconnus), écrits en JSON ou au format texte de Prometheus, et profil cProfile d'une étape
+à la demande. Désactivée, elle se réduit à un test par étape, jamais par paquet."""
+
+import io
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+# Nom des métriques au format Prometheus
+PROMETHEUS_PREFIX = 'tcpdump_analyzer'
+COUNTER_HELP = {
+    'lines': "Lignes lues (en-têtes et vidage hexadécimal)",
+    'bytes': "Octets lus",
+    'packets': "Paquets analysés",
+    'parse_failures': "Lignes d'en-tête non reconnues",
+    'anomalies': "Anomalies détectées",
+    'table_bytes': "Taille des colonnes de la table de paquets (mode table)",
+}
+
+
+class Metrics:
+    """
+    Durées des étapes (secondes, cumulées si une étape se répète) et compteurs d'une analyse.
+    stage(nom) chronomètre un bloc ; l'étape `profile`, si elle est donnée, est en plus
+    exécutée sous cProfile (dans le thread qui l'exécute). En mode parallel, les étapes
+    read, parse et count sont la somme des temps des processus de travail.
+    `info` (fichier, mode...) accompagne les valeurs dans le JSON et les étiquettes Prometheus.
+    """
+
+    def __init__(self, profile=None):
+        self.stages = {}
+        self.counters = {}
+        self.info = {}
+        self.profile = profile
+        self.profiler = None
+
+    def __getstate__(self):
+        # Le profileur ne se sérialise pas (retour des processus de travail) : il reste local
+        state = dict(self.__dict__)
+        state['profiler'] = None
+        return state
+
+    @contextmanager
+    def stage(self, name):
+        profiler = None
+        if name == self.profile:
+            if self.profiler is None:
+                # cProfile n'est chargé que pour l'étape profilée
+                import cProfile
+                self.profiler = cProfile.Profile()
+            profiler = self.profiler
+            profiler.enable()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+            if profiler is not None:
+                profiler.disable()
+
+    def add_time(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        """Ajoute les durées et compteurs d'une autre plage de l'analyse"""
+        for name, seconds in other.stages.items():
+            self.add_time(name, seconds)
+        for name, value in other.counters.items():
+            self.count(name, value)
+        return self
+
+    def as_dict(self):
+        """Valeurs à enregistrer, avec les débits rapportés à la durée de l'étape analyze"""
+        result = {**self.info, 'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                  'counters': dict(self.counters)}
+        elapsed = self.stages.get('analyze')
+        if elapsed:
+            result['rates'] = {f'{name}_per_s': round(self.counters[name] / elapsed, 1)
+                               for name in ('lines', 'bytes', 'packets') if name in self.counters}
+        if self.profile:
+            result['profile'] = self.profile
+        return result
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.as_dict(), file, indent=2, ensure_ascii=False)
+        return path
+
+    def prometheus_text(self):
+        """Format texte d'exposition de Prometheus (collecteur textfile de node_exporter...)"""
+        labels = ''.join(f',{name}="{_escape_label(value)}"' for name, value in sorted(self.info.items())
+                         if name in ('file', 'mode'))
+        lines = [f'# HELP {PROMETHEUS_PREFIX}_stage_seconds Durée de chaque étape de l\'analyse',
+                 f'# TYPE {PROMETHEUS_PREFIX}_stage_seconds gauge']
+        lines += [f'{PROMETHEUS_PREFIX}_stage_seconds{{stage="{name}"{labels}}} {seconds:.6f}'
+                  for name, seconds in self.stages.items()]
+        for name, value in self.counters.items():
+            metric = f'{PROMETHEUS_PREFIX}_{name}'
+            lines += [f'# HELP {metric} {COUNTER_HELP.get(name, name)}', f'# TYPE {metric} gauge',
+                      f'{metric}{{{labels[1:]}}} {value}']
+        lines += [f'# HELP {PROMETHEUS_PREFIX}_last_run_timestamp_seconds Fin de l\'analyse (heure Unix)',
+                  f'# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge',
+                  f'{PROMETHEUS_PREFIX}_last_run_timestamp_seconds{{{labels[1:]}}} {time.time():.3f}']
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        # Écriture atomique : le collecteur ne lit jamais un fichier à moitié écrit
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            file.write(self.prometheus_text())
+        os.replace(path + '.tmp', path)
+        return path
+
+    def write_profile(self, path):
+        """Profil de l'étape (format pstats : snakeviz, python -m pstats), None si elle n'a pas eu lieu"""
+        if self.profiler is None:
+            return None
+        self.profiler.dump_stats(path)
+        return path
+
+    def profile_summary(self, limit=20):
+        """Fonctions les plus coûteuses de l'étape profilée, en temps cumulé"""
+        if self.profiler is None:
+            return f"Étape {self.profile} non exécutée : pas de profil"
+        import pstats
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def measure_stage(metrics, name):
+    """metrics.stage(name), ou un contexte vide sans instrumentation"""
+    return nullcontext() if metrics is None else metrics.stage(name)
+
+
+def measure_call(metrics, name, function, *args):
+    """function(*args) chronométrée comme l'étape `name` (pour les étapes lancées dans un thread)"""
+    with measure_stage(metrics, name):
+        return function(*args)
@@ -0,0 +1,150 @@
+"""Normalisation des extrémités des paquets : un même hôte peut apparaître sous son adresse
+ou sous un nom résolu par tcpdump (tc-f01.univ-st-etienne.fr, BP-Linux8, broadcasthost...),
+un même service sous son numéro ou sous un alias. Chaque nom est ramené à une clé canonique
+grâce à une table locale (format /etc/hosts et /etc/services), à un cache LRU borné et,
+en option, à une résolution DNS mémorisée sur disque d'une exécution à l'autre."""
+
+import ipaddress
+import json
+import os
+import socket
+from functools import lru_cache
+
+
+def read_hosts(file_path):
+    """Lit une table au format /etc/hosts : "adresse nom [alias...]" -> {nom: adresse}"""
+    hosts = {}
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) >= 2:
+                for name in fields[1:]:
+                    hosts[name.rstrip('.').lower()] = fields[0]
+    return hosts
+
+
+def read_services(file_path):
+    """Lit une table au format /etc/services : "nom port/protocole [alias...]" -> {nom: port}"""
+    services = {}
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) >= 2 and fields[1].split('/', 1)[0].isdigit():
+                port = int(fields[1].split('/', 1)[0])
+                for name in [fields[0]] + fields[2:]:
+                    services[name] = port
+    return services
+
+
+def _unknown_port(port):
+    return 0
+
+
+def _is_address(host):
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class NameResolver:
+    """
+    Ramène hôtes et services à des clés canoniques :
+    - hôte : adresse de la table `hosts` (ou obtenue par DNS si `resolve`), sinon le nom
+      en minuscules sans point final ; une adresse reste telle quelle ;
+    - service : nom affiché par tcpdump pour le numéro du port ('www', '80' -> 'http').
+    `port_number` convertit un nom de service en numéro (0 si inconnu), `port_names` associe
+    un numéro au nom canonique. Les résolutions DNS sont gardées dans `cache_file` (JSON).
+    """
+
+    def __init__(self, hosts=None, services=None, port_number=None, port_names=None,
+                 resolve=False, cache_file=None, cache_size=65536):
+        self.hosts = dict(hosts or {})
+        self.services = dict(services or {})
+        self.port_number = port_number or _unknown_port
+        self.port_names = port_names or {}
+        self.resolve = resolve
+        self.cache_file = cache_file
+        self.cache_size = cache_size
+        self.resolved = {}
+        self._dirty = False
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as file:
+                self.resolved = json.load(file)
+        self._make_caches()
+
+    def _make_caches(self):
+        # Un nom n'est analysé qu'une fois tant qu'il reste dans le cache
+        self.host = lru_cache(maxsize=self.cache_size)(self._host)
+        self.service = lru_cache(maxsize=self.cache_size)(self._service)
+
+    def __getstate__(self):
+        # Les caches LRU ne se sérialisent pas (envoi entre processus) : ils sont recréés
+        state = dict(self.__dict__)
+        del state['host'], state['service']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._make_caches()
+
+    def _host(self, host):
+        if host is None or _is_address(host):
+            return host
+        name = host.rstrip('.').lower()
+        address = self.hosts.get(name)
+        if address is None and self.resolve:
+            address = self._lookup(name)
+        return address or name
+
+    def _lookup(self, name):
+        if name in self.resolved:
+            return self.resolved[name]
+        try:
+            address = socket.gethostbyname(name)
+        except OSError:
+            address = None
+        self.resolved[name] = address
+        self._dirty = True
+        return address
+
+    def _service(self, port):
+        if port is None:
+            return None
+        if port.isdigit():
+            number = int(port)
+        else:
+            number = self.services.get(port) or self.port_number(port)
+        return self.port_names.get(number, port) if number else port
+
+    def normalize(self, record):
+        """PacketRecord avec hôtes et services canoniques (le même objet si rien ne change)"""
+        timestamp, kind, src_host, src_port, dst_host, dst_port, protocol, flags, length = record
+        host, service = self.host, self.service
+        new_src_host, new_dst_host = host(src_host), host(dst_host)
+        new_src_port, new_dst_port = service(src_port), service(dst_port)
+        if (new_src_host == src_host and new_dst_host == dst_host
+                and new_src_port == src_port and new_dst_port == dst_port):
+            return record
+        if protocol == dst_port and new_dst_port is not None:
+            protocol = new_dst_port
+        # Constructeur direct : bien plus rapide que _replace() sur des millions de paquets
+        return type(record)(timestamp, kind, new_src_host, new_src_port, new_dst_host, new_dst_port,
+                            protocol, flags, length)
+
+    def merge(self, other):
+        """Ajoute les résolutions DNS faites par un autre résolveur (processus de travail)"""
+        if other is self:
+            return
+        added = {name: address for name, address in other.resolved.items() if name not in self.resolved}
+        if added:
+            self.resolved.update(added)
+            self._dirty = True
+
+    def save(self):
+        """Écrit le cache des résolutions DNS s'il a changé"""
+        if self.cache_file and self._dirty:
+            with open(self.cache_file, 'w', encoding='utf-8') as file:
+                json.dump(self.resolved, file, indent=1, sort_keys=True)
+            self._dirty = False
@@ -0,0 +1,199 @@
+"""Lecture directe des captures binaires pcap / pcapng (sans passer par le texte de tcpdump).
+Le fichier est projeté en mémoire (mmap) et les en-têtes sont décodés sur place avec
+struct.unpack_from : aucun paquet n'est copié."""
+
+import mmap
+import socket
+import struct
+import time
+
+PCAP_MAGICS = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1000000),      # pcap, microsecondes
+    b'\xa1\xb2\xc3\xd4': ('>', 1000000),
+    b'\x4d\x3c\xb2\xa1': ('<', 1000000000),   # pcap, nanosecondes
+    b'\xa1\xb2\x3c\x4d': ('>', 1000000000),
+}
+PCAPNG_MAGIC = b'\x0a\x0d\x0d\x0a'
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (101, 228, 229)
+LINKTYPE_LINUX_SLL = 113
+
+ETHERTYPES = {0x0800: 'IP', 0x86dd: 'IP6', 0x0806: 'ARP', 0x8035: 'RARP', 0x88cc: 'LLDP', 0x888e: 'EAPOL'}
+IP_PROTOCOLS = {1: 'ICMP', 2: 'igmp', 47: 'GRE', 50: 'ESP', 51: 'AH', 58: 'ICMP6', 89: 'OSPFv2',
+                103: 'PIMv2', 112: 'VRRPv2'}
+# Drapeaux TCP dans l'ordre d'affichage de tcpdump (FIN, SYN, RST, PUSH, ACK, URG, ECE, CWR)
+TCP_FLAGS = ((0x01, 'F'), (0x02, 'S'), (0x04, 'R'), (0x08, 'P'), (0x10, '.'), (0x20, 'U'),
+             (0x40, 'E'), (0x80, 'W'))
+
+
+def is_pcap_file(file_path):
+    """Vrai si le fichier commence par l'en-tête d'une capture pcap ou pcapng"""
+    with open(file_path, 'rb') as file:
+        magic = file.read(4)
+    return magic in PCAP_MAGICS or magic == PCAPNG_MAGIC
+
+
+def _tcp_flags(bits, cache={}):
+    flags = cache.get(bits)
+    if flags is None:
+        flags = cache[bits] = ''.join(char for bit, char in TCP_FLAGS if bits & bit) or 'none'
+    return flags
+
+
+def _iter_pcap_frames(buffer):
+    """Parcourt une capture pcap : (secondes, fraction en µs, linktype, longueur d'origine, début, fin)"""
+    endian, resolution = PCAP_MAGICS[bytes(buffer[:4])]
+    linktype = struct.unpack_from(endian + 'I', buffer, 20)[0] & 0x0fffffff
+    header = struct.Struct(endian + 'IIII')
+    divisor = resolution // 1000000
+    offset, size = 24, len(buffer)
+    while offset + 16 <= size:
+        seconds, fraction, captured, original = header.unpack_from(buffer, offset)
+        offset += 16
+        yield seconds, fraction // divisor, linktype, original, offset, min(offset + captured, size)
+        offset += captured
+
+
+def _iter_pcapng_frames(buffer):
+    """Parcourt une capture pcapng (blocs EPB, SPB et anciens PB)"""
+    offset, size = 0, len(buffer)
+    endian = '<'
+    interfaces = []   # (linktype, unités de temps par seconde)
+    while offset + 12 <= size:
+        block_type = struct.unpack_from(endian + 'I', buffer, offset)[0]
+        if block_type == 0x0a0d0d0a:
+            # Section Header Block : l'ordre des octets peut changer d'une section à l'autre
+            endian = '<' if bytes(buffer[offset + 8:offset + 12]) == b'\x4d\x3c\x2b\x1a' else '>'
+            interfaces = []
+        block_length = struct.unpack_from(endian + 'I', buffer, offset + 4)[0]
+        if block_length < 12:
+            break
+
+        if block_type == 1:
+            # Interface Description Block : linktype et résolution (option if_tsresol)
+            linktype = struct.unpack_from(endian + 'H', buffer, offset + 8)[0]
+            units = 1000000
+            option = offset + 16
+            while option + 4 <= offset + block_length - 4:
+                code, length = struct.unpack_from(endian + 'HH', buffer, option)
+                if code == 0:
+                    break
+                if code == 9 and length >= 1:
+                    value = buffer[option + 4]
+                    units = 2 ** (value & 0x7f) if value & 0x80 else 10 ** value
+                option += 4 + (length + 3) // 4 * 4
+            interfaces.append((linktype, units))
+        elif block_type in (6, 2) and interfaces:
+            # Enhanced Packet Block (6) et ancien Packet Block (2)
+            if block_type == 6:
+                interface, high, low, captured, original = struct.unpack_from(endian + 'IIIII', buffer, offset + 8)
+            else:
+                interface, _, high, low, captured, original = struct.unpack_from(endian + 'HHIIII', buffer, offset + 8)
+            linktype, units = interfaces[interface]
+            seconds, fraction = divmod((high << 32) | low, units)
+            start = offset + 28
+            yield seconds, fraction * 1000000 // units, linktype, original, start, start + captured
+        elif block_type == 3 and interfaces:
+            # Simple Packet Block : pas d'horodatage
+            original = struct.unpack_from(endian + 'I', buffer, offset + 8)[0]
+            linktype, _ = interfaces[0]
+            start = offset + 12
+            yield 0, 0, linktype, original, start, min(start + original, offset + block_length - 4)
+        offset += block_length
+
+
+def _decode_frame(buffer, linktype, original, start, end, port_names):
+    """
+    Décode les en-têtes d'une trame : renvoie (kind, src_host, src_port, dst_host, dst_port,
+    protocol, flags, length) comme les champs de PacketRecord, ou None si la trame est illisible.
+    """
+    unpack_from = struct.unpack_from
+    if linktype == LINKTYPE_ETHERNET:
+        if end - start < 14:
+            return None
+        ethertype = unpack_from('!H', buffer, start + 12)[0]
+        offset = start + 14
+        while ethertype in (0x8100, 0x88a8) and offset + 4 <= end:
+            # Étiquettes VLAN
+            ethertype = unpack_from('!H', buffer, offset + 2)[0]
+            offset += 4
+        if ethertype < 0x0600:
+            # Trame 802.3 + LLC : STP si DSAP = 0x42
+            kind = 'STP' if offset < end and buffer[offset] == 0x42 else '802.3'
+            return kind, None, None, None, None, kind, None, original - 14
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if end - start < 16:
+            return None
+        ethertype = unpack_from('!H', buffer, start + 14)[0]
+        offset = start + 16
+    elif linktype in LINKTYPE_RAW:
+        if end <= start:
+            return None
+        ethertype = 0x0800 if buffer[start] >> 4 == 4 else 0x86dd
+        offset = start
+    else:
+        return None
+
+    kind = ETHERTYPES.get(ethertype, f'ethertype 0x{ethertype:04x}')
+    if ethertype == 0x0800:
+        if offset + 20 > end:
+            return None
+        header_length = (buffer[offset] & 0x0f) * 4
+        total_length, = unpack_from('!H', buffer, offset + 2)
+        proto = buffer[offset + 9]
+        src_host = socket.inet_ntop(socket.AF_INET, buffer[offset + 12:offset + 16])
+        dst_host = socket.inet_ntop(socket.AF_INET, buffer[offset + 16:offset + 20])
+        payload_length = total_length - header_length
+        offset += header_length
+    elif ethertype == 0x86dd:
+        if offset + 40 > end:
+            return None
+        payload_length, proto = unpack_from('!HB', buffer, offset + 4)
+        src_host = socket.inet_ntop(socket.AF_INET6, buffer[offset + 8:offset + 24])
+        dst_host = socket.inet_ntop(socket.AF_INET6, buffer[offset + 24:offset + 40])
+        offset += 40
+    else:
+        # ARP, LLDP... : longueur affichée par tcpdump = trame sans l'en-tête de liaison
+        return kind, None, None, None, None, kind, None, original - (offset - start)
+
+    if proto in (6, 17) and offset + 8 <= end:
+        src_port, dst_port = unpack_from('!HH', buffer, offset)
+        src_port = port_names.get(src_port) or str(src_port)
+        dst_port = port_names.get(dst_port) or str(dst_port)
+        if proto == 6 and offset + 14 <= end:
+            flags = _tcp_flags(buffer[offset + 13])
+            length = payload_length - (buffer[offset + 12] >> 4) * 4
+        else:
+            flags = None
+            length = unpack_from('!H', buffer, offset + 4)[0] - 8
+        return kind, src_host, src_port, dst_host, dst_port, dst_port, flags, length
+
+    protocol = IP_PROTOCOLS.get(proto, f'ip-proto-{proto}')
+    return kind, src_host, None, dst_host, None, protocol, None, payload_length
+
+
+def iter_pcap_packets(file_path, port_names=None):
+    """
+    Lit une capture pcap ou pcapng et renvoie, pour chaque paquet décodable,
+    (horodatage "HH:MM:SS.ffffff" en heure locale comme tcpdump, champs décodés).
+    `port_names` associe un numéro de port à son nom de service (53 -> 'domain').
+    """
+    port_names = port_names or {}
+    if not is_pcap_file(file_path):
+        raise ValueError(f"{file_path} n'est pas une capture pcap ou pcapng (en-tête inconnu)")
+    with open(file_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buffer = memoryview(mapped)
+            try:
+                frames = _iter_pcapng_frames(buffer) if bytes(buffer[:4]) == PCAPNG_MAGIC else _iter_pcap_frames(buffer)
+                last_second, prefix = None, ''
+                for seconds, micro, linktype, original, start, end in frames:
+                    fields = _decode_frame(buffer, linktype, original, start, end, port_names)
+                    if fields is None:
+                        continue
+                    if seconds != last_second:
+                        last_second, prefix = seconds, time.strftime('%H:%M:%S', time.localtime(seconds))
+                    yield f'{prefix}.{micro:06d}', fields
+            finally:
+                buffer.release()
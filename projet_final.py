@@ -1,115 +1,1748 @@
-import pandas as pd
 import re
-from datetime import datetime
-import matplotlib.pyplot as plt
 import base64
+import binascii
 from io import BytesIO
-import webbrowser
 import os
-from collections import Counter
+from collections import Counter, OrderedDict, deque, namedtuple
 import csv
+import socket
+import time
+from array import array
+from sketches import HyperLogLog, SpaceSaving
+from pcap_reader import is_pcap_file, iter_pcap_packets
+from rules import DEFAULT_RULES, RuleSet, load_rules
+from cidr import CidrIndex, read_networks, subnet_of
+from names import NameResolver, read_hosts, read_services
+from timeseries import TimeSeries
+from timestamps import MICROSECONDS_PER_DAY, format_us, parse_clock, timestamp_to_us
+from metrics import Metrics, measure_call, measure_stage
+from functools import lru_cache
+from itertools import islice
+import hashlib
+from html import escape
+import pickle
+import glob
+import argparse
+import sys
 
-def detect_anomalies(packet_info):
-    """Détecte les anomalies dans les paquets"""
-    suspicious_flags = ['[S]', '[S.]', '[SF]', '[P.]']
-    return any(flag in packet_info for flag in suspicious_flags)
 
-def analyze_tcpdump(file_path):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        protocols = []
-        ip_src = []
-        ip_dst = []
-        packets = []
-        anomalies = []
-        
-        ip_pattern = r'IP (?:([0-9]+(?:\.[0-9]+){3})\.([0-9]+))? ?([0-9]+(?:\.[0-9]+){3})?'
-        packet_pattern = re.compile(r'(\d{2}:\d{2}:\d{2}\.\d{6})\s+(.*?)(?: > |, )(.*?)(?:,|\:) (.*)')
-        
-        for line in lines:
-            if not line.startswith('\t'):
-                match = packet_pattern.match(line)
-                if match:
-                    timestamp, src, dst, info = match.groups()
-                    packet = {
-                        'timestamp': timestamp,
-                        'source': src,
-                        'destination': dst,
-                        'info': info
-                    }
-                    packets.append(packet)
-                    
-                    if detect_anomalies(info):
-                        anomalies.append(packet)
-                
-                if 'IP' in line or 'ARP' in line or 'STP' in line:
-                    if '>' in line:
-                        proto = line.split('>')[1].strip().split(':')[0].strip().split('.')[-1]
-                    else:
-                        proto = line.split(',')[0].split()[1].rstrip(',')
-                    protocols.append(proto)
-                
-                ip_match = re.search(ip_pattern, line)
-                if ip_match:
-                    if ip_match.group(1):
-                        ip_src.append(ip_match.group(1))
-                    if ip_match.group(3):
-                        ip_dst.append(ip_match.group(3))
-
-        protocol_counts = Counter(protocols)
-        ip_counts = Counter(ip_src)
-        
-        # Calcul du seuil pour les pics de trafic
-        seuil = len(packets) / len(set([p['source'] for p in packets])) * 2
-        anomalies_trafic = []
-        ips_suspectes = set()
-        
-        for src, count in ip_counts.items():
-            if count > seuil:
-                anomalies_trafic.append({
-                    'timestamp': packets[0]['timestamp'] if packets else '',
-                    'ip_source': src,
-                    'type': 'Pic de Trafic',
-                    'details': f'Pic de trafic: {count/60:.2f} paquets/s',
-                    'level': 'ÉLEVÉ'
-                })
-                ips_suspectes.add(src)
-
-        # Mise à jour des statistiques avec les compteurs d'anomalies
-        total_anomalies = len(anomalies_trafic)
-        stats = {
-            'network_stats': {
-                'packets_analyzed': len(packets),
-                'packets_rate': f"{len(packets)/60:.1f}/s",
-                'anomalies': {
-                    'count': total_anomalies,
-                    'percentage': f"{(total_anomalies/len(packets)*100) if packets else 0:.1f}%"
-                },
-                'suspicious_ips': {
-                    'count': len(ips_suspectes),
-                    'percentage': f"{(len(ips_suspectes)/len(set(ip_src))*100) if ip_src else 0:.1f}%"
-                },
-                'services': {
-                    'count': len(set([p['destination'].split('.')[-1] for p in packets if '.' in p['destination']])),
-                    'percentage': '-'
-                }
+# Enregistrement compact d'un paquet, produit par tokenize_line
+PacketRecord = namedtuple('PacketRecord', [
+    'timestamp', 'kind', 'src_host', 'src_port', 'dst_host', 'dst_port',
+    'protocol', 'flags', 'length'
+])
+
+# Un seul passage sur la ligne : horodatage, type (IP, IP6, ARP, STP...),
+# extrémités "hôte.port > hôte.port" si présentes, drapeaux TCP et longueur
+# ("length N", ou "(N)" en fin de ligne pour le DNS)
+HEADER_PATTERN = re.compile(r"""
+    (\d\d:\d\d:\d\d\.\d{6})\ ([^\s,]+),?\ 
+    (?:(?:(\S+)\.([\w-]+)|(\S+))\ >\ (?:(\S+)\.([\w-]+)|(\S+)):\ )?
+    ((?:Flags\ \[([^\]]*)\])?(?:.*length\ (\d+)\D*|.*\((\d+)\)|.*))$
+""", re.X)
+# Protocoles IP sans numéro de port : le dernier champ de l'adresse n'est pas un port
+PORTLESS_PROTOCOLS = ('ICMP', 'igmp', 'IGMP', 'ip-proto', 'GRE', 'ESP', 'AH', 'OSPF', 'VRRP', 'PIM')
+
+
+def _is_ipv4(host):
+    """Vrai si l'hôte est une adresse IPv4 numérique"""
+    return host.count('.') == 3 and host.replace('.', '').isdigit()
+
+
+def tokenize_line(line):
+    """
+    Découpe une ligne d'en-tête tcpdump en un seul passage.
+    Renvoie un PacketRecord, ou None si la ligne n'est pas un en-tête de paquet.
+    """
+    match = HEADER_PATTERN.match(line)
+    if not match:
+        return None
+    (timestamp, kind, src_host, src_port, src_bare, dst_host, dst_port, dst_bare,
+     info, flags, length, dns_length) = match.groups()
+    length = int(length or dns_length or 0)
+
+    if dst_host is None and dst_bare is None:
+        # ARP, STP... : pas d'adresses IP, le type sert de protocole
+        return PacketRecord(timestamp, kind, None, None, None, None, kind, None, length)
+
+    src_host = src_host or src_bare
+    dst_host = dst_host or dst_bare
+    if info.startswith(PORTLESS_PROTOCOLS):
+        if src_port:
+            src_host, src_port = f'{src_host}.{src_port}', None
+        if dst_port:
+            dst_host, dst_port = f'{dst_host}.{dst_port}', None
+        return PacketRecord(timestamp, kind, src_host, None, dst_host, None,
+                            info.split(' ', 1)[0].rstrip(','), None, length)
+
+    return PacketRecord(timestamp, kind, src_host, src_port, dst_host, dst_port,
+                        dst_port or kind, flags, length)
+
+
+class TimestampClock:
+    """Horodatages tcpdump en microsecondes croissantes, en gérant le passage de minuit"""
+
+    def __init__(self):
+        self.day_offset = 0
+        self.last = None
+
+    def to_us(self, timestamp):
+        us = timestamp_to_us(timestamp) + self.day_offset
+        # La capture passe minuit : l'horodatage recule de plus de 12 h
+        if self.last is not None and us < self.last - MICROSECONDS_PER_DAY // 2:
+            self.day_offset += MICROSECONDS_PER_DAY
+            us += MICROSECONDS_PER_DAY
+        self.last = us
+        return us
+
+
+class SlidingCounter:
+    """
+    Compteur par seconde dans un tampon circulaire de taille max(windows),
+    avec une somme glissante par fenêtre (mise à jour en temps constant).
+    """
+    __slots__ = ('windows', 'size', 'buckets', 'sums', 'second', 'flagged')
+
+    def __init__(self, windows):
+        self.windows = windows
+        self.size = max(windows)
+        self.buckets = array('I', bytes(4 * self.size))
+        self.sums = [0] * len(windows)
+        self.second = None
+        self.flagged = 0   # bit i levé : pic en cours sur la fenêtre i (tant qu'un bit est levé, l'épisode continue)
+
+    def advance(self, second):
+        """Fait glisser les fenêtres jusqu'à la seconde `second`"""
+        if self.second is None or second - self.second >= self.size:
+            if self.second is not None:
+                self.buckets = array('I', bytes(4 * self.size))
+                self.sums = [0] * len(self.windows)
+            self.second = second
+            return
+        for current in range(self.second + 1, second + 1):
+            for i, window in enumerate(self.windows):
+                self.sums[i] -= self.buckets[(current - window) % self.size]
+            self.buckets[current % self.size] = 0
+        if second > self.second:
+            self.second = second
+
+    def add(self, second, count=1):
+        self.advance(second)
+        self.buckets[self.second % self.size] += count
+        for i in range(len(self.sums)):
+            self.sums[i] += count
+
+
+class SpikeDetector:
+    """
+    Détecte les pics de trafic par source sur des fenêtres glissantes (1 s, 10 s, 60 s...).
+    Une source est en pic sur une fenêtre quand elle y envoie au moins `min_packets`
+    paquets et plus de `multiplier` fois la moyenne par source active sur cette fenêtre.
+    Une fenêtre n'est évaluée qu'une fois sa durée écoulée depuis le premier paquet.
+    Chaque paquet coûte un temps constant ; un épisode (au moins une fenêtre en pic) n'est
+    signalé qu'une fois, sur la plus petite fenêtre en pic.
+    """
+
+    def __init__(self, windows=(1, 10, 60), multiplier=2.0, min_packets=20):
+        self.windows = tuple(sorted(windows))
+        self.multiplier = multiplier
+        self.min_packets = min_packets
+        self.sources = {}
+        self.total = SlidingCounter(self.windows)      # paquets, toutes sources confondues
+        self.active = SlidingCounter(self.windows)     # sources actives par seconde
+        self.first_second = None
+        self.current_second = None
+        self.current_sources = set()
+
+    def forget(self, source):
+        """Oublie l'historique d'une source (quand elle sort du top des sources suivies)"""
+        self.sources.pop(source, None)
+
+    def _source_window(self, source):
+        return self.sources.get(source) or self.sources.setdefault(source, SlidingCounter(self.windows))
+
+    def observe(self, source, timestamp_us):
+        """Enregistre un paquet ; renvoie la liste des pics détectés par ce paquet (ou None)"""
+        second = timestamp_us // 1000000
+        if self.current_second is None:
+            self.first_second = self.current_second = second
+        elif second > self.current_second:
+            self.active.add(self.current_second, len(self.current_sources))
+            self.current_sources.clear()
+            self.current_second = second
+        second = self.current_second
+        self.current_sources.add(source)
+        self.total.add(second)
+        self.active.advance(second)
+
+        counter = self._source_window(source)
+        counter.add(second)
+
+        elapsed = second - self.first_second + 1
+        firing = 0
+        for i, window in enumerate(self.windows):
+            # Une fenêtre n'est évaluée qu'une fois entièrement écoulée : avant, elle contiendrait
+            # les mêmes paquets que les plus petites et daterait son début d'avant la capture
+            if window > elapsed:
+                break
+            count = counter.sums[i]
+            # Nombre moyen de sources actives par seconde sur la fenêtre
+            active = (self.active.sums[i] + len(self.current_sources)) / window
+            if count >= self.min_packets and count > self.multiplier * self.total.sums[i] / active:
+                firing |= 1 << i
+        spikes = None
+        if firing and not counter.flagged:
+            # Nouvel épisode : signalé une fois, sur la plus petite fenêtre en pic
+            i = (firing & -firing).bit_length() - 1
+            spikes = [self._anomaly(source, self.windows[i], counter.sums[i], second, timestamp_us)]
+        counter.flagged = firing
+        return spikes
+
+    def _anomaly(self, source, window, count, second, timestamp_us):
+        # La fenêtre couvre les `window` secondes qui finissent à la seconde courante
+        start = format_us((second - window + 1) * 1000000)
+        return {
+            'timestamp': format_us(timestamp_us),
+            'ip_source': source,
+            'type': 'Pic de Trafic',
+            'details': f'Pic de trafic: {count/window:.2f} paquets/s sur {window} s (depuis {start})',
+            'level': 'ÉLEVÉ',
+            'window': window,
+        }
+
+
+# États d'une connexion TCP suivie par la table des flux
+SYN_SENT, SYN_RECEIVED, ESTABLISHED = 1, 2, 3
+
+
+class FlowTable:
+    """
+    Table des connexions TCP indexée par (source, port source, destination, port destination),
+    dans le sens de l'ouverture. Les flux sont rangés du moins au plus récemment vu : les flux
+    inactifs depuis `timeout` secondes sont évincés par l'avant, et la table ne dépasse jamais
+    `max_flows` entrées (le plus ancien est évincé). Détecte :
+    - SYN flood : au moins `syn_flood_threshold` connexions à demi ouvertes vers un même hôte ;
+    - balayage horizontal : une source tente `scan_threshold` hôtes sur un même port ;
+    - balayage vertical : une source tente `scan_threshold` ports d'un même hôte ;
+      (tentatives comptées sur `scan_window` secondes)
+    - tempête de RST : un hôte envoie `rst_threshold` RST en `rst_window` secondes.
+    Chaque alerte n'est signalée qu'une fois par épisode.
+    """
+
+    def __init__(self, timeout=120, max_flows=100000, syn_flood_threshold=50,
+                 scan_threshold=20, scan_window=60, rst_threshold=100, rst_window=10):
+        self.timeout = timeout * 1000000
+        self.max_flows = max_flows
+        self.syn_flood_threshold = syn_flood_threshold
+        self.scan_threshold = scan_threshold
+        self.scan_window = scan_window * 1000000
+        self.rst_threshold = rst_threshold
+        self.rst_window = rst_window * 1000000
+        self.flows = OrderedDict()           # clé -> [dernier paquet (µs), état]
+        self.half_open = Counter()           # hôte destination -> connexions à demi ouvertes
+        self.flooded = set()                 # hôtes en cours de SYN flood (déjà signalés)
+        self.horizontal = OrderedDict()      # (source, port) -> [début (µs), hôtes, signalé]
+        self.vertical = OrderedDict()        # (source, hôte) -> [début (µs), ports, signalé]
+        self.resets = OrderedDict()          # hôte -> [début (µs), nombre de RST, signalé]
+
+    def _close(self, key, flow):
+        """Retire un flux de la table (le décompte des demi-ouvertures suit)"""
+        del self.flows[key]
+        if flow[1] != ESTABLISHED:
+            self._release(key[2])
+
+    def _release(self, host):
+        self.half_open[host] -= 1
+        if self.half_open[host] <= 0:
+            del self.half_open[host]
+        if host in self.flooded and self.half_open[host] < self.syn_flood_threshold // 2:
+            self.flooded.discard(host)
+
+    def _expire(self, now):
+        flows = self.flows
+        while flows:
+            key, flow = next(iter(flows.items()))
+            if flow[0] >= now - self.timeout and len(flows) <= self.max_flows:
+                break
+            self._close(key, flow)
+
+    def _window_entry(self, table, key, now, window, empty):
+        """Entrée d'une table de fenêtre (balayages, RST), remise à zéro quand la fenêtre expire"""
+        entry = table.get(key)
+        if entry is None or entry[0] < now - window:
+            if entry is None and len(table) >= self.max_flows:
+                table.popitem(last=False)
+            entry = table[key] = [now, empty(), False]
+        table.move_to_end(key)
+        return entry
+
+    def _scan(self, table, key, target, now, kind, record):
+        entry = self._window_entry(table, key, now, self.scan_window, set)
+        if entry[2]:
+            return None
+        entry[1].add(target)
+        if len(entry[1]) < self.scan_threshold:
+            return None
+        entry[2] = True
+        entry[1] = set()   # plus besoin des cibles : la mémoire est rendue
+        if kind == 'horizontal':
+            details = f'Balayage horizontal: {self.scan_threshold} hôtes sondés sur le port {key[1]}'
+        else:
+            details = f'Balayage vertical: {self.scan_threshold} ports sondés sur {key[1]}'
+        return self._anomaly(record, key[0], 'Balayage de ports', details, 'ÉLEVÉ')
+
+    def observe(self, record, timestamp_us):
+        """Enregistre un paquet TCP ; renvoie la liste des attaques détectées par ce paquet (ou None)"""
+        flags = record.flags
+        if flags is None or record.src_port is None or record.dst_port is None:
+            return None
+        self._expire(timestamp_us)
+        syn, ack, rst, fin = 'S' in flags, '.' in flags, 'R' in flags, 'F' in flags
+        src, sport, dst, dport = record.src_host, record.src_port, record.dst_host, record.dst_port
+        anomalies = None
+
+        if rst:
+            entry = self._window_entry(self.resets, src, timestamp_us, self.rst_window, int)
+            entry[1] += 1
+            if entry[1] >= self.rst_threshold and not entry[2]:
+                entry[2] = True
+                anomalies = [self._anomaly(record, src, 'Tempête de RST',
+                                           f'Tempête de RST: {entry[1]} RST envoyés en '
+                                           f'{self.rst_window // 1000000} s', 'MOYEN')]
+
+        key = (src, sport, dst, dport)
+        flow = self.flows.get(key)
+        forward = True
+        if flow is None:
+            key = (dst, dport, src, sport)
+            flow = self.flows.get(key)
+            forward = False
+
+        if flow is None:
+            if syn and not ack and not rst:
+                # Nouvelle tentative de connexion
+                key = (src, sport, dst, dport)
+                self.flows[key] = [timestamp_us, SYN_SENT]
+                self.half_open[dst] += 1
+                if self.half_open[dst] >= self.syn_flood_threshold and dst not in self.flooded:
+                    self.flooded.add(dst)
+                    anomalies = anomalies or []
+                    anomalies.append(self._anomaly(
+                        record, src, 'SYN Flood',
+                        f'SYN flood: {self.half_open[dst]} connexions à demi ouvertes vers {dst}', 'ÉLEVÉ'))
+                for table, table_key, target, kind in ((self.horizontal, (src, dport), dst, 'horizontal'),
+                                                       (self.vertical, (src, dst), dport, 'vertical')):
+                    scan = self._scan(table, table_key, target, timestamp_us, kind, record)
+                    if scan:
+                        anomalies = anomalies or []
+                        anomalies.append(scan)
+                if len(self.flows) > self.max_flows:
+                    self._expire(timestamp_us)
+            return anomalies
+
+        flow[0] = timestamp_us
+        self.flows.move_to_end(key)
+        if rst or fin:
+            self._close(key, flow)
+        elif flow[1] == SYN_SENT and not forward and syn and ack:
+            flow[1] = SYN_RECEIVED
+        elif flow[1] != ESTABLISHED and forward and ack and not syn:
+            flow[1] = ESTABLISHED
+            self._release(dst)
+        return anomalies
+
+    def _anomaly(self, record, source, kind, details, level):
+        return {
+            'timestamp': record.timestamp,
+            'ip_source': source,
+            'type': kind,
+            'details': details,
+            'level': level,
+        }
+
+
+# Réglages par défaut de l'analyse (surchargés par le paramètre `options`)
+DEFAULT_OPTIONS = {
+    'windows': (1, 10, 60),
+    'spike_multiplier': 2.0,
+    'spike_min_packets': 20,
+    # Mode sketch : mémoire fixe pour les captures à très forte cardinalité
+    'sketch': False,
+    'sketch_capacity': 1000,     # sources suivies par Space-Saving (et par le détecteur de pics)
+    'sketch_precision': 12,      # 2**12 registres HyperLogLog, erreur relative ~1,6 %
+    # Règles sur le contenu : paires (wants(record), inspect(record, payload)).
+    # Le vidage hexadécimal n'est décodé que pour les paquets que wants() accepte ;
+    # inspect() renvoie une anomalie (timestamp, ip_source, type, details, level) ou None.
+    # En mode parallel, ces fonctions doivent être définies au niveau d'un module.
+    # Modes streaming, parallel et suivi sur du texte tcpdump -X (refusées en mode table et pour le pcap).
+    'payload_rules': (),
+    # Fichier de règles JSON (voir rules.py) ; None : DEFAULT_RULES
+    'rules': None,
+    # Table des flux TCP (SYN flood, balayages de ports, tempêtes de RST)
+    'flow_timeout': 120,         # secondes d'inactivité avant éviction d'un flux
+    'max_flows': 100000,         # flux (et sources de balayage) suivis au plus
+    # Connexions à demi ouvertes vers un même hôte : un serveur ordinaire en a rarement plus de
+    # quelques-unes à la fois, la rafale de fichier1000.txt (81 SYN en 1 ms) passe le seuil
+    'syn_flood_threshold': 50,
+    'scan_threshold': 20,        # hôtes (ou ports) distincts sondés par une source...
+    'scan_window': 60,           # ... en autant de secondes
+    'rst_threshold': 100,        # RST envoyés par un hôte...
+    'rst_window': 10,            # ... en autant de secondes
+    # Réseaux CIDR : liste de préfixes ou fichier texte (un préfixe par ligne)
+    'allow_list': None,          # sources de confiance, jamais signalées (passerelles...)
+    'deny_list': None,           # sources interdites : signalées, anomalies de niveau CRITIQUE
+    'subnets': None,             # réseaux de regroupement des statistiques...
+    'subnet_prefix': 24,         # ... sinon regroupement par /24
+    # Normalisation des noms d'hôtes et de services (voir names.py)
+    'normalize_names': True,
+    'hosts_file': None,          # table au format /etc/hosts : nom -> adresse
+    'services_file': None,       # table au format /etc/services : alias -> port
+    'resolve_names': False,      # résolution DNS des noms absents de la table...
+    'name_cache': None,          # ... mémorisée dans ce fichier JSON d'une exécution à l'autre
+    'name_cache_size': 65536,    # noms gardés dans le cache LRU en mémoire
+    # Reprise : True pour "<fichier>.checkpoint", ou chemin du point de reprise (modes texte)
+    'checkpoint': None,
+    # Séries temporelles du débit (paquets et octets par intervalle)
+    'timeseries_bucket': 1,      # secondes par intervalle (60 : par minute)
+    'timeseries_tracked': 20,    # protocoles et sources qui ont leur propre série...
+    'timeseries_top': 5,         # ... dont autant sont tracés dans le rapport
+    # Export des paquets décodés (voir export.py) : base SQLite (.db) ou fichier Parquet / Feather
+    'export': None,
+    'export_batch_size': 50000,  # paquets écrits par lot
+    # Instrumentation (voir metrics.py) : durée des étapes et compteurs, dans stats['metrics']
+    'metrics': False,
+    'profile_stage': None,       # étape exécutée sous cProfile (voir PROFILE_STAGES)
+}
+# Options sans effet sur les résultats : les changer ne rend pas un point de reprise caduc
+INSTRUMENTATION_OPTIONS = ('metrics', 'profile_stage')
+# Étapes chronométrées par stage() et qui peuvent donc être profilées
+PROFILE_STAGES = ('analyze', 'stats', 'csv_report', 'protocol_chart', 'throughput_chart', 'html_report')
+
+
+def _new_state(options=None, spike_detector=None, flow_table=None, clock=None):
+    """
+    Crée l'état vide de l'analyse (compteurs mis à jour au fil de la lecture).
+    Des états qui partagent détecteurs et table des flux doivent aussi partager l'horloge `clock`.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    sketch = options['sketch']
+    return {
+        'options': options,
+        'packets': 0,
+        'first_us': None,
+        'last_us': None,
+        'services': HyperLogLog(options['sketch_precision']) if sketch else set(),
+        'protocols': Counter(),
+        'ip_src': SpaceSaving(options['sketch_capacity']) if sketch else Counter(),
+        # Nombre d'IPs sources distinctes, seulement en mode sketch (sinon len(ip_src))
+        'ip_sources': HyperLogLog(options['sketch_precision']) if sketch else None,
+        'rules': _rule_set(options['rules']),
+        'rule_hits': Counter(),
+        'allow_list': _network_index(options['allow_list']),
+        'deny_list': _network_index(options['deny_list']),
+        'denied_seen': set(),
+        'names': _name_resolver(options),
+        'anomalies': [],
+        'clock': clock or TimestampClock(),
+        'export': None,
+        'metrics': None,
+        'timeseries': TimeSeries(options['timeseries_bucket'], options['timeseries_tracked']),
+        'spike_detector': spike_detector or SpikeDetector(options['windows'], options['spike_multiplier'],
+                                                          options['spike_min_packets']),
+        'flow_table': flow_table or FlowTable(options['flow_timeout'], options['max_flows'],
+                                              options['syn_flood_threshold'], options['scan_threshold'],
+                                              options['scan_window'], options['rst_threshold'],
+                                              options['rst_window']),
+    }
+
+
+def _add_record(state, record):
+    """Met à jour les compteurs de l'état avec un paquet"""
+    timestamp_us = state['clock'].to_us(record.timestamp)
+    state['packets'] += 1
+    if state['first_us'] is None:
+        state['first_us'] = timestamp_us
+    state['last_us'] = timestamp_us
+    # Noms normalisés avant tout comptage : chaque mode voit les mêmes clés
+    if state['names'] is not None:
+        record = state['names'].normalize(record)
+    state['protocols'][record.protocol] += 1
+    if state['export'] is not None:
+        state['export'].add(record, timestamp_us)
+    source = record.src_host
+    state['timeseries'].add(timestamp_us, record.protocol, source, record.length)
+    if source is not None:
+        if record.dst_port is not None:
+            state['services'].add(record.dst_port)
+        allow_list, deny_list = state['allow_list'], state['deny_list']
+        # Le classement des sources ne garde que les adresses IPv4 ; le détecteur de pics voit
+        # toutes les sources, y compris celles que tcpdump affiche par leur nom
+        if _is_ipv4(source):
+            if state['ip_sources'] is None:
+                state['ip_src'][source] += 1
+            else:
+                state['ip_sources'].add(source)
+                evicted = state['ip_src'].add(source)
+                if evicted is not None:
+                    state['spike_detector'].forget(evicted)
+        # Les sources de confiance ne passent pas dans le détecteur de pics
+        if allow_list is None or source not in allow_list:
+            spikes = state['spike_detector'].observe(source, timestamp_us)
+            if spikes:
+                _report(state, spikes)
+        if record.flags is not None:
+            attacks = state['flow_table'].observe(record, timestamp_us)
+            if attacks:
+                _report(state, attacks)
+        if deny_list is not None and source not in state['denied_seen'] and source in deny_list:
+            state['denied_seen'].add(source)
+            state['anomalies'].append(_denied_anomaly(source, deny_list.lookup(source), record.timestamp))
+
+    for rule in state['rules'].match(record):
+        state['rule_hits'][rule.name] += 1
+        if rule.alert:
+            _report(state, [_rule_anomaly(rule, record)])
+
+
+def screen_anomalies(anomalies, allow_list, deny_list):
+    """Retire les anomalies des sources de confiance ; celles des sources interdites passent en CRITIQUE"""
+    if allow_list is None and deny_list is None:
+        return anomalies
+    screened = []
+    for anomaly in anomalies:
+        source = anomaly['ip_source']
+        if allow_list is not None and source in allow_list:
+            continue
+        if deny_list is not None and source in deny_list:
+            anomaly = {**anomaly, 'level': 'CRITIQUE'}
+        screened.append(anomaly)
+    return screened
+
+
+def _report(state, anomalies):
+    """Ajoute des anomalies à l'état, après passage par les listes blanche et noire"""
+    state['anomalies'].extend(screen_anomalies(anomalies, state['allow_list'], state['deny_list']))
+
+
+def _denied_anomaly(source, network, timestamp):
+    """Première apparition d'une source de la liste noire"""
+    return {
+        'timestamp': timestamp,
+        'ip_source': source,
+        'type': 'Liste noire',
+        'details': f'Source interdite (réseau {network})',
+        'level': 'CRITIQUE',
+    }
+
+
+def _rule_anomaly(rule, record):
+    """Anomalie signalée par une règle d'alerte"""
+    source = record.src_host or record.kind
+    if record.src_port:
+        source_text = f'{source}.{record.src_port}'
+    else:
+        source_text = source
+    destination = f'{record.dst_host}.{record.dst_port}' if record.dst_port else record.dst_host
+    return {
+        'timestamp': record.timestamp,
+        'ip_source': source,
+        'type': rule.name,
+        'details': rule.details or f"{rule.name}: {record.protocol} {source_text} > {destination or '-'}",
+        'level': rule.level,
+    }
+
+
+# Un paquet : sa ligne d'en-tête (groupe 1) suivie des lignes, commençant par une tabulation,
+# du vidage hexadécimal de tcpdump -x/-X ("\t0x0010:  ffff ffff feb3 0f74  ....").
+# Chaque correspondance avale tout le vidage d'un coup, sans essai à chaque position.
+PACKET_BLOCK = re.compile(rb'([^\t\n][^\n]*)\n?(?:\t[^\n]*\n?)*')
+HEX_LINE = re.compile(rb'^\s+0x[0-9a-fA-F]+:\s+((?:[0-9a-fA-F]{2,4} ?)+)', re.M)
+BLOCK_SIZE = 1 << 20
+
+
+def _iter_packets(file, end=None):
+    """
+    Parcourt un fichier tcpdump ouvert en binaire, de la position courante jusqu'à `end`,
+    par blocs de BLOCK_SIZE octets. Seules les lignes d'en-tête sont décodées en chaînes :
+    renvoie (ligne d'en-tête, bloc, début, fin), où bloc[début:fin] est le vidage
+    hexadécimal du paquet, laissé tel quel (voir decode_payload).
+    """
+    position = file.tell()
+    pending = b''
+    while True:
+        size = BLOCK_SIZE if end is None else min(BLOCK_SIZE, end - position)
+        data = file.read(size) if size > 0 else b''
+        position += len(data)
+        buffer = pending + data
+        previous = None
+        for match in PACKET_BLOCK.finditer(buffer):
+            if previous is not None:
+                yield previous.group(1).decode('utf-8'), buffer, previous.end(1), previous.end()
+            previous = match
+        if not data:
+            if previous is not None:
+                yield previous.group(1).decode('utf-8'), buffer, previous.end(1), previous.end()
+            return
+        # Le dernier paquet peut continuer dans le bloc suivant : il attend la suite
+        pending = buffer[previous.start():] if previous is not None else b''
+
+
+def decode_payload(buffer, start, end):
+    """Octets du paquet à partir de son vidage hexadécimal (colonne ASCII de -X ignorée)"""
+    return binascii.unhexlify(b''.join(match.group(1) for match in HEX_LINE.finditer(buffer, start, end))
+                              .replace(b' ', b''))
+
+
+def _update_packet(state, line, buffer, start, end):
+    """Met à jour l'état avec un paquet ; le vidage n'est décodé que si une règle le demande"""
+    record = tokenize_line(line)
+    if not record:
+        return
+    _add_record(state, record)
+    if state['options']['payload_rules']:
+        _inspect_payload(state, record, buffer, start, end)
+
+
+def _inspect_payload(state, record, buffer, start, end):
+    """Applique les règles sur le contenu au paquet, dont le vidage est bloc[début:fin]"""
+    payload = None
+    for wants, inspect in state['options']['payload_rules']:
+        if wants(record):
+            if payload is None:
+                payload = decode_payload(buffer, start, end)
+            anomaly = inspect(record, payload)
+            if anomaly:
+                _report(state, [anomaly])
+
+
+def _follow_packets(state, data, final=False):
+    """
+    Mode suivi : met à jour l'état avec les paquets des lignes complètes de `data` et renvoie
+    le reste, à compléter par la suite du fichier. Le dernier paquet attend l'en-tête suivant
+    (son vidage hexadécimal n'est peut-être pas entièrement écrit), sauf si `final`.
+    """
+    cut = data.rfind(b'\n') + 1
+    previous = None
+    for match in PACKET_BLOCK.finditer(data, 0, cut):
+        if previous is not None:
+            _update_packet(state, previous.group(1).decode('utf-8', errors='replace'), data,
+                           previous.end(1), previous.end())
+        previous = match
+    if previous is None:
+        return data[cut:]
+    if not final:
+        return data[previous.start():]
+    _update_packet(state, previous.group(1).decode('utf-8', errors='replace'), data, previous.end(1), previous.end())
+    return data[cut:]
+
+
+def _read_packets(state, file, end=None):
+    """Met à jour l'état avec les paquets du fichier, de la position courante jusqu'à `end`"""
+    metrics = state['metrics']
+    if metrics is None:
+        for packet in _iter_packets(file, end):
+            _update_packet(state, *packet)
+        return
+    start = file.tell()
+    _update_packets_measured(state, _iter_packets(file, end), metrics)
+    metrics.count('bytes', file.tell() - start)
+
+
+def _update_packets_measured(state, packets, metrics):
+    """
+    _update_packet sur chaque paquet, en chronométrant à part la lecture du fichier (blocs et
+    découpage en paquets), le décodage de l'en-tête et la mise à jour des compteurs et des
+    détecteurs ; compte aussi les lignes lues et les en-têtes non reconnus.
+    """
+    clock = time.perf_counter
+    payload_rules = state['options']['payload_rules']
+    read = parse = count = 0.0
+    lines = failures = 0
+    previous = clock()
+    for line, buffer, start, end in packets:
+        fetched = clock()
+        record = tokenize_line(line)
+        parsed = clock()
+        # L'en-tête et chaque ligne du vidage se terminent par un saut de ligne (sauf en fin de fichier)
+        lines += buffer.count(b'\n', start, end) or 1
+        if record:
+            _add_record(state, record)
+            if payload_rules:
+                _inspect_payload(state, record, buffer, start, end)
+        else:
+            failures += 1
+        read += fetched - previous
+        parse += parsed - fetched
+        previous = clock()
+        count += previous - parsed
+    # Fin du fichier : la dernière lecture compte aussi
+    read += clock() - previous
+    metrics.add_time('read', read)
+    metrics.add_time('parse', parse)
+    metrics.add_time('count', count)
+    metrics.count('lines', lines)
+    metrics.count('parse_failures', failures)
+
+
+def _build_stats(state):
+    """Construit le dictionnaire de statistiques à partir de l'état de l'analyse"""
+    duration = (state['last_us'] - state['first_us']) / 1000000 if state['packets'] else 0
+    if state['ip_sources'] is None:
+        stats = _make_stats(state['packets'], duration, state['protocols'], len(state['ip_src']),
+                            len(state['services']), state['anomalies'])
+    else:
+        stats = _make_stats(state['packets'], duration, state['protocols'], len(state['ip_sources']),
+                            len(state['services']), state['anomalies'], _sketch_estimates(state))
+    # Nombre de paquets reconnus par chaque règle
+    stats['rule_hits'] = dict(state['rule_hits'].most_common())
+    ip_counts = state['ip_src'] if state['ip_sources'] is None else state['ip_src'].counts
+    stats['subnet_counts'] = subnet_counts(ip_counts, state['options'])
+    stats['timeseries'] = state['timeseries'].summary(state['options']['timeseries_top'])
+    return stats
+
+
+def subnet_counts(ip_counts, options=None):
+    """
+    Regroupe les paquets par IP source en paquets par sous-réseau : le réseau le plus
+    spécifique de l'option `subnets` qui contient l'adresse, sinon son /`subnet_prefix`.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    subnets = _network_index(options['subnets'])
+    counts = Counter()
+    for host, count in ip_counts.items():
+        network = (subnets.lookup(host) if subnets is not None else None) or subnet_of(host, options['subnet_prefix'])
+        if network is not None:
+            counts[network] += count
+    return dict(counts.most_common())
+
+
+def _sketch_estimates(state):
+    """Valeurs estimées par les sketches, avec leur marge d'erreur"""
+    services, ip_sources, ip_src = state['services'], state['ip_sources'], state['ip_src']
+    estimates = [
+        {'label': 'Services distincts (HyperLogLog)', 'value': len(services),
+         'error': f"±{services.relative_error*100:.1f}%"},
+        {'label': 'IPs sources distinctes (HyperLogLog)', 'value': len(ip_sources),
+         'error': f"±{ip_sources.relative_error*100:.1f}%"},
+    ]
+    for ip, count, error in ip_src.top(10):
+        estimates.append({'label': f'Top talker {ip} (Space-Saving)', 'value': count,
+                          'error': f"surestimé d'au plus {error} paquets"})
+    return estimates
+
+
+def _make_stats(packets_count, duration, protocol_counts, ip_source_count, service_count, anomalies,
+                estimates=None):
+    """
+    Construit le dictionnaire de statistiques consommé par les rapports HTML et CSV.
+    `estimates` (mode sketch) liste les valeurs approchées et leur marge d'erreur.
+    """
+    ips_suspectes = {anomaly['ip_source'] for anomaly in anomalies}
+    # Débit moyen sur la durée réelle de la capture (au moins une seconde)
+    packets_rate = packets_count / max(duration, 1)
+
+    # Mise à jour des statistiques avec les compteurs d'anomalies
+    total_anomalies = len(anomalies)
+    stats = {
+        'network_stats': {
+            'packets_analyzed': packets_count,
+            'packets_rate': f"{packets_rate:.1f}/s",
+            'anomalies': {
+                'count': total_anomalies,
+                'percentage': f"{(total_anomalies/packets_count*100) if packets_count else 0:.1f}%"
             },
-            'protocol_distribution': protocol_counts,
-            'detected_anomalies': anomalies_trafic
+            'suspicious_ips': {
+                'count': len(ips_suspectes),
+                'percentage': f"{(len(ips_suspectes)/ip_source_count*100) if ip_source_count else 0:.1f}%"
+            },
+            'services': {
+                'count': service_count,
+                'percentage': estimates[0]['error'] if estimates else '-'
+            }
+        },
+        'protocol_distribution': protocol_counts,
+        'detected_anomalies': anomalies
+    }
+    if estimates:
+        stats['estimates'] = estimates
+
+    return stats
+
+
+def _merge_states(state, other):
+    """
+    Fusionne l'état partiel `other` (plage suivante du fichier) dans `state`.
+    Les compteurs s'additionnent et les anomalies se concatènent ; les détecteurs
+    gardent leur propre historique.
+    """
+    state['packets'] += other['packets']
+    offset = 0
+    if other['packets']:
+        if state['first_us'] is None:
+            state['first_us'] = other['first_us']
+            state['last_us'] = other['last_us']
+        else:
+            # Chaque plage a sa propre horloge : on la recale si minuit est passé entre-temps
+            while other['first_us'] + offset < state['last_us'] - MICROSECONDS_PER_DAY // 2:
+                offset += MICROSECONDS_PER_DAY
+            state['last_us'] = other['last_us'] + offset
+    state['timeseries'].merge(other['timeseries'], offset)
+    if state['ip_sources'] is None:
+        state['services'] |= other['services']
+        state['ip_src'].update(other['ip_src'])
+    else:
+        state['services'].merge(other['services'])
+        state['ip_src'].merge(other['ip_src'])
+        state['ip_sources'].merge(other['ip_sources'])
+    state['protocols'].update(other['protocols'])
+    state['rule_hits'].update(other['rule_hits'])
+    # Résolutions DNS des processus de travail : le cache est écrit une fois, par le processus principal
+    if state['names'] is not None and other.get('names') is not None:
+        state['names'].merge(other['names'])
+    # Une source interdite n'est signalée qu'une fois, même si elle apparaît dans plusieurs plages
+    seen = state['denied_seen']
+    state['anomalies'].extend(anomaly for anomaly in other['anomalies']
+                              if anomaly['type'] != 'Liste noire' or anomaly['ip_source'] not in seen)
+    seen |= other['denied_seen']
+    # Les états d'un lot reviennent des processus sans les clés dérivées
+    metrics = other.get('metrics')
+    if metrics is not None:
+        if state['metrics'] is None:
+            state['metrics'] = metrics
+        else:
+            state['metrics'].merge(metrics)
+    return state
+
+
+def _next_packet_offset(file, offset):
+    """Renvoie la position du premier en-tête de paquet (ligne sans tabulation) après `offset`"""
+    if offset == 0:
+        return 0
+    file.seek(offset - 1)
+    # Ligne éventuellement coupée en deux : on la laisse au morceau précédent
+    position = offset - 1 + len(file.readline())
+    while True:
+        line = file.readline()
+        if not line or not line.startswith(b'\t'):
+            return position
+        position += len(line)
+
+
+def _split_file(file_path, chunks, start=0, end=None):
+    """Découpe le fichier (ou ses octets start:end) en plages qui commencent toutes sur un en-tête de paquet"""
+    end = os.path.getsize(file_path) if end is None else end
+    with open(file_path, 'rb') as file:
+        offsets = sorted({_next_packet_offset(file, start + (end - start) * i // chunks) for i in range(chunks)})
+    return [(first, last) for first, last in zip(offsets, offsets[1:] + [end]) if first < last]
+
+
+def _analyze_range(task):
+    """Analyse une plage d'octets du fichier (exécuté dans un processus de travail)"""
+    file_path, start, end, options = task
+    state = _new_state(options)
+    state['metrics'] = _new_metrics(options)
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        _read_packets(state, file, end)
+    return state
+
+
+def _analyze_parallel(file_path, workers=None, options=None, start=0, end=None, state=None):
+    """
+    Répartit l'analyse du fichier sur plusieurs processus puis fusionne les résultats
+    (dans `state` s'il est fourni, par exemple celui d'un point de reprise).
+    Les compteurs sont exacts, mais chaque plage a son propre détecteur de pics et sa propre
+    table des flux : les fenêtres glissantes et les flux repartent de zéro au début de chaque
+    plage, si bien que les anomalies sont approchées (pics manqués ou en plus, attaque à cheval
+    sur deux plages signalée deux fois).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    # Plus de morceaux que de processus pour équilibrer la charge
+    tasks = [(file_path, first, last, options) for first, last in _split_file(file_path, workers * 4, start, end)]
+    state = state or _new_state(options)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() rend les résultats dans l'ordre du fichier : l'ordre des compteurs est conservé
+        for partial in executor.map(_analyze_range, tasks):
+            _merge_states(state, partial)
+    # Cache DNS complété par les résolutions de tous les processus
+    if state['names'] is not None:
+        state['names'].save()
+    return state
+
+
+# Ports des services nommés par tcpdump (complété par /etc/services via socket)
+WELL_KNOWN_PORTS = {
+    'ftp-data': 20, 'ftp': 21, 'ssh': 22, 'telnet': 23, 'smtp': 25, 'domain': 53,
+    'bootps': 67, 'bootpc': 68, 'tftp': 69, 'http': 80, 'kerberos': 88, 'pop3': 110,
+    'sunrpc': 111, 'ntp': 123, 'netbios-ns': 137, 'netbios-dgm': 138, 'netbios-ssn': 139,
+    'imap': 143, 'snmp': 161, 'snmp-trap': 162, 'ldap': 389, 'https': 443,
+    'microsoft-ds': 445, 'syslog': 514, 'ldaps': 636, 'imaps': 993, 'pop3s': 995,
+    'openvpn': 1194, 'ms-sql-s': 1433, 'ssdp': 1900, 'hsrp': 1985, 'nfs': 2049,
+    'mysql': 3306, 'ms-wbt-server': 3389, 'gvcp': 3956, 'mdns': 5353, 'llmnr': 5355,
+    'postgresql': 5432, 'http-alt': 8080,
+}
+# Sens inverse pour les captures binaires : numéro de port -> nom affiché par tcpdump
+PORT_NAMES = {number: name for name, number in WELL_KNOWN_PORTS.items()}
+
+def _port_number(port):
+    """Numéro de port (16 bits) à partir du champ tcpdump, 0 si inconnu"""
+    if port is None:
+        return 0
+    if port.isdigit():
+        return int(port)
+    number = WELL_KNOWN_PORTS.get(port)
+    if number is None:
+        try:
+            number = socket.getservbyname(port)
+        except OSError:
+            number = 0
+        WELL_KNOWN_PORTS[port] = number
+    return number
+
+
+def _port_name(number):
+    """Port de la table -> champ tcpdump normalisé (nom du service ou numéro), None pour 0"""
+    if not number:
+        return None
+    return PORT_NAMES.get(number) or str(number)
+
+
+@lru_cache(maxsize=None)
+def _rule_set(rules_path):
+    """Règles compilées une seule fois par fichier (None : règles par défaut)"""
+    return RuleSet(load_rules(rules_path) if rules_path else DEFAULT_RULES, _port_number)
+
+
+def _network_index(networks):
+    """Index CIDR d'une option (liste de réseaux ou chemin d'un fichier), None si elle est vide"""
+    if not networks:
+        return None
+    return _cached_network_index(networks if isinstance(networks, str) else tuple(networks))
+
+
+@lru_cache(maxsize=None)
+def _cached_network_index(networks):
+    return CidrIndex(read_networks(networks) if isinstance(networks, str) else networks)
+
+
+def _name_resolver(options):
+    """Normalisation des noms selon les options (partagée par les états d'une même analyse)"""
+    if not options['normalize_names']:
+        return None
+    return _cached_name_resolver(options['hosts_file'], options['services_file'], options['resolve_names'],
+                                 options['name_cache'], options['name_cache_size'])
+
+
+@lru_cache(maxsize=None)
+def _cached_name_resolver(hosts_file, services_file, resolve, cache_file, cache_size):
+    return NameResolver(read_hosts(hosts_file) if hosts_file else None,
+                        read_services(services_file) if services_file else None,
+                        _port_number, PORT_NAMES, resolve, cache_file, cache_size)
+
+
+def _open_export(options, append=False):
+    """Exporteur des paquets de l'option `export`, ou None"""
+    if not options['export']:
+        return None
+    # sqlite3 (et pyarrow) ne sont chargés que si l'export est demandé
+    from export import open_exporter
+    return open_exporter(options['export'], options['export_batch_size'], append)
+
+
+def _new_metrics(options):
+    """Instrumentation demandée par les options (metrics, profile_stage), ou None"""
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    if not (options['metrics'] or options['profile_stage']):
+        return None
+    return Metrics(options['profile_stage'])
+
+
+def _ipv4_to_int(host):
+    """Adresse IPv4 sur 32 bits, -1 si l'hôte n'est pas une adresse IPv4 numérique"""
+    if not _is_ipv4(host):
+        return -1
+    a, b, c, d = host.split('.')
+    return (int(a) << 24) | (int(b) << 16) | (int(c) << 8) | int(d)
+
+
+class PacketTable:
+    """
+    Table de paquets stockée par colonnes (module array) au lieu d'une liste de dict.
+    Les types, hôtes, protocoles et drapeaux sont internés : chaque colonne ne contient que
+    des entiers de petite taille (environ 28 octets par paquet).
+    """
+
+    def __init__(self):
+        self.timestamps = array('q')   # microsecondes depuis minuit du premier jour
+        self.kind = array('B')         # code de type (IP, IP6, ARP...)
+        self.src_host = array('I')     # code d'hôte (0 = pas d'hôte)
+        self.dst_host = array('I')
+        self.src_port = array('H')     # 0 = pas de port
+        self.dst_port = array('H')
+        self.protocol = array('H')     # code de protocole (élargi à 32 bits au-delà de 65 536 codes)
+        self.flags = array('B')        # code de drapeaux TCP (0 = aucun, élargi au-delà de 256 codes)
+        self.length = array('I')
+
+        self.hosts = ['']              # code -> nom ou adresse de l'hôte
+        self.host_ipv4 = array('q', [-1])  # code -> adresse IPv4 sur 32 bits (-1 si ce n'est pas une IPv4)
+        self.kind_names = []           # code -> type de paquet
+        self.protocols = []            # code -> nom du protocole
+        self.service_codes = set()     # codes de protocole qui sont des ports de destination
+        self.flag_names = ['']         # code -> drapeaux TCP
+        self._host_codes = {}
+        self._kind_codes = {}
+        self._protocol_codes = {}
+        self._flag_codes = {}
+        self._clock = TimestampClock()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _host_code(self, host):
+        if host is None:
+            return 0
+        code = self._host_codes.get(host)
+        if code is None:
+            code = self._host_codes[host] = len(self.hosts)
+            self.hosts.append(host)
+            self.host_ipv4.append(_ipv4_to_int(host))
+        return code
+
+    def _kind_code(self, kind):
+        code = self._kind_codes.get(kind)
+        if code is None:
+            code = self._kind_codes[kind] = len(self.kind_names)
+            self.kind_names.append(kind)
+            self.kind = _widened(self.kind, code)
+        return code
+
+    def _protocol_code(self, protocol):
+        code = self._protocol_codes.get(protocol)
+        if code is None:
+            code = self._protocol_codes[protocol] = len(self.protocols)
+            self.protocols.append(protocol)
+            self.protocol = _widened(self.protocol, code)
+        return code
+
+    def _flag_code(self, flags):
+        if flags is None:
+            return 0
+        code = self._flag_codes.get(flags)
+        if code is None:
+            code = self._flag_codes[flags] = len(self.flag_names)
+            self.flag_names.append(flags)
+            self.flags = _widened(self.flags, code)
+        return code
+
+    def append(self, record):
+        """Ajoute un PacketRecord à la table"""
+        timestamp = self._clock.to_us(record.timestamp)
+        # Codes calculés avant les append : un nouveau code peut élargir sa colonne
+        kind = self._kind_code(record.kind)
+        protocol = self._protocol_code(record.protocol)
+        flags = self._flag_code(record.flags)
+        if record.dst_port is not None:
+            self.service_codes.add(protocol)
+
+        self.timestamps.append(timestamp)
+        self.kind.append(kind)
+        self.src_host.append(self._host_code(record.src_host))
+        self.dst_host.append(self._host_code(record.dst_host))
+        self.src_port.append(_port_number(record.src_port))
+        self.dst_port.append(_port_number(record.dst_port))
+        self.protocol.append(protocol)
+        self.flags.append(flags)
+        self.length.append(record.length)
+
+    def record(self, index):
+        """PacketRecord de la ligne `index` (ports sous leur nom canonique, comme en streaming)"""
+        hosts = self.hosts
+        src_port, dst_port = self.src_port[index], self.dst_port[index]
+        return PacketRecord(format_us(self.timestamps[index]), self.kind_names[self.kind[index]],
+                            hosts[self.src_host[index]] or None, _port_name(src_port),
+                            hosts[self.dst_host[index]] or None, _port_name(dst_port),
+                            self.protocols[self.protocol[index]], self.flag_names[self.flags[index]] or None,
+                            self.length[index])
+
+    def to_numpy(self):
+        """Colonnes sous forme de tableaux NumPy (vues sans copie sur les array)"""
+        import numpy as np
+        return {name: np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode)
+                for name, column in self._columns().items()}
+
+    def _columns(self):
+        return {
+            'timestamps': self.timestamps, 'kind': self.kind, 'src_host': self.src_host, 'dst_host': self.dst_host,
+            'src_port': self.src_port, 'dst_port': self.dst_port, 'protocol': self.protocol,
+            'flags': self.flags, 'length': self.length,
         }
 
-        return stats
+    def memory_usage(self):
+        """Taille en octets des colonnes de la table"""
+        return sum(column.itemsize * len(column) for column in self._columns().values())
+
+
+def _widened(column, code):
+    """La colonne de codes, copiée sur 32 bits si `code` dépasse la capacité de son type"""
+    if column.typecode != 'I' and code >= 1 << (8 * column.itemsize):
+        return array('I', column)
+    return column
+
+
+def read_pcap_records(file_path):
+    """Paquets d'une capture binaire pcap/pcapng, sous forme de PacketRecord"""
+    for timestamp, fields in iter_pcap_packets(file_path, PORT_NAMES):
+        yield PacketRecord(timestamp, *fields)
+
+
+def build_packet_table(file_path, options=None):
+    """
+    Lit un fichier tcpdump (texte ou capture pcap/pcapng) et renvoie la table de ses paquets.
+    Avec l'option `export`, les paquets sont aussi écrits dans le fichier d'export.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    table = PacketTable()
+    names = _name_resolver(options)
+    if is_pcap_file(file_path):
+        records = read_pcap_records(file_path)
+    else:
+        records = _read_text_records(file_path)
+    exporter = _open_export(options)
+    try:
+        for record in records:
+            if names is not None:
+                record = names.normalize(record)
+            table.append(record)
+            if exporter is not None:
+                exporter.add(record, table.timestamps[-1])
+    finally:
+        if exporter is not None:
+            exporter.close()
+    if names is not None:
+        names.save()
+    return table
+
+
+def _read_text_records(file_path):
+    with open(file_path, 'rb') as file:
+        for line, _, _, _ in _iter_packets(file):
+            record = tokenize_line(line)
+            if record:
+                yield record
+
+
+def table_statistics(table):
+    """
+    Agrégats de la table calculés sur des colonnes entières avec NumPy/pandas :
+    paquets par protocole et par IP source, services distincts.
+    """
+    import numpy as np
+    import pandas as pd
+    columns = table.to_numpy()
+    src_host = columns['src_host']
+    protocol = columns['protocol']
+    packets_count = len(table)
+
+    # Paquets par protocole : les codes sont attribués dans l'ordre d'apparition
+    protocol_totals = np.bincount(protocol, minlength=len(table.protocols))
+    protocol_counts = Counter(dict(zip(table.protocols, protocol_totals.tolist())))
+
+    # Paquets par IP source (groupby sans tri : ordre de première apparition)
+    is_ipv4 = np.frombuffer(table.host_ipv4, dtype=np.int64)[src_host] >= 0
+    per_host = pd.Series(src_host[is_ipv4]).groupby(src_host[is_ipv4], sort=False).size()
+    hosts = table.hosts
+    ip_counts = Counter({hosts[code]: int(count) for code, count in per_host.items()})
+
+    service_count = int(np.isin(np.flatnonzero(protocol_totals), list(table.service_codes)).sum())
+
+    return {
+        'packets': packets_count,
+        'duration': (int(columns['timestamps'][-1]) - int(columns['timestamps'][0])) / 1000000 if packets_count else 0,
+        'protocol_counts': protocol_counts,
+        'ip_counts': ip_counts,
+        'service_count': service_count,
+    }
+
+
+def table_spikes(table, options=None):
+    """Passe les paquets qui ont une source (adresse ou nom) dans le détecteur de pics à fenêtres glissantes"""
+    import numpy as np
+    state = _new_state(options)
+    detector = state['spike_detector']
+    columns = table.to_numpy()
+    src_host = columns['src_host']
+    observed = src_host != 0
+    hosts = table.hosts
+    if state['allow_list'] is not None:
+        # Les sources de confiance ne passent pas dans le détecteur de pics
+        allowed = np.array([host in state['allow_list'] for host in hosts], dtype=bool)
+        observed &= ~allowed[src_host]
+    anomalies = []
+    for code, timestamp_us in zip(src_host[observed].tolist(), columns['timestamps'][observed].tolist()):
+        spikes = detector.observe(hosts[code], timestamp_us)
+        if spikes:
+            anomalies.extend(spikes)
+    return anomalies
+
+
+def table_flows(table, options=None):
+    """Passe les paquets TCP de la table dans la table des flux (SYN flood, balayages, RST)"""
+    import numpy as np
+    flow_table = _new_state(options)['flow_table']
+    columns = table.to_numpy()
+    tcp = np.flatnonzero(columns['flags'])
+    hosts, flag_names = table.hosts, table.flag_names
+    anomalies = []
+    for timestamp_us, src, sport, dst, dport, flags in zip(
+            columns['timestamps'][tcp].tolist(), columns['src_host'][tcp].tolist(),
+            columns['src_port'][tcp].tolist(), columns['dst_host'][tcp].tolist(),
+            columns['dst_port'][tcp].tolist(), columns['flags'][tcp].tolist()):
+        # Ports sous leur nom canonique : les anomalies citent les mêmes services qu'en streaming
+        record = PacketRecord(format_us(timestamp_us), 'IP', hosts[src], _port_name(sport), hosts[dst],
+                              _port_name(dport), None, flag_names[flags], 0)
+        attacks = flow_table.observe(record, timestamp_us)
+        if attacks:
+            anomalies.extend(attacks)
+    return anomalies
+
+
+def table_denied(table, deny_list):
+    """Première apparition de chaque source de la liste noire, dans l'ordre de la capture"""
+    import numpy as np
+    columns = table.to_numpy()
+    codes, first = np.unique(columns['src_host'], return_index=True)
+    anomalies = []
+    for code, index in sorted(zip(codes.tolist(), first.tolist()), key=lambda item: item[1]):
+        host = table.hosts[code]
+        network = deny_list.lookup(host) if code else None
+        if network is not None:
+            anomalies.append(_denied_anomaly(host, network, format_us(int(columns['timestamps'][index]))))
+    return anomalies
+
+
+def table_rules(table, rules):
+    """
+    Applique un RuleSet à la table. Les règles ne consultent que quelques colonnes (rules.fields) :
+    chaque combinaison distincte de ces colonnes n'est évaluée qu'une fois, sur sa première ligne.
+    Renvoie (paquets reconnus par règle, anomalies des règles d'alerte dans l'ordre de la capture).
+    """
+    import numpy as np
+    rule_hits = Counter()
+    if not len(table):
+        return rule_hits, []
+    columns = table.to_numpy()
+    if rules.fields:
+        keys = np.stack([columns[field].astype(np.int64) for field in rules.fields], axis=1)
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    else:
+        first, inverse = np.zeros(1, dtype=np.int64), np.zeros(len(table), dtype=np.int64)
+    counts = np.bincount(inverse).tolist()
+
+    alerting = []
+    for combination, index in enumerate(first.tolist()):
+        hits = rules.match(table.record(index))
+        for rule in hits:
+            rule_hits[rule.name] += counts[combination]
+        if any(rule.alert for rule in hits):
+            alerting.append(combination)
+
+    anomalies = []
+    for index in np.flatnonzero(np.isin(inverse, alerting)).tolist():
+        record = table.record(index)
+        anomalies.extend(_rule_anomaly(rule, record) for rule in rules.match(record) if rule.alert)
+    return rule_hits, anomalies
+
+
+def table_timeseries(table, options=None):
+    """Séries temporelles du débit (même format que TimeSeries.summary) calculées sur la table"""
+    import numpy as np
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    if not len(table):
+        return None
+    columns = table.to_numpy()
+    bucket_us = int(options['timeseries_bucket'] * 1000000)
+    index = columns['timestamps'] // bucket_us
+    start = int(index.min())
+    index -= start
+    size = int(index.max()) + 1
+    length = columns['length'].astype(np.int64)
+
+    def series(mask):
+        return np.bincount(index[mask], weights=length[mask], minlength=size).astype(np.int64).tolist()
+
+    # Protocoles et sources les plus actifs (en paquets), comme le classement Space-Saving du mode streaming
+    top = options['timeseries_top']
+    protocol_totals = np.bincount(columns['protocol'], minlength=len(table.protocols))
+    source_totals = np.bincount(columns['src_host'], minlength=len(table.hosts))
+    source_totals[0] = 0
+    return {
+        'bucket': options['timeseries_bucket'],
+        'start_us': start * bucket_us,
+        'packets': np.bincount(index, minlength=size).tolist(),
+        'bytes': np.bincount(index, weights=length, minlength=size).astype(np.int64).tolist(),
+        'protocols': {table.protocols[code]: series(columns['protocol'] == code)
+                      for code in np.argsort(-protocol_totals, kind='stable')[:top].tolist()},
+        'sources': {table.hosts[code]: series(columns['src_host'] == code)
+                    for code in np.argsort(-source_totals, kind='stable')[:top].tolist() if source_totals[code]},
+    }
+
+
+def _table_stats(table, options=None):
+    """Statistiques (même format que le mode streaming) calculées sur la table"""
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    allow_list, deny_list = _network_index(options['allow_list']), _network_index(options['deny_list'])
+    aggregates = table_statistics(table)
+    rule_hits, rule_anomalies = table_rules(table, _rule_set(options['rules']))
+    anomalies = screen_anomalies(table_spikes(table, options) + table_flows(table, options) + rule_anomalies,
+                                 allow_list, deny_list)
+    if deny_list is not None:
+        anomalies = anomalies + table_denied(table, deny_list)
+    stats = _make_stats(aggregates['packets'], aggregates['duration'], aggregates['protocol_counts'],
+                        len(aggregates['ip_counts']), aggregates['service_count'], anomalies)
+    stats['rule_hits'] = dict(rule_hits.most_common())
+    stats['subnet_counts'] = subnet_counts(aggregates['ip_counts'], options)
+    stats['timeseries'] = table_timeseries(table, options)
+    return stats
+
+
+def analyze_tcpdump(file_path, mode='streaming', workers=None, options=None):
+    """
+    Analyse un fichier tcpdump : sortie texte ou capture binaire pcap/pcapng.
+    `options` surcharge DEFAULT_OPTIONS (fenêtres et seuils de détection des pics).
+    mode='streaming' : lecture ligne par ligne, seuls les compteurs restent en mémoire.
+    mode='parallel' : le fichier est découpé en plages analysées par `workers` processus ;
+    les compteurs sont exacts, les anomalies approchées aux limites des plages.
+    mode='table' : les paquets sont chargés dans une PacketTable en colonnes.
+    mode='pcap' : les en-têtes d'une capture binaire sont décodés directement.
+    Avec l'option checkpoint (modes streaming et parallel), une nouvelle analyse du même
+    fichier ne lit que les données ajoutées depuis la précédente.
+    Avec l'option export (tous les modes sauf parallel), les paquets décodés sont écrits
+    dans une base SQLite ou un fichier Parquet/Feather, interrogeable sans relire la capture.
+    Une capture pcap/pcapng est reconnue à son en-tête et lue sans passer par le texte,
+    quel que soit le mode (le mode parallel la lit alors en un seul passage).
+    """
+    try:
+        if mode not in ('streaming', 'parallel', 'table', 'pcap'):
+            raise ValueError(f"Mode d'analyse inconnu: {mode}")
+
+        metrics = _new_metrics(options)
+        if mode == 'table':
+            if (options or {}).get('sketch'):
+                raise ValueError("Le mode sketch ne s'applique pas au mode table (les colonnes sont déjà exactes)")
+            if (options or {}).get('payload_rules'):
+                raise ValueError("Les règles sur le contenu (payload_rules) ne s'appliquent pas au mode table : "
+                                 "la table ne garde pas le vidage hexadécimal")
+            with measure_stage(metrics, 'analyze'):
+                table = build_packet_table(file_path, options)
+            if metrics is not None:
+                metrics.count('table_bytes', table.memory_usage())
+            with measure_stage(metrics, 'stats'):
+                stats = _table_stats(table, options)
+            return _attach_metrics(stats, metrics)
+        elif mode == 'pcap' or is_pcap_file(file_path):
+            if (options or {}).get('payload_rules'):
+                raise ValueError("Les règles sur le contenu (payload_rules) s'appliquent au vidage hexadécimal "
+                                 "de la sortie texte de tcpdump -X, pas aux captures pcap")
+            state = _new_state(options)
+            state['export'] = _open_export(state['options'])
+            state['metrics'] = metrics
+            try:
+                with measure_stage(metrics, 'analyze'):
+                    for record in read_pcap_records(file_path):
+                        _add_record(state, record)
+            finally:
+                if state['export'] is not None:
+                    state['export'].close()
+        else:
+            with measure_stage(metrics, 'analyze'):
+                state = _analyze_text(file_path, mode, workers, options, metrics)
+
+        if state['names'] is not None:
+            state['names'].save()
+        with measure_stage(metrics, 'stats'):
+            stats = _build_stats(state)
+        return _attach_metrics(stats, metrics)
 
     except Exception as e:
         print(f"Erreur lors de l'analyse du fichier: {str(e)}")
         return None
 
 
-def generate_protocol_chart(protocol_counts):
-    """Génère un graphique camembert des 10 protocoles les plus utilisés"""
-    plt.figure(figsize=(10, 7))
+def _attach_metrics(stats, metrics):
+    """Complète l'instrumentation avec les totaux de l'analyse et la joint aux statistiques"""
+    if metrics is not None:
+        metrics.counters['packets'] = stats['network_stats']['packets_analyzed']
+        metrics.counters['anomalies'] = stats['network_stats']['anomalies']['count']
+        stats['metrics'] = metrics
+    return stats
+
+
+def _analyze_text(file_path, mode='streaming', workers=None, options=None, metrics=None):
+    """
+    Analyse d'un fichier texte en mode streaming ou parallel. Avec l'option checkpoint,
+    l'analyse repart du point de reprise de l'exécution précédente : seules les données
+    ajoutées depuis sont lues, puis le point de reprise est mis à jour.
+    `metrics` reçoit les durées de lecture, de décodage et de comptage (voir metrics.py).
+    """
+    merged = {**DEFAULT_OPTIONS, **(options or {})}
+    checkpoint = merged['checkpoint']
+    state, start, end = None, 0, None
+    if checkpoint:
+        state, start = _load_checkpoint(file_path, merged)
+        # Une ligne en cours d'écriture attend le prochain passage
+        end = _complete_size(file_path)
+
+    if mode == 'parallel':
+        if merged['export']:
+            raise ValueError("L'export des paquets n'est pas disponible en mode parallel")
+        state = _analyze_parallel(file_path, workers, options, start, end, state)
+        # Durées et compteurs des processus de travail
+        if metrics is not None and state['metrics'] is not None:
+            metrics.merge(state['metrics'])
+        state['metrics'] = metrics
+    else:
+        state = state or _new_state(options)
+        # Une analyse reprise complète l'export de la précédente
+        state['export'] = _open_export(merged, append=start > 0)
+        state['metrics'] = metrics
+        try:
+            with open(file_path, 'rb') as file:
+                file.seek(start)
+                _read_packets(state, file, end)
+        finally:
+            if state['export'] is not None:
+                state['export'].close()
+
+    if checkpoint:
+        _save_checkpoint(file_path, merged, state, end)
+    return state
+
+
+# Version du format des points de reprise, et clés de l'état reconstruites à partir
+# des options (règles compilées, index CIDR, noms, export, instrumentation) plutôt qu'enregistrées
+CHECKPOINT_VERSION = 2
+DERIVED_STATE_KEYS = ('rules', 'allow_list', 'deny_list', 'names', 'export', 'metrics')
+
+
+def _checkpoint_path(file_path, checkpoint):
+    return checkpoint if isinstance(checkpoint, str) else file_path + '.checkpoint'
+
+
+def _checkpoint_options(options):
+    """Options qui doivent être identiques pour reprendre une analyse"""
+    return {name: value for name, value in options.items() if name not in INSTRUMENTATION_OPTIONS}
+
+
+def _file_fingerprint(file_path, size=4096):
+    """Empreinte du début du fichier : détecte un fichier remplacé (rotation) plutôt que complété"""
+    with open(file_path, 'rb') as file:
+        return hashlib.blake2b(file.read(size), digest_size=16).hexdigest()
+
+
+def _complete_size(file_path):
+    """Taille du fichier jusqu'à sa dernière fin de ligne"""
+    position = os.path.getsize(file_path)
+    with open(file_path, 'rb') as file:
+        while position > 0:
+            step = min(65536, position)
+            file.seek(position - step)
+            index = file.read(step).rfind(b'\n')
+            if index >= 0:
+                return position - step + index + 1
+            position -= step
+    return 0
+
+
+def _load_checkpoint(file_path, options):
+    """État et position enregistrés par la dernière analyse, ou (None, 0) s'ils ne sont pas réutilisables"""
+    path = _checkpoint_path(file_path, options['checkpoint'])
+    try:
+        with open(path, 'rb') as file:
+            saved = pickle.load(file)
+    except FileNotFoundError:
+        return None, 0
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        print(f"Point de reprise illisible ({e}), analyse depuis le début")
+        return None, 0
+    if (saved.get('version') != CHECKPOINT_VERSION or saved['options'] != _checkpoint_options(options)
+            or os.path.getsize(file_path) < saved['offset']
+            or _file_fingerprint(file_path, saved['fingerprint_size']) != saved['fingerprint']):
+        # Fichier remplacé ou réglages modifiés : les compteurs ne sont plus comparables
+        return None, 0
+    state = _new_state(options)
+    state.update(saved['state'])
+    return state, saved['offset']
+
+
+def _save_checkpoint(file_path, options, state, offset):
+    """Enregistre l'état et la position atteinte (écriture atomique à côté du fichier analysé)"""
+    path = _checkpoint_path(file_path, options['checkpoint'])
+    fingerprint_size = min(offset, 4096)
+    saved = {
+        'version': CHECKPOINT_VERSION,
+        'options': _checkpoint_options(options),
+        'offset': offset,
+        'fingerprint_size': fingerprint_size,
+        'fingerprint': _file_fingerprint(file_path, fingerprint_size),
+        'state': {key: value for key, value in state.items() if key not in DERIVED_STATE_KEYS},
+    }
+    with open(path + '.tmp', 'wb') as file:
+        pickle.dump(saved, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+# Fichiers écrits par l'analyseur (reprise, export, mesures, rapports, caches) : un dossier
+# ou un motif glob qui les contient ne les prend pas pour des captures
+OUTPUT_SUFFIXES = ('.checkpoint', '.tmp', '.db', '.sqlite', '.parquet', '.feather', '.json', '.prom', '.prof',
+                   '.html', '.csv', '.png')
+
+
+def _collect_inputs(inputs):
+    """
+    Fichiers à analyser : motif glob, dossier ou liste de chemins, triés par nom (ordre chronologique).
+    Les fichiers produits par l'analyseur (OUTPUT_SUFFIXES) sont écartés des dossiers et des motifs ;
+    un chemin donné explicitement est toujours analysé.
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in os.listdir(item)
+                         if os.path.isfile(os.path.join(item, name)) and not name.lower().endswith(OUTPUT_SUFFIXES))
+        elif glob.has_magic(item):
+            paths.extend(path for path in glob.glob(item)
+                         if os.path.isfile(path) and not path.lower().endswith(OUTPUT_SUFFIXES))
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+def _analyze_file(task):
+    """Analyse complète d'un fichier du lot (exécuté dans un processus de travail)"""
+    file_path, options = task
+    try:
+        if is_pcap_file(file_path):
+            state = _new_state(options)
+            for record in read_pcap_records(file_path):
+                _add_record(state, record)
+        else:
+            state = _analyze_text(file_path, 'streaming', None, options)
+    except Exception as e:
+        return file_path, None, str(e)
+    # Seuls les compteurs, les anomalies et les noms résolus repartent vers le processus principal
+    return file_path, {key: value for key, value in state.items()
+                       if key not in DERIVED_STATE_KEYS or key == 'names'}, None
+
+
+def analyze_batch(inputs, workers=None, options=None):
+    """
+    Analyse un lot de fichiers (motif glob, dossier ou liste de chemins), un fichier par
+    processus. Renvoie {'merged': statistiques globales, 'files': {fichier: statistiques},
+    'errors': {fichier: message}} ; les fichiers sont fusionnés dans l'ordre de leur nom.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    if (options or {}).get('export'):
+        raise ValueError("L'export des paquets se fait fichier par fichier, pas sur un lot")
+    paths = _collect_inputs(inputs)
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    state = _new_state(options)
+    files, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_path, partial, error in executor.map(_analyze_file, [(path, options) for path in paths]):
+            if partial is None:
+                print(f"Erreur lors de l'analyse du fichier {file_path}: {error}")
+                errors[file_path] = error
+                continue
+            files[file_path] = _build_stats(partial)
+            _merge_states(state, partial)
+    if state['names'] is not None:
+        state['names'].save()
+    return {'merged': _build_stats(state), 'files': files, 'errors': errors}
+
+
+def write_batch_reports(result, output_dir='rapports', html=True):
+    """
+    Écrit les rapports d'un lot dans `output_dir` : rapport global (HTML si `html`, et CSV),
+    un CSV par fichier et une synthèse d'une ligne par fichier.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    generate_reports(result['merged'], os.path.join(output_dir, 'rapport_global.html'),
+                     os.path.join(output_dir, 'rapport_global.csv'), html=html, open_browser=False)
+
+    summary = [['Fichier', 'Paquets analysés', 'Débit', 'Anomalies', 'IPs suspectes', 'Services']]
+    for file_path, stats in result['files'].items():
+        name = os.path.basename(file_path)
+        generate_csv_report(stats, os.path.join(output_dir, f'{name}.csv'))
+        network = stats['network_stats']
+        summary.append([name, network['packets_analyzed'], network['packets_rate'],
+                        network['anomalies']['count'], network['suspicious_ips']['count'],
+                        network['services']['count']])
+    for file_path, error in result['errors'].items():
+        summary.append([os.path.basename(file_path), 'Erreur', error, '', '', ''])
+    with open(os.path.join(output_dir, 'synthese_fichiers.csv'), 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(summary)
+    return output_dir
+
+
+def query_packets(store_path, host=None, port=None, protocol=None, start=None, end=None, options=None):
+    """
+    Paquets d'une capture exportée en SQLite (option export) qui vérifient tous les filtres,
+    renvoyés au fil de la lecture dans l'ordre de la capture, sous forme de PacketRecord.
+    host : adresse ou nom, en source ou en destination ; port : numéro ou nom de service,
+    en source ou en destination ; protocol : tel qu'il apparaît dans les statistiques ;
+    start, end : heures "HH:MM[:SS[.ffffff]]" incluses.
+    Les noms sont aussi cherchés sous leur forme canonique, comme à l'export (voir names.py).
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    names = _name_resolver(options)
+
+    def variants(value, canonical):
+        if value is None:
+            return None
+        value = str(value)
+        return sorted({value, canonical(value)}) if names is not None else [value]
+
+    hosts = variants(host, names and names.host)
+    ports = variants(port, names and names.service)
+    protocols = variants(protocol, names and names.service)
+    # sqlite3 n'est chargé que pour interroger une base
+    from query import PacketStore
+    with PacketStore(store_path) as store:
+        start_us = store.resolve_clock(parse_clock(start)) if start else None
+        end_us = store.resolve_clock(parse_clock(end)) if end else None
+        for row in store.select(hosts, ports, protocols, start_us, end_us):
+            yield PacketRecord(*row[1:])
+
+
+def analyze_query(store_path, options=None, **filters):
+    """Statistiques (même format que analyze_tcpdump) des paquets sélectionnés par query_packets"""
+    state = _new_state(options)
+    for record in query_packets(store_path, options=options, **filters):
+        _add_record(state, record)
+    return _build_stats(state)
+
+
+def _print_live_stats(stats, window_stats):
+    """Affiche un résumé des statistiques du mode suivi"""
+    total = stats['network_stats']
+    window = window_stats['network_stats']
+    print(f"[{time.strftime('%H:%M:%S')}] {total['packets_analyzed']} paquets "
+          f"({window['packets_analyzed']} sur la fenêtre glissante), "
+          f"{total['anomalies']['count']} anomalies, {total['services']['count']} services")
+
+
+def follow_tcpdump(file_path, interval=60, window=5, callback=_print_live_stats,
+                   poll_interval=0.5, duration=None, options=None):
+    """
+    Suit un fichier tcpdump en cours d'écriture (comme tail -f, par exemple avec tcpdump -l).
+    Les nouvelles lignes mettent à jour les compteurs sans relire le fichier depuis le début.
+    Toutes les `interval` secondes, callback(stats, window_stats) reçoit les statistiques
+    cumulées et celles des `window` derniers intervalles (fenêtre glissante). Un paquet n'est
+    compté qu'à l'arrivée du suivant, quand son vidage hexadécimal est complet.
+    S'arrête après `duration` secondes, ou avec Ctrl+C, et renvoie les statistiques cumulées.
+    """
+    state = _new_state(options)
+    # Les états par intervalle partagent le détecteur de pics, la table des flux et l'horloge
+    # de l'état cumulé : un intervalle qui commence après minuit garde le décalage d'un jour
+    detector, flows, clock = state['spike_detector'], state['flow_table'], state['clock']
+    interval_state = _new_state(options, detector, flows, clock)
+    recent = deque(maxlen=window)
+    pending = b''
+    position = 0
+    started = next_emit = time.monotonic()
+    next_emit += interval
+
+    file = open(file_path, 'rb')
+    try:
+        while duration is None or time.monotonic() - started < duration:
+            chunk = file.read(1 << 20)
+            if chunk:
+                position += len(chunk)
+                # Même découpage en paquets que _iter_packets : les règles sur le contenu s'appliquent
+                pending = _follow_packets(interval_state, pending + chunk)
+            else:
+                if os.path.getsize(file_path) < position:
+                    # Fichier tronqué ou remplacé (rotation) : on repart du début
+                    _follow_packets(interval_state, pending, final=True)
+                    file.close()
+                    file = open(file_path, 'rb')
+                    position, pending = 0, b''
+                time.sleep(poll_interval)
+
+            if time.monotonic() >= next_emit:
+                next_emit += interval
+                _merge_states(state, interval_state)
+                recent.append(interval_state)
+                interval_state = _new_state(options, detector, flows, clock)
+                if callback:
+                    window_state = _new_state(options, detector, flows, clock)
+                    for past in recent:
+                        _merge_states(window_state, past)
+                    callback(_build_stats(state), _build_stats(window_state))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        file.close()
+        if state['names'] is not None:
+            state['names'].save()
+
+    _follow_packets(interval_state, pending, final=True)
+    return _build_stats(_merge_states(state, interval_state))
+
+
+def _figure(**kwargs):
+    """
+    Figure matplotlib créée sans pyplot : matplotlib n'est chargé qu'au premier graphique
+    et le rendu PNG passe par Agg (sans affichage).
+    """
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+
+# Graphiques déjà rendus, indexés par l'empreinte des données dessinées
+_chart_cache = {}
+
+
+def _chart_key(protocol_counts):
+    top_10_protocols = sorted(protocol_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    return hashlib.blake2b(repr(top_10_protocols).encode(), digest_size=16).hexdigest()
+
+
+def _cached_chart(key, render, cache_dir=None):
+    """
+    Graphique (PNG en base64) d'empreinte `key` : cache en mémoire, puis dans `cache_dir`
+    s'il est donné (réutilisé d'une exécution à l'autre), sinon rendu par render().
+    """
+    chart = _chart_cache.get(key)
+    if chart is not None:
+        return chart
+    cache_file = os.path.join(cache_dir, f'{key}.b64') if cache_dir else None
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='ascii') as f:
+            chart = _chart_cache[key] = f.read()
+        return chart
+    chart = _chart_cache[key] = render()
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, 'w', encoding='ascii') as f:
+            f.write(chart)
+    return chart
+
+
+def generate_protocol_chart(protocol_counts, cache_dir=None):
+    """
+    Génère un graphique camembert des 10 protocoles les plus utilisés (PNG en base64).
+    Le rendu est mis en cache selon l'empreinte de la distribution (voir _cached_chart).
+    """
+    return _cached_chart(_chart_key(protocol_counts), lambda: _draw_protocol_chart(protocol_counts), cache_dir)
+
+
+def _draw_protocol_chart(protocol_counts):
+    figure = _figure(figsize=(10, 7))
+    axes = figure.subplots()
     
     colors = ['#FF9999', '#66B2FF', '#99FF99', '#FFCC99', '#FF99CC', 
              '#99FFCC', '#FFB366', '#FF99FF', '#99CCFF', '#FFB3B3']
@@ -117,23 +1750,91 @@ def generate_protocol_chart(protocol_counts):
     # Prendre les 10 protocoles les plus fréquents
     top_10_protocols = dict(sorted(protocol_counts.items(), key=lambda x: x[1], reverse=True)[:10])
     
-    plt.pie(top_10_protocols.values(),
-            labels=top_10_protocols.keys(),
-            autopct='%1.1f%%',
-            colors=colors[:len(top_10_protocols)])
-    plt.title('Top 10 des Protocoles les Plus Utilisés')
+    # Sans paquet, pas de camembert (matplotlib refuse des parts toutes nulles)
+    if any(top_10_protocols.values()):
+        axes.pie(top_10_protocols.values(),
+                 labels=top_10_protocols.keys(),
+                 autopct='%1.1f%%',
+                 colors=colors[:len(top_10_protocols)])
+    axes.set_title('Top 10 des Protocoles les Plus Utilisés')
     
-    plt.tight_layout()
+    figure.tight_layout()
     
-    return plot_to_base64()
+    return plot_to_base64(figure)
+
+
+def throughput_peaks(timeseries):
+    """Pics de débit (paquets/s, octets/s) sur un intervalle, et heure de début de cet intervalle"""
+    bucket = timeseries['bucket']
+    packets, octets = timeseries['packets'], timeseries['bytes']
+    peak = max(range(len(octets)), key=octets.__getitem__)
+    return {
+        'packets': max(packets) / bucket,
+        'bytes': octets[peak] / bucket,
+        'bytes_at': format_us(timeseries['start_us'] + peak * int(bucket * 1000000))[:8],
+    }
+
+
+def generate_throughput_chart(timeseries, cache_dir=None):
+    """
+    Génère les courbes de débit dans le temps (PNG en base64) : paquets/s au total, octets/s
+    par protocole (empilés) et octets/s des principales sources. Mis en cache comme le camembert.
+    """
+    key = hashlib.blake2b(repr(sorted(timeseries.items())).encode(), digest_size=16).hexdigest()
+    return _cached_chart(key, lambda: _draw_throughput_chart(timeseries), cache_dir)
+
+
+def _throughput_chart(stats, cache_dir=None):
+    """Courbes de débit des statistiques, ou '' si elles n'ont pas de série temporelle"""
+    timeseries = stats.get('timeseries')
+    return generate_throughput_chart(timeseries, cache_dir) if timeseries else ''
+
 
-def plot_to_base64():
+def _draw_throughput_chart(timeseries):
+    from matplotlib.ticker import FuncFormatter, MaxNLocator
+    bucket = timeseries['bucket']
+    start_us = timeseries['start_us']
+    # Abscisses en secondes depuis minuit, affichées en heure HH:MM:SS. Chaque intervalle est
+    # tracé en palier sur toute sa durée (un point de fin est ajouté après le dernier)
+    times = [start_us / 1000000 + index * bucket for index in range(len(timeseries['packets']) + 1)]
+    clock = FuncFormatter(lambda seconds, _: format_us(int(seconds * 1000000))[:8])
+
+    def rate(values):
+        return [value / bucket for value in values] + [values[-1] / bucket]
+
+    figure = _figure(figsize=(10, 10))
+    packets_axes, protocol_axes, source_axes = figure.subplots(3, 1, sharex=True)
+
+    packets_axes.plot(times, rate(timeseries['packets']), color='#4285f4', drawstyle='steps-post')
+    packets_axes.set_title('Paquets par seconde')
+
+    protocols = timeseries['protocols']
+    others = [total - sum(values) for total, values in zip(timeseries['bytes'], zip(*protocols.values()))] \
+        if protocols else timeseries['bytes']
+    protocol_axes.stackplot(times, *[rate(values) for values in protocols.values()], rate(others),
+                            labels=[*protocols, 'autres'], step='post')
+    protocol_axes.set_title('Octets par seconde, par protocole')
+    protocol_axes.legend(loc='upper left', fontsize='small')
+
+    for source, values in timeseries['sources'].items():
+        source_axes.plot(times, rate(values), label=source, drawstyle='steps-post')
+    source_axes.set_title('Octets par seconde des principales sources')
+    if timeseries['sources']:
+        source_axes.legend(loc='upper left', fontsize='small')
+    source_axes.xaxis.set_major_locator(MaxNLocator(integer=True))
+    source_axes.xaxis.set_major_formatter(clock)
+    for axes in (packets_axes, protocol_axes, source_axes):
+        axes.set_ylim(bottom=0)
+
+    figure.tight_layout()
+    return plot_to_base64(figure)
+
+def plot_to_base64(figure):
     buffer = BytesIO()
-    plt.savefig(buffer, format='png')
+    figure.savefig(buffer, format='png')
     buffer.seek(0)
     image_png = buffer.getvalue()
     buffer.close()
-    plt.close()
     return base64.b64encode(image_png).decode()
 
 def generate_csv_report(stats, output_file='rapport_analyse.csv'):
@@ -164,6 +1865,21 @@ def generate_csv_report(stats, output_file='rapport_analyse.csv'):
             f"{(percentage/stats['network_stats']['packets_analyzed'])*100:.1f}%"
         ])
 
+    # Pics de débit (dimensionnement des liens)
+    if stats.get('timeseries'):
+        peaks = throughput_peaks(stats['timeseries'])
+        csv_content.append(['Pic de débit', f"{peaks['bytes']:.0f} octets/s", f"à {peaks['bytes_at']}"])
+        csv_content.append(['Pic de débit', f"{peaks['packets']:.0f} paquets/s",
+                            f"intervalles de {stats['timeseries']['bucket']:g} s"])
+
+    # Valeurs estimées par les sketches et leur marge d'erreur
+    for estimate in stats.get('estimates', []):
+        csv_content.append([
+            'Estimation',
+            estimate['label'],
+            f"{estimate['value']} ({estimate['error']})"
+        ])
+
     # Ajouter les anomalies détectées
     for i, anomaly in enumerate(stats['detected_anomalies'], 1):
         csv_content.append([
@@ -178,20 +1894,17 @@ def generate_csv_report(stats, output_file='rapport_analyse.csv'):
     
     return output_file
 
-# Usage dans le main:
-# stats = analyze_tcpdump(file_path)
-# if stats:
-#     csv_file = generate_csv_report(stats)
-#     print(f"Rapport CSV généré: {csv_file}")
+# Gabarits du rapport HTML : les lignes du tableau des anomalies sont écrites une à une
+# dans le fichier, sans construire la page en mémoire
+REPORT_PAGE_SIZE = 10000
 
-def generate_html_report(stats):
-    html_content = f"""
+REPORT_HEAD = """
     <!DOCTYPE html>
     <html lang="fr">
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Rapport d'analyse du trafic réseau</title>
+        <title>{title}</title>
         <style>
             :root {{
                 --primary-color: #4285f4;
@@ -338,6 +2051,11 @@ def generate_html_report(stats):
                 background-color: rgba(220, 53, 69, 0.1);
             }}
 
+            .pagination {{
+                margin: 1rem 0;
+                text-align: center;
+            }}
+
             @media (max-width: 768px) {{
                 body {{
                     padding: 1rem;
@@ -359,85 +2077,399 @@ def generate_html_report(stats):
     </head>
     <body>
         <div class="container">
-            <h1>Rapport d'analyse du trafic réseau</h1>
-            
+            <h1>{title}</h1>
+"""
+
+REPORT_ANOMALIES_HEAD = """
+            <div class="stats-section">
+                <h2>{heading}</h2>
+                {navigation}
+                <table class="anomalies-table">
+                    <tr>
+                        <th>Timestamp</th>
+                        <th>IP Source</th>
+                        <th>Type</th>
+                        <th>Détails</th>
+                        <th>Niveau</th>
+                    </tr>
+"""
+
+def _report_row(anomaly):
+    # f-string plutôt que str.format : c'est la boucle chaude quand les anomalies se comptent par centaines de milliers.
+    # Noms d'hôtes, services et détails viennent de la capture : ils sont échappés.
+    return f"""
+                    <tr>
+                        <td>{escape(str(anomaly['timestamp']))}</td>
+                        <td>{escape(str(anomaly['ip_source']))}</td>
+                        <td>{escape(str(anomaly['type']))}</td>
+                        <td>{escape(str(anomaly['details']))}</td>
+                        <td class="level-high">{escape(str(anomaly['level']))}</td>
+                    </tr>
+        """
+
+REPORT_TAIL = """
+                </table>
+                {navigation}
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def _page_file(output_file, page):
+    """Fichier de la page `page` des anomalies (la première est le rapport lui-même)"""
+    if page == 1:
+        return output_file
+    root, extension = os.path.splitext(output_file)
+    return f'{root}_anomalies_{page}{extension or ".html"}'
+
+
+def _page_navigation(output_file, page, pages):
+    if pages <= 1:
+        return ''
+    links = []
+    if page > 1:
+        links.append(f'<a href="{escape(os.path.basename(_page_file(output_file, page - 1)))}">&laquo; Précédente</a>')
+    links.append(f'Page {page}/{pages}')
+    if page < pages:
+        links.append(f'<a href="{escape(os.path.basename(_page_file(output_file, page + 1)))}">Suivante &raquo;</a>')
+    if page > 1:
+        links.append(f'<a href="{escape(os.path.basename(output_file))}">Rapport</a>')
+    return '<p class="pagination">' + ' | '.join(links) + '</p>'
+
+
+def _write_anomaly_page(file, anomalies, output_file, page, pages, page_size):
+    navigation = _page_navigation(output_file, page, pages)
+    heading = 'Anomalies détectées' if pages <= 1 else f'Anomalies détectées (page {page}/{pages})'
+    file.write(REPORT_ANOMALIES_HEAD.format(heading=heading, navigation=navigation))
+    first = (page - 1) * page_size
+    file.writelines(map(_report_row, anomalies[first:first + page_size]))
+    file.write(REPORT_TAIL.format(navigation=navigation))
+
+
+def _remove_stale_pages(output_file, pages):
+    # Pages laissées par un rapport précédent plus long
+    page = pages + 1
+    while os.path.exists(_page_file(output_file, page)):
+        os.remove(_page_file(output_file, page))
+        page += 1
+
+
+def generate_reports(stats, html_file='rapport_projet_final.html', csv_file='rapport_analyse.csv',
+                     html=True, open_browser=True, chart_cache_dir=None, page_size=REPORT_PAGE_SIZE):
+    """
+    Produit les rapports d'une analyse, chaque étape une seule fois : le CSV est écrit dans
+    un thread pendant que les graphiques sont dessinés, puis le HTML (qui intègre les graphiques
+    et renvoie vers le CSV). Renvoie la liste des fichiers écrits.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    metrics = stats.get('metrics')
+    if not html:
+        return [measure_call(metrics, 'csv_report', generate_csv_report, stats, csv_file)]
+    with measure_stage(metrics, 'import_matplotlib'):
+        import matplotlib.figure
+        import matplotlib.ticker
+    # Chaque étape est chronométrée dans son thread ; 'reports' est la durée totale.
+    # matplotlib ne garantit pas le rendu simultané de deux figures, même sans pyplot :
+    # les graphiques sont dessinés l'un après l'autre, seul le CSV s'écrit en parallèle.
+    with measure_stage(metrics, 'reports'), ThreadPoolExecutor(max_workers=1) as executor:
+        csv_stage = executor.submit(measure_call, metrics, 'csv_report', generate_csv_report, stats, csv_file)
+        chart = measure_call(metrics, 'protocol_chart', generate_protocol_chart,
+                             stats['protocol_distribution'], chart_cache_dir)
+        throughput = measure_call(metrics, 'throughput_chart', _throughput_chart, stats, chart_cache_dir)
+        html_output = measure_call(metrics, 'html_report', generate_html_report, stats, html_file, csv_file,
+                                   False, chart, page_size, throughput)
+        outputs = [csv_stage.result(), html_output]
+    if open_browser:
+        import webbrowser
+        webbrowser.open('file://' + os.path.realpath(html_file))
+    return outputs
+
+
+def generate_html_report(stats, output_file='rapport_projet_final.html', csv_file='rapport_analyse.csv',
+                         open_browser=True, chart=None, page_size=REPORT_PAGE_SIZE, throughput_chart=None):
+    """
+    Écrit le rapport HTML, qui renvoie vers le rapport CSV `csv_file` (écrit par generate_reports).
+    `chart`, `throughput_chart` : graphiques déjà rendus (base64), sinon ils sont générés ici.
+    Au-delà de `page_size` anomalies, le tableau est découpé en pages liées entre elles
+    (rapport_anomalies_2.html, ...) pour que le navigateur puisse encore ouvrir le rapport.
+    """
+    if chart is None:
+        chart = generate_protocol_chart(stats['protocol_distribution'])
+    if throughput_chart is None:
+        throughput_chart = _throughput_chart(stats)
+    title = "Rapport d'analyse du trafic réseau"
+    anomalies = stats['detected_anomalies']
+    pages = max(1, -(-len(anomalies) // page_size))
+    # Débit dans le temps, si la capture contient des paquets
+    throughput_html = ''
+    if throughput_chart:
+        peaks = throughput_peaks(stats['timeseries'])
+        throughput_html = f"""
+            <div class="charts-section">
+                <h2>Débit dans le temps (pic : {peaks['bytes']:.0f} octets/s à {escape(str(peaks['bytes_at']))}, {peaks['packets']:.0f} paquets/s)</h2>
+                <img src="data:image/png;base64,{throughput_chart}" alt="Débit dans le temps">
+            </div>
+"""
+    # Section des estimations, seulement en mode sketch
+    estimates_html = ''
+    if stats.get('estimates'):
+        rows = ''.join(f"""
+                    <tr>
+                        <td>{escape(str(estimate['label']))}</td>
+                        <td>{escape(str(estimate['value']))}</td>
+                        <td>{escape(str(estimate['error']))}</td>
+                    </tr>""" for estimate in stats['estimates'])
+        estimates_html = f"""
+            <div class="stats-section">
+                <h2>Estimations (mode sketch)</h2>
+                <table class="anomalies-table">
+                    <tr>
+                        <th>Mesure</th>
+                        <th>Valeur estimée</th>
+                        <th>Marge d'erreur</th>
+                    </tr>{rows}
+                </table>
+            </div>
+"""
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(REPORT_HEAD.format(title=title))
+        f.write(f"""
             <div class="stats-overview">
                 <div class="stat-card">
                     <h3>Paquets analysés</h3>
                     <div class="value" style="color: var(--primary-color);">{stats['network_stats']['packets_analyzed']}</div>
-                    <div class="subvalue">{stats['network_stats']['packets_rate']}</div>
+                    <div class="subvalue">{escape(str(stats['network_stats']['packets_rate']))}</div>
                 </div>
                 
                 <div class="stat-card">
                     <h3>Anomalies</h3>
                     <div class="value" style="color: var(--danger-color);">{stats['network_stats']['anomalies']['count']}</div>
-                    <div class="subvalue">{stats['network_stats']['anomalies']['percentage']}</div>
+                    <div class="subvalue">{escape(str(stats['network_stats']['anomalies']['percentage']))}</div>
                 </div>
                 
                 <div class="stat-card">
                     <h3>IPs suspectes</h3>
                     <div class="value" style="color: var(--warning-color);">{stats['network_stats']['suspicious_ips']['count']}</div>
-                    <div class="subvalue">{stats['network_stats']['suspicious_ips']['percentage']}</div>
+                    <div class="subvalue">{escape(str(stats['network_stats']['suspicious_ips']['percentage']))}</div>
                 </div>
                 
                 <div class="stat-card">
                     <h3>Services</h3>
                     <div class="value" style="color: var(--success-color);">{stats['network_stats']['services']['count']}</div>
-                    <div class="subvalue">{stats['network_stats']['services']['percentage']}</div>
+                    <div class="subvalue">{escape(str(stats['network_stats']['services']['percentage']))}</div>
                 </div>
             </div>
 
             <div class="charts-section">
-                <a href= "{generate_csv_report(stats)}"><img src="data:image/png;base64,{generate_protocol_chart(stats['protocol_distribution'])}" 
+                <a href= "{escape(os.path.basename(csv_file))}"><img src="data:image/png;base64,{chart}" 
                      alt="Distribution des protocoles"> </a>
             </div>
-            
-            <div class="stats-section">
-                <h2>Anomalies détectées</h2>
-                <table class="anomalies-table">
-                    <tr>
-                        <th>Timestamp</th>
-                        <th>IP Source</th>
-                        <th>Type</th>
-                        <th>Détails</th>
-                        <th>Niveau</th>
-                    </tr>
-    """
-    
-    for anomaly in stats['detected_anomalies']:
-        html_content += f"""
-                    <tr>
-                        <td>{anomaly['timestamp']}</td>
-                        <td>{anomaly['ip_source']}</td>
-                        <td>{anomaly['type']}</td>
-                        <td>{anomaly['details']}</td>
-                        <td class="level-high">{anomaly['level']}</td>
-                    </tr>
-        """
+            {throughput_html}{estimates_html}""")
+        _write_anomaly_page(f, anomalies, output_file, 1, pages, page_size)
 
-    html_content += """
-                </table>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    for page in range(2, pages + 1):
+        with open(_page_file(output_file, page), 'w', encoding='utf-8') as f:
+            f.write(REPORT_HEAD.format(title=title))
+            _write_anomaly_page(f, anomalies, output_file, page, pages, page_size)
+    _remove_stale_pages(output_file, pages)
 
-    with open('rapport_projet_final.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    webbrowser.open('file://' + os.path.realpath('rapport_projet_final.html'))
+    if open_browser:
+        import webbrowser
+        webbrowser.open('file://' + os.path.realpath(output_file))
+    return output_file
+
+
+
+def _parse_windows(text):
+    """"1,10,60" -> (1, 10, 60)"""
+    try:
+        windows = tuple(int(value) for value in text.split(',') if value.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fenêtres invalides: {text} (exemple: 1,10,60)")
+    if not windows or min(windows) <= 0:
+        raise argparse.ArgumentTypeError(f"fenêtres invalides: {text} (exemple: 1,10,60)")
+    return windows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Analyse de trafic réseau à partir de fichiers tcpdump (texte, pcap ou pcapng).",
+        epilog="Pour interroger une capture exportée avec --export: projet_final.py query --help")
+    parser.add_argument('inputs', nargs='*', default=['DumpFile05.txt'],
+                        help="fichier(s), dossier(s) ou motif(s) glob à analyser (défaut: DumpFile05.txt) ; "
+                             "plusieurs fichiers sont analysés en lot")
+    parser.add_argument('--html', default='rapport_projet_final.html', help="rapport HTML (défaut: %(default)s)")
+    parser.add_argument('--csv', default='rapport_analyse.csv', help="rapport CSV (défaut: %(default)s)")
+    parser.add_argument('--no-html', action='store_true', help="ne génère que le rapport CSV")
+    parser.add_argument('--output-dir', default='rapports', help="dossier des rapports d'un lot (défaut: %(default)s)")
+    parser.add_argument('--page-size', type=int, default=REPORT_PAGE_SIZE,
+                        help="anomalies par page du rapport HTML, les suivantes vont dans des pages liées "
+                             "(défaut: %(default)s)")
+    parser.add_argument('--chart-cache', help="dossier où garder les graphiques rendus d'une exécution à l'autre")
+    parser.add_argument('--no-browser', action='store_true',
+                        help="n'ouvre pas le rapport dans le navigateur (cron, serveurs)")
+    parser.add_argument('--mode', choices=('streaming', 'parallel', 'table', 'pcap'), default='streaming',
+                        help="mode d'analyse (défaut: %(default)s) ; en mode parallel, les anomalies sont "
+                             "approchées (détecteurs remis à zéro au début de chaque plage du fichier)")
+    parser.add_argument('--workers', type=int, help="nombre de processus (modes parallel et lot)")
+    parser.add_argument('--multiplier', type=float, dest='spike_multiplier',
+                        help=f"seuil des pics, en multiple de la moyenne (défaut: {DEFAULT_OPTIONS['spike_multiplier']})")
+    parser.add_argument('--windows', type=_parse_windows,
+                        help="fenêtres glissantes en secondes, séparées par des virgules (défaut: 1,10,60)")
+    parser.add_argument('--min-packets', type=int, dest='spike_min_packets',
+                        help=f"paquets minimum pour un pic (défaut: {DEFAULT_OPTIONS['spike_min_packets']})")
+    parser.add_argument('--bucket', type=float, dest='timeseries_bucket',
+                        help="durée en secondes des intervalles du débit dans le temps (défaut: 1, 60 pour une "
+                             "capture de plusieurs heures)")
+    parser.add_argument('--export', help="écrit les paquets décodés dans une base SQLite (.db) ou un fichier "
+                                         "Parquet/Feather (.parquet, .feather : pyarrow nécessaire)")
+    parser.add_argument('--metrics', action='store_true', default=None,
+                        help="chronomètre chaque étape et écrit les mesures dans <fichier>.metrics.json")
+    parser.add_argument('--prometheus', help="écrit aussi les mesures dans ce fichier, au format texte de Prometheus")
+    parser.add_argument('--profile', dest='profile_stage', choices=PROFILE_STAGES,
+                        help="exécute l'étape sous cProfile : profil dans <fichier>.<étape>.prof et résumé affiché")
+    parser.add_argument('--rules', help="fichier de règles JSON (voir regles.json)")
+    parser.add_argument('--allow-list', help="fichier des réseaux de confiance (un préfixe CIDR par ligne)")
+    parser.add_argument('--deny-list', help="fichier des réseaux interdits (un préfixe CIDR par ligne)")
+    parser.add_argument('--hosts', dest='hosts_file', help="table des noms d'hôtes (format /etc/hosts)")
+    parser.add_argument('--sketch', action='store_true', default=None, help="mode mémoire fixe (estimations)")
+    parser.add_argument('--checkpoint', action='store_true', default=None,
+                        help="reprend l'analyse là où la précédente s'est arrêtée")
+    parser.add_argument('--follow', action='store_true', help="suit le fichier en cours d'écriture (Ctrl+C pour arrêter)")
+    parser.add_argument('--interval', type=int, default=60, help="secondes entre deux résumés en mode suivi")
+    return parser
 
 
+def _options_from_args(args):
+    """Options d'analyse données sur la ligne de commande (les autres gardent leur valeur par défaut)"""
+    names = ('spike_multiplier', 'windows', 'spike_min_packets', 'timeseries_bucket', 'rules', 'allow_list',
+             'deny_list', 'hosts_file', 'sketch', 'checkpoint', 'export', 'metrics', 'profile_stage')
+    options = {name: getattr(args, name) for name in names if getattr(args, name) is not None}
+    if args.prometheus:
+        options['metrics'] = True
+    return options
 
-def main():
-    file_path = 'DumpFile05.txt'
-    stats = analyze_tcpdump(file_path)
-    if stats:
-        generate_html_report(stats)
-        generate_csv_report(stats)
+
+def write_metrics(metrics, args):
+    """Écrit les mesures demandées sur la ligne de commande (JSON, Prometheus, profil)"""
+    file_path = args.inputs[0]
+    metrics.info.update(file=os.path.basename(file_path), mode=args.mode,
+                        date=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    outputs = []
+    if args.metrics:
+        outputs.append(metrics.write_json(file_path + '.metrics.json'))
+    if args.prometheus:
+        outputs.append(metrics.write_prometheus(args.prometheus))
+    if args.profile_stage:
+        print(metrics.profile_summary())
+        outputs.append(metrics.write_profile(f'{file_path}.{args.profile_stage}.prof'))
+    return [output for output in outputs if output]
+
+
+def _clock_argument(text):
+    try:
+        parse_clock(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"heure invalide: {text} (exemple: 18:01 ou 18:01:30.5)")
+    return text
+
+
+def build_query_parser():
+    parser = argparse.ArgumentParser(
+        prog='projet_final.py query',
+        description="Interroge une capture exportée en SQLite (--export capture.db) sans la relire. "
+                    "Les paquets sélectionnés sont écrits en CSV sur la sortie standard.")
+    parser.add_argument('store', help="base SQLite produite par --export")
+    parser.add_argument('--host', help="adresse ou nom d'hôte, en source ou en destination")
+    parser.add_argument('--port', help="numéro ou nom de service, en source ou en destination")
+    parser.add_argument('--protocol', help="protocole (http, domain, ARP...)")
+    parser.add_argument('--from', dest='start', type=_clock_argument, help="heure de début incluse (HH:MM[:SS])")
+    parser.add_argument('--to', dest='end', type=_clock_argument, help="heure de fin incluse (HH:MM[:SS])")
+    parser.add_argument('--limit', type=int, help="nombre maximal de paquets affichés")
+    parser.add_argument('--report', action='store_true',
+                        help="génère les rapports HTML et CSV des paquets sélectionnés au lieu de les afficher")
+    parser.add_argument('--html', default='rapport_projet_final.html', help="rapport HTML (défaut: %(default)s)")
+    parser.add_argument('--csv', default='rapport_analyse.csv', help="rapport CSV (défaut: %(default)s)")
+    parser.add_argument('--no-html', action='store_true', help="ne génère que le rapport CSV")
+    parser.add_argument('--no-browser', action='store_true', help="n'ouvre pas le rapport dans le navigateur")
+    return parser
+
+
+def query_main(argv):
+    """Sous-commande query : paquets filtrés d'une capture exportée, ou rapports sur ces paquets"""
+    args = build_query_parser().parse_args(argv)
+    if not os.path.exists(args.store):
+        print(f"Base introuvable: {args.store}")
+        return 1
+    filters = {'host': args.host, 'port': args.port, 'protocol': args.protocol,
+               'start': args.start, 'end': args.end}
+    if args.report:
+        stats = analyze_query(args.store, **filters)
+        if not stats['network_stats']['packets_analyzed']:
+            print("Aucun paquet ne correspond aux filtres")
+            return 1
+        generate_reports(stats, args.html, args.csv, html=not args.no_html, open_browser=not args.no_browser)
+        return 0
+    writer = csv.writer(sys.stdout)
+    writer.writerow(PacketRecord._fields)
+    writer.writerows(islice(query_packets(args.store, **filters), args.limit))
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['query']:
+        return query_main(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.page_size < 1:
+        parser.error("--page-size doit être positif")
+    if args.timeseries_bucket is not None and args.timeseries_bucket <= 0:
+        parser.error("--bucket doit être positif")
+    options = _options_from_args(args)
+
+    batch = len(args.inputs) > 1 or os.path.isdir(args.inputs[0]) or glob.has_magic(args.inputs[0])
+    if args.export and (args.follow or batch):
+        print("L'export des paquets ne s'applique qu'à l'analyse d'un seul fichier")
+        return 1
+    if (args.metrics or args.prometheus or args.profile_stage) and (args.follow or batch):
+        print("Les mesures (--metrics, --prometheus, --profile) ne s'appliquent qu'à l'analyse d'un seul fichier")
+        return 1
+    if args.mode == 'table' and args.sketch and not (args.follow or batch):
+        print("Le mode table calcule des valeurs exactes : --sketch ne s'y applique pas")
+        return 1
+    if args.follow:
+        if len(args.inputs) != 1:
+            print("Le mode suivi ne prend qu'un seul fichier")
+            return 1
+        stats = follow_tcpdump(args.inputs[0], interval=args.interval, options=options)
+    elif batch:
+        result = analyze_batch(args.inputs, args.workers, options)
+        if not result['files']:
+            print("Erreur lors de l'analyse des données")
+            return 1
+        output_dir = write_batch_reports(result, args.output_dir, html=not args.no_html)
+        print(f"Rapports du lot générés dans {output_dir}")
+        return 1 if result['errors'] else 0
     else:
+        stats = analyze_tcpdump(args.inputs[0], args.mode, args.workers, options)
+
+    if not stats:
         print("Erreur lors de l'analyse des données")
+        return 1
+    if not stats['network_stats']['packets_analyzed']:
+        # Fichier vide ou sans en-tête reconnu : pas de rapport à produire
+        print("Erreur : aucun paquet analysé")
+        return 1
+    generate_reports(stats, args.html, args.csv, html=not args.no_html, open_browser=not args.no_browser,
+                     chart_cache_dir=args.chart_cache, page_size=args.page_size)
+    if stats.get('metrics') is not None:
+        for output in write_metrics(stats['metrics'], args):
+            print(f"Mesures écrites dans {output}")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Interrogation d'une capture exportée en SQLite (voir export.py) sans la parcourir en entier.
+Les paquets sont rangés dans l'ordre du temps ; l'index creux des blocs réduit un intervalle
+de temps à une plage de rowid, et les listes de blocs par hôte (postings) écartent les blocs
+où l'hôte n'apparaît pas. Seuls les blocs candidats sont lus, puis filtrés par SQLite."""
+
+import sqlite3
+from export import COLUMNS
+from timestamps import MICROSECONDS_PER_DAY
+
+
+def _block_ranges(blocks):
+    """Blocs candidats -> plages de rowid, les blocs consécutifs étant regroupés"""
+    ranges = []
+    previous = None
+    for block, first_rowid, last_rowid, _, _ in blocks:
+        if previous is not None and block == previous + 1:
+            ranges[-1][1] = last_rowid
+        else:
+            ranges.append([first_rowid, last_rowid])
+        previous = block
+    return ranges
+
+
+class PacketStore:
+    """
+    Base SQLite produite par l'export, ouverte en lecture seule.
+    select() renvoie au fil de la lecture les lignes (dans l'ordre de COLUMNS) qui vérifient
+    tous les filtres donnés ; les valeurs multiples d'un filtre (nom et adresse d'un hôte,
+    nom et numéro d'un port...) se combinent par OU.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        # L'index creux tient en mémoire : une entrée par bloc de BLOCK_ROWS paquets
+        self.blocks = self.connection.execute(
+            'SELECT block, first_rowid, last_rowid, min_us, max_us FROM blocks ORDER BY block').fetchall()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.blocks[-1][2] if self.blocks else 0
+
+    def time_bounds(self):
+        """(premier, dernier) horodatage de la capture en microseconde, ou None si elle est vide"""
+        if not self.blocks:
+            return None
+        return min(block[3] for block in self.blocks), max(block[4] for block in self.blocks)
+
+    def resolve_clock(self, clock_us):
+        """
+        Heure de la journée -> horodatage de la capture : une capture qui passe minuit compte
+        ses horodatages au-delà de 24 h, une heure antérieure au début désigne le lendemain.
+        """
+        bounds = self.time_bounds()
+        if bounds is not None:
+            while clock_us < bounds[0] - MICROSECONDS_PER_DAY // 2:
+                clock_us += MICROSECONDS_PER_DAY
+        return clock_us
+
+    def _host_blocks(self, hosts):
+        placeholders = ', '.join('?' * len(hosts))
+        return {block for (block,) in self.connection.execute(
+            f'SELECT block FROM postings WHERE host IN ({placeholders})', tuple(hosts))}
+
+    def candidate_blocks(self, hosts=None, start_us=None, end_us=None):
+        """Blocs qui peuvent contenir des paquets de l'intervalle et des hôtes demandés"""
+        blocks = [block for block in self.blocks
+                  if (start_us is None or block[4] >= start_us) and (end_us is None or block[3] <= end_us)]
+        if hosts:
+            postings = self._host_blocks(hosts)
+            blocks = [block for block in blocks if block[0] in postings]
+        return blocks
+
+    def select(self, hosts=None, ports=None, protocols=None, start_us=None, end_us=None):
+        conditions, parameters = [], []
+        if hosts:
+            placeholders = ', '.join('?' * len(hosts))
+            conditions.append(f'(src_host IN ({placeholders}) OR dst_host IN ({placeholders}))')
+            parameters += [*hosts, *hosts]
+        if ports:
+            placeholders = ', '.join('?' * len(ports))
+            conditions.append(f'(src_port IN ({placeholders}) OR dst_port IN ({placeholders}))')
+            parameters += [*ports, *ports]
+        if protocols:
+            conditions.append(f"protocol IN ({', '.join('?' * len(protocols))})")
+            parameters += protocols
+        if start_us is not None:
+            conditions.append('timestamp_us >= ?')
+            parameters.append(start_us)
+        if end_us is not None:
+            conditions.append('timestamp_us <= ?')
+            parameters.append(end_us)
+        where = ''.join(f' AND {condition}' for condition in conditions)
+        statement = f"SELECT {', '.join(COLUMNS)} FROM packets WHERE rowid BETWEEN ? AND ?{where} ORDER BY rowid"
+
+        for first_rowid, last_rowid in _block_ranges(self.candidate_blocks(hosts, start_us, end_us)):
+            yield from self.connection.execute(statement, (first_rowid, last_rowid, *parameters))
@@ -0,0 +1,154 @@
+"""Moteur de règles de détection : les règles sont décrites en JSON et compilées en une table
+de décision indexée par champ. Chaque règle correspond à un bit ; chaque champ donne, en une
+recherche (dictionnaire ou bisect), le masque des règles qu'il laisse passer. Le coût d'un
+paquet ne dépend donc pas du nombre de règles.
+
+Format d'une règle (tous les critères sont facultatifs et se combinent par ET) :
+    {"name": "Telnet", "dst_port": [23, "telnet"], "alert": true, "level": "MOYEN"}
+    - kind, protocol, flags : valeur ou liste de valeurs exactes ("S", "S.", "domain"...)
+    - src_port, dst_port : numéro, nom de service ou plage "1024-65535" (ou liste)
+    - length : nombre, plage "0-64" ou [min, max]
+    - src, dst : adresse ou réseau CIDR "10.0.0.0/8" (ou liste)
+    - alert : ajoute une anomalie à chaque paquet reconnu (sinon, simple comptage)
+    - level, details : niveau et texte de l'anomalie
+"""
+
+import json
+from bisect import bisect_right
+from collections import namedtuple
+from cidr import address_value, network_range
+
+Rule = namedtuple('Rule', ['name', 'alert', 'level', 'details'])
+
+# Règle par défaut : les drapeaux TCP signalés par l'ancienne version du script
+DEFAULT_RULES = [
+    {'name': 'Drapeaux TCP suspects', 'flags': ['S', 'S.', 'SF', 'P.']},
+]
+
+EQUALITY_FIELDS = ('kind', 'protocol', 'flags')
+# Champ de la règle -> attribut du PacketRecord
+RANGE_FIELDS = {'src_port': 'src_port', 'dst_port': 'dst_port', 'length': 'length',
+                'src': 'src_host', 'dst': 'dst_host'}
+RULE_KEYS = {'name', 'alert', 'level', 'details'} | set(EQUALITY_FIELDS) | set(RANGE_FIELDS)
+
+
+def _listify(value):
+    return value if isinstance(value, list) else [value]
+
+
+class RuleSet:
+    """
+    Règles compilées. match(record) renvoie le tuple des règles vérifiées par le paquet,
+    qui ne dépend que des attributs `fields` du record.
+    `port_number` convertit un port tcpdump ('http', '8080') en numéro.
+    """
+
+    def __init__(self, rules, port_number=int):
+        self.rules = []
+        self.port_number = port_number
+        equality = {field: [] for field in EQUALITY_FIELDS}
+        ranges = {field: [] for field in RANGE_FIELDS}
+
+        for bit, rule in enumerate(rules):
+            name = rule.get('name', f'Règle {bit + 1}')
+            unknown = set(rule) - RULE_KEYS
+            if unknown:
+                raise ValueError(f"Règle {name}: critère inconnu {', '.join(sorted(unknown))}")
+            self.rules.append(Rule(name, bool(rule.get('alert', False)), rule.get('level', 'MOYEN'),
+                                   rule.get('details')))
+            for field in EQUALITY_FIELDS:
+                if field in rule:
+                    equality[field].append((bit, [str(value) for value in _listify(rule[field])]))
+            for field in RANGE_FIELDS:
+                if field in rule:
+                    ranges[field].append((bit, self._parse_ranges(field, rule[field])))
+
+        everything = (1 << len(self.rules)) - 1
+        # Seuls les champs utilisés par au moins une règle sont consultés
+        self._equality = []
+        for field, constraints in equality.items():
+            if constraints:
+                free = everything
+                for bit, _ in constraints:
+                    free &= ~(1 << bit)
+                table = {}
+                for bit, values in constraints:
+                    for value in values:
+                        table[value] = table.get(value, free) | 1 << bit
+                self._equality.append((field, table, free))
+
+        self._ranges = []
+        for field, constraints in ranges.items():
+            if constraints:
+                free = everything
+                for bit, _ in constraints:
+                    free &= ~(1 << bit)
+                # Intervalles élémentaires délimités par les bornes de toutes les règles
+                boundaries = sorted({bound for _, intervals in constraints
+                                     for low, high in intervals for bound in (low, high + 1)})
+                masks = [free] * (len(boundaries) + 1)
+                for bit, intervals in constraints:
+                    for low, high in intervals:
+                        for index in range(bisect_right(boundaries, low), bisect_right(boundaries, high) + 1):
+                            masks[index] |= 1 << bit
+                self._ranges.append((RANGE_FIELDS[field], self._converter(field), boundaries, masks, free))
+
+        self._everything = everything
+        self._hits = {}
+        # Attributs du PacketRecord consultés par match() : le reste du paquet est sans effet
+        self.fields = tuple(field for field, _, _ in self._equality) + tuple(field for field, *_ in self._ranges)
+
+    def _parse_ranges(self, field, value):
+        """Critère d'un champ numérique -> liste d'intervalles [bas, haut] inclus"""
+        if field == 'length' and isinstance(value, list) and len(value) == 2 \
+                and all(isinstance(bound, int) for bound in value):
+            return [tuple(value)]
+        intervals = []
+        for item in _listify(value):
+            if field in ('src', 'dst'):
+                intervals.append(network_range(item))
+                continue
+            text = str(item)
+            if '-' in text:
+                low, high = text.split('-', 1)
+            else:
+                low = high = text
+            if field == 'length':
+                intervals.append((int(low), int(high)))
+            else:
+                intervals.append((self.port_number(low), self.port_number(high)))
+        return intervals
+
+    def _converter(self, field):
+        if field in ('src', 'dst'):
+            return address_value
+        if field == 'length':
+            return int
+        return self.port_number
+
+    def match(self, record):
+        mask = self._everything
+        for field, table, free in self._equality:
+            mask &= table.get(getattr(record, field), free)
+            if not mask:
+                return ()
+        for attribute, convert, boundaries, masks, free in self._ranges:
+            value = getattr(record, attribute)
+            if value is not None:
+                value = convert(value)
+            mask &= free if value is None else masks[bisect_right(boundaries, value)]
+            if not mask:
+                return ()
+        hits = self._hits.get(mask)
+        if hits is None:
+            hits = self._hits[mask] = tuple(rule for bit, rule in enumerate(self.rules) if mask >> bit & 1)
+        return hits
+
+
+def load_rules(file_path):
+    """Lit un fichier de règles JSON : une liste de règles, ou {"rules": [...]}"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        rules = json.load(file)
+    if isinstance(rules, dict):
+        rules = rules.get('rules', [])
+    return rules
@@ -0,0 +1,127 @@
+"""Structures probabilistes à mémoire fixe pour les captures à très forte cardinalité
+(balayages, adresses usurpées...)"""
+
+import hashlib
+import heapq
+import math
+
+
+def _hash64(key):
+    """Hachage 64 bits stable d'un processus à l'autre (contrairement à hash())"""
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    Estimation du nombre d'éléments distincts avec 2**precision registres d'un octet.
+    Erreur relative typique : 1,04 / sqrt(2**precision), soit 1,6 % pour precision=12.
+    S'utilise comme un set : add() et len().
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key):
+        h = _hash64(key)
+        bits = 64 - self.precision
+        index = h >> bits
+        rest = h & ((1 << bits) - 1)
+        # Rang du premier bit à 1 dans les bits restants
+        rank = bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Union avec un autre HyperLogLog de même précision"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Correction pour les petites cardinalités (comptage linéaire)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+    def __len__(self):
+        return int(round(self.estimate()))
+
+
+class SpaceSaving:
+    """
+    Top-k approché (algorithme Space-Saving) avec au plus `capacity` compteurs.
+    Chaque compte surestime la réalité d'au plus errors[clé] <= total / capacity.
+    Le plus petit compteur est retrouvé avec un tas mis à jour paresseusement.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []
+
+    def add(self, key, count=1):
+        """Compte `key` ; renvoie la clé évincée quand un compteur a dû être libéré"""
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+            return None
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (count, key))
+            return None
+
+        # Le tas peut contenir des comptes périmés : on les corrige jusqu'à trouver le vrai minimum
+        while True:
+            minimum, victim = heapq.heappop(self._heap)
+            if counts[victim] == minimum:
+                break
+            heapq.heappush(self._heap, (counts[victim], victim))
+        del counts[victim]
+        del self.errors[victim]
+        counts[key] = minimum + count
+        self.errors[key] = minimum
+        heapq.heappush(self._heap, (minimum + count, key))
+        return victim
+
+    def _floor(self):
+        """Compte minimal qu'une clé non suivie peut avoir eu"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        """Fusionne un autre résumé (par exemple celui d'une autre plage du fichier)"""
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = self.counts.get(key, floor) + other.counts.get(key, other_floor)
+            errors[key] = self.errors.get(key, floor) + other.errors.get(key, other_floor)
+        kept = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {key: counts[key] for key in kept}
+        self.errors = {key: errors[key] for key in kept}
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        self.total += other.total
+        return self
+
+    @property
+    def max_error(self):
+        return self.total / self.capacity
+
+    def top(self, n=10):
+        """Les n clés les plus fréquentes : [(clé, compte estimé, surestimation maximale)]"""
+        keys = sorted(self.counts, key=self.counts.get, reverse=True)[:n]
+        return [(key, self.counts[key], self.errors[key]) for key in keys]
+
+    def __len__(self):
+        return len(self.counts)
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Les modules de l'analyseur sont à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def capture(tmp_path_factory):
+    """Capture synthétique (vidage -X) avec tous les scénarios du générateur de benchmark"""
+    from benchmark import generate_capture
+    path = str(tmp_path_factory.mktemp('captures') / 'capture.txt')
+    generate_capture(path, packets=20000, seed=1)
+    return path
@@ -0,0 +1,83 @@
+import csv
+import os
+
+from projet_final import OUTPUT_SUFFIXES, _collect_inputs, analyze_batch, analyze_tcpdump, write_batch_reports
+
+
+def _split(capture, directory, parts=2):
+    """Découpe la capture en `parts` fichiers qui commencent chacun sur un en-tête de paquet"""
+    data = open(capture, 'rb').read()
+    cuts = [0]
+    for i in range(1, parts):
+        cut = data.index(b'\n', len(data) * i // parts) + 1
+        while data[cut:cut + 1] == b'\t':
+            cut = data.index(b'\n', cut) + 1
+        cuts.append(cut)
+    cuts.append(len(data))
+    paths = []
+    for i, (first, last) in enumerate(zip(cuts, cuts[1:])):
+        path = os.path.join(directory, f'capture_{i}.txt')
+        with open(path, 'wb') as file:
+            file.write(data[first:last])
+        paths.append(path)
+    return paths
+
+
+def _packets(stats):
+    return stats['network_stats']['packets_analyzed']
+
+
+def test_merged_and_per_file_counters(capture, tmp_path):
+    paths = _split(capture, str(tmp_path))
+    result = analyze_batch(str(tmp_path), workers=2)
+    assert list(result['files']) == paths and not result['errors']
+    whole = analyze_tcpdump(capture)
+    assert [_packets(stats) for stats in result['files'].values()] == [_packets(analyze_tcpdump(path))
+                                                                      for path in paths]
+    assert _packets(result['merged']) == _packets(whole)
+    assert result['merged']['protocol_distribution'] == whole['protocol_distribution']
+    assert result['merged']['rule_hits'] == whole['rule_hits']
+
+
+def test_unreadable_file(capture, tmp_path):
+    missing = str(tmp_path / 'absent.txt')
+    result = analyze_batch([capture, missing], workers=2)
+    assert list(result['files']) == [capture]
+    assert list(result['errors']) == [missing]
+    output_dir = write_batch_reports(result, str(tmp_path / 'rapports'), html=False)
+    rows = list(csv.reader(open(os.path.join(output_dir, 'synthese_fichiers.csv'), encoding='utf-8')))
+    assert [row[:2] for row in rows[1:]] == [['capture.txt', str(_packets(result['files'][capture]))],
+                                             ['absent.txt', 'Erreur']]
+    assert sorted(os.listdir(output_dir)) == ['capture.txt.csv', 'rapport_global.csv', 'synthese_fichiers.csv']
+
+
+def test_checkpoint_in_batch(capture, tmp_path):
+    first, second = _split(capture, str(tmp_path))
+    rest = open(second, 'rb').read()
+    # Le second fichier est encore en cours d'écriture lors du premier passage
+    half = rest.index(b'\n', len(rest) // 2) + 1
+    while rest[half:half + 1] == b'\t':
+        half = rest.index(b'\n', half) + 1
+    with open(second, 'wb') as file:
+        file.write(rest[:half])
+    analyze_batch(str(tmp_path), workers=2, options={'checkpoint': True})
+    assert os.path.exists(first + '.checkpoint') and os.path.exists(second + '.checkpoint')
+    with open(second, 'ab') as file:
+        file.write(rest[half:])
+    # Les points de reprise sont à côté des captures, mais ne sont pas analysés
+    result = analyze_batch(str(tmp_path), workers=2, options={'checkpoint': True})
+    assert list(result['files']) == [first, second]
+    assert _packets(result['merged']) == _packets(analyze_tcpdump(capture))
+    assert result['merged']['protocol_distribution'] == analyze_tcpdump(capture)['protocol_distribution']
+
+
+def test_outputs_are_not_inputs(capture, tmp_path):
+    paths = _split(capture, str(tmp_path))
+    for name in ('capture_0.txt.checkpoint', 'capture.db', 'capture_0.txt.metrics.json', 'metriques.prom',
+                 'capture_0.txt.analyze.prof', 'rapport.html', 'rapport.csv', 'capture.parquet'):
+        (tmp_path / name).write_text('x')
+    assert _collect_inputs(str(tmp_path)) == paths
+    assert _collect_inputs(str(tmp_path / 'capture*')) == paths
+    # Un fichier nommé explicitement est analysé, quel que soit son suffixe
+    assert _collect_inputs([str(tmp_path / 'rapport.csv')]) == [str(tmp_path / 'rapport.csv')]
+    assert '.txt' not in OUTPUT_SUFFIXES and '.pcap' not in OUTPUT_SUFFIXES
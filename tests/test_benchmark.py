@@ -0,0 +1,51 @@
+import argparse
+
+import pytest
+
+from benchmark import DEFAULT_MIX, compare_results, generate_capture, parse_mix, parse_size
+from projet_final import HEADER_PATTERN, analyze_tcpdump
+
+
+def test_capture_is_deterministic_and_parseable(tmp_path):
+    first, second = str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')
+    info = generate_capture(first, packets=3000, seed=5)
+    generate_capture(second, packets=3000, seed=5)
+    assert open(first).read() == open(second).read()
+    assert info['packets'] == 3000
+
+    headers = [line for line in open(first) if not line.startswith('\t')]
+    assert len(headers) == 3000
+    assert all(HEADER_PATTERN.match(line.rstrip('\n')) for line in headers)
+    assert analyze_tcpdump(first)['network_stats']['packets_analyzed'] == 3000
+
+
+def test_capture_size_and_midnight(tmp_path):
+    path = str(tmp_path / 'midnight.txt')
+    info = generate_capture(path, size=200000, start='23:59:59', dump=False)
+    assert info['bytes'] >= 200000
+    timestamps = [line[:15] for line in open(path)]
+    assert timestamps[0].startswith('23:59:59') and timestamps[-1].startswith('00:00:')
+
+
+def test_argument_parsers():
+    assert parse_size('100M') == 100 << 20
+    assert parse_size('500k') == 500 << 10
+    assert parse_mix('tcp=50,scan=2')['tcp'] == 50
+    assert parse_mix('scan=2')['arp'] == DEFAULT_MIX['arp']
+    for text in ('tcp=x', 'nope=1'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_mix(text)
+
+
+def _record(stages, rss=50.0, mode='streaming'):
+    return {'capture': {'name': 'big.txt', 'bytes': 1000, 'lines': 40}, 'mode': mode, 'stages': stages,
+            'peak_rss_mb': rss, 'commit': None, 'date': '2026-01-01'}
+
+
+def test_compare_results():
+    history = [_record({'parse': 1.0, 'report': 0.005}), _record({'parse': 9.0}, mode='table')]
+    previous, regressions = compare_results(_record({'parse': 1.1, 'report': 0.009}), history)
+    assert previous is history[0] and regressions == []
+    _, regressions = compare_results(_record({'parse': 1.5}, rss=80.0), history)
+    assert [stage for stage, *_ in regressions] == ['parse', 'peak_rss_mb']
+    assert compare_results(_record({'parse': 1.0}, mode='parallel'), history) == (None, [])
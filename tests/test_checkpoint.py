@@ -0,0 +1,66 @@
+import os
+import shutil
+
+import pytest
+
+from projet_final import analyze_tcpdump
+
+
+def _split(capture, path):
+    """Écrit la première moitié de la capture (coupée avant un en-tête de paquet) et renvoie la suite"""
+    data = open(capture, 'rb').read()
+    middle = data.index(b'\n', len(data) // 2) + 1
+    while data[middle:middle + 1].isspace():
+        middle = data.index(b'\n', middle) + 1
+    with open(path, 'wb') as file:
+        file.write(data[:middle])
+    return data[middle:]
+
+
+def _summary(stats):
+    return (stats['network_stats']['packets_analyzed'], stats['protocol_distribution'], stats['rule_hits'],
+            sorted((anomaly['type'], anomaly['timestamp']) for anomaly in stats['detected_anomalies']))
+
+
+@pytest.mark.parametrize('mode', ['streaming', 'parallel'])
+def test_resume_matches_single_run(capture, tmp_path, mode):
+    path = str(tmp_path / 'capture.txt')
+    rest = _split(capture, path)
+    first = analyze_tcpdump(path, mode, 2, {'checkpoint': True})
+    assert os.path.exists(path + '.checkpoint')
+    with open(path, 'ab') as file:
+        file.write(rest)
+    resumed = analyze_tcpdump(path, mode, 2, {'checkpoint': True})
+    assert resumed['network_stats']['packets_analyzed'] > first['network_stats']['packets_analyzed']
+    assert _summary(resumed)[:3] == _summary(analyze_tcpdump(capture, mode, 2))[:3]
+    if mode == 'streaming':
+        assert _summary(resumed) == _summary(analyze_tcpdump(capture))
+
+
+def test_nothing_new_reads_nothing(capture, tmp_path):
+    path = str(tmp_path / 'capture.txt')
+    shutil.copy(capture, path)
+    first = analyze_tcpdump(path, options={'checkpoint': True, 'metrics': True})
+    again = analyze_tcpdump(path, options={'checkpoint': True, 'metrics': True})
+    assert _summary(again) == _summary(first)
+    assert again['metrics'].counters.get('lines', 0) == 0
+
+
+def test_replaced_file_restarts(capture, tmp_path):
+    path = str(tmp_path / 'capture.txt')
+    _split(capture, path)
+    analyze_tcpdump(path, options={'checkpoint': True})
+    # Rotation : un autre fichier prend la place du premier
+    with open(capture, 'rb') as source, open(path, 'wb') as file:
+        data = source.read()
+        file.write(data[data.index(b'\n', len(data) // 4) + 1:])
+    stats = analyze_tcpdump(path, options={'checkpoint': True})
+    assert stats['network_stats']['packets_analyzed'] == analyze_tcpdump(path)['network_stats']['packets_analyzed']
+
+
+def test_changed_options_restart(capture, tmp_path):
+    path = str(tmp_path / 'capture.txt')
+    shutil.copy(capture, path)
+    analyze_tcpdump(path, options={'checkpoint': True})
+    stats = analyze_tcpdump(path, options={'checkpoint': True, 'spike_multiplier': 5.0})
+    assert _summary(stats) == _summary(analyze_tcpdump(capture, options={'spike_multiplier': 5.0}))
@@ -0,0 +1,59 @@
+import ipaddress
+import random
+
+import cidr
+from cidr import CidrIndex, read_networks, subnet_of
+from projet_final import analyze_tcpdump
+
+
+def test_module_docstring():
+    assert cidr.__doc__.startswith('Index de réseaux CIDR')
+
+
+def test_longest_prefix():
+    index = CidrIndex(['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '192.168.0.0/16', '2001:db8::/32'])
+    assert index.lookup('10.1.2.3') == '10.1.2.0/24'
+    assert index.lookup('10.1.3.3') == '10.1.0.0/16'
+    assert index.lookup('10.200.0.1') == '10.0.0.0/8'
+    assert index.lookup('11.0.0.1') is None
+    assert index.lookup('2001:db8::1') == '2001:db8::/32'
+    assert index.lookup('tc-f01.univ-st-etienne.fr') is None
+    assert '192.168.4.4' in index and '172.16.0.1' not in index
+    index.add('10.1.2.128/25')
+    assert index.lookup('10.1.2.200') == '10.1.2.128/25'
+    assert index.lookup('10.1.2.1') == '10.1.2.0/24'
+
+
+def test_matches_linear_scan():
+    rng = random.Random(4)
+    networks = {f'10.{rng.randrange(4)}.{rng.randrange(8)}.0/{rng.choice((16, 20, 24, 28))}' for _ in range(200)}
+    parsed = [ipaddress.ip_network(network, strict=False) for network in networks]
+    index = CidrIndex(networks)
+    for _ in range(2000):
+        host = f'10.{rng.randrange(5)}.{rng.randrange(10)}.{rng.randrange(256)}'
+        address = ipaddress.ip_address(host)
+        containing = [network for network in parsed if address in network]
+        expected = str(max(containing, key=lambda network: network.prefixlen)) if containing else None
+        assert index.lookup(host) == expected
+
+
+def test_subnets_and_files(tmp_path):
+    assert subnet_of('161.3.128.106') == '161.3.128.0/24'
+    assert subnet_of('161.3.128.106', 16) == '161.3.0.0/16'
+    assert subnet_of('broadcasthost') is None
+    path = tmp_path / 'networks.txt'
+    path.write_text('# passerelles\n161.3.128.0/24  # salle TP\n\n10.0.0.0/8\n')
+    assert read_networks(str(path)) == ['161.3.128.0/24', '10.0.0.0/8']
+
+
+def test_allow_and_deny_lists(capture):
+    stats = analyze_tcpdump(capture)
+    sources = {anomaly['ip_source'] for anomaly in stats['detected_anomalies']
+               if anomaly['type'] == 'Pic de Trafic'}
+    source = sorted(sources)[0]
+    allowed = analyze_tcpdump(capture, options={'allow_list': [f'{source}/32']})
+    assert source not in {anomaly['ip_source'] for anomaly in allowed['detected_anomalies']}
+    denied = analyze_tcpdump(capture, options={'deny_list': [f'{source}/32']})
+    levels = {anomaly['level'] for anomaly in denied['detected_anomalies'] if anomaly['ip_source'] == source}
+    assert levels == {'CRITIQUE'}
+    assert 'Liste noire' in {anomaly['type'] for anomaly in denied['detected_anomalies']}
@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+import os
+import shutil
+import webbrowser
+
+import pytest
+
+import projet_final
+from projet_final import _options_from_args, build_parser, main, query_main
+
+
+@pytest.fixture
+def local_capture(capture, tmp_path):
+    """Copie de la capture : les mesures et points de reprise s'écrivent à côté d'elle"""
+    path = str(tmp_path / 'capture.txt')
+    shutil.copy(capture, path)
+    return path
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Pages que le rapport aurait ouvertes dans le navigateur"""
+    pages = []
+    monkeypatch.setattr(webbrowser, 'open', pages.append)
+    return pages
+
+
+def _outputs(tmp_path):
+    return ['--html', str(tmp_path / 'rapport.html'), '--csv', str(tmp_path / 'rapport.csv')]
+
+
+def test_options_from_args():
+    args = build_parser().parse_args(['capture.txt', '--multiplier', '3', '--windows', '1,30', '--min-packets', '5',
+                                      '--bucket', '60', '--rules', 'regles.json', '--sketch', '--checkpoint',
+                                      '--prometheus', 'mesures.prom', '--profile', 'stats'])
+    assert _options_from_args(args) == {
+        'spike_multiplier': 3.0, 'windows': (1, 30), 'spike_min_packets': 5, 'timeseries_bucket': 60.0,
+        'rules': 'regles.json', 'sketch': True, 'checkpoint': True, 'metrics': True, 'profile_stage': 'stats'}
+    # Les options absentes gardent leur valeur par défaut
+    assert _options_from_args(build_parser().parse_args(['capture.txt'])) == {}
+
+
+@pytest.mark.parametrize('argv', [['--windows', '0,10'], ['--windows', 'a'], ['--page-size', '0'],
+                                  ['--bucket', '0'], ['--mode', 'fast'], ['--profile', 'parse']])
+def test_invalid_arguments(argv, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(['capture.txt', '--no-browser'] + argv)
+    assert error.value.code == 2
+    assert 'error' in capsys.readouterr().err
+
+
+def test_reports(local_capture, tmp_path, opened):
+    assert main([local_capture, '--no-browser'] + _outputs(tmp_path)) == 0
+    assert (tmp_path / 'rapport.html').exists() and (tmp_path / 'rapport.csv').exists()
+    assert opened == []
+
+
+def test_browser_opened(local_capture, tmp_path, opened):
+    assert main([local_capture] + _outputs(tmp_path)) == 0
+    assert opened == ['file://' + os.path.realpath(tmp_path / 'rapport.html')]
+
+
+def test_csv_only(local_capture, tmp_path, opened):
+    assert main([local_capture, '--no-html', '--mode', 'table'] + _outputs(tmp_path)) == 0
+    assert (tmp_path / 'rapport.csv').exists() and not (tmp_path / 'rapport.html').exists()
+    assert opened == []
+
+
+def test_metrics_outputs(local_capture, tmp_path, capsys):
+    prometheus = str(tmp_path / 'mesures.prom')
+    assert main([local_capture, '--no-html', '--no-browser', '--metrics', '--prometheus', prometheus,
+                 '--profile', 'stats'] + _outputs(tmp_path)) == 0
+    metrics = json.load(open(local_capture + '.metrics.json', encoding='utf-8'))
+    assert metrics['file'] == 'capture.txt' and metrics['mode'] == 'streaming'
+    assert os.path.exists(prometheus) and os.path.exists(local_capture + '.stats.prof')
+    assert 'Mesures écrites dans' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('argv, message', [
+    (['--export', 'paquets.db', '--follow'], "L'export des paquets ne s'applique qu'à l'analyse d'un seul fichier"),
+    (['--metrics', '--follow'], "Les mesures (--metrics, --prometheus, --profile)"),
+    (['--mode', 'table', '--sketch'], "Le mode table calcule des valeurs exactes"),
+])
+def test_incompatible_options(local_capture, tmp_path, capsys, argv, message):
+    assert main([local_capture, '--no-browser'] + argv + _outputs(tmp_path)) == 1
+    assert message in capsys.readouterr().out
+    assert not (tmp_path / 'rapport.csv').exists()
+
+
+def test_batch_rejects_single_file_options(local_capture, tmp_path, capsys):
+    other = str(tmp_path / 'autre.txt')
+    shutil.copy(local_capture, other)
+    assert main([local_capture, other, '--export', 'paquets.db']) == 1
+    assert main([local_capture, other, '--prometheus', 'mesures.prom']) == 1
+    assert main([local_capture, other, '--follow']) == 1
+    out = capsys.readouterr().out
+    assert "L'export des paquets" in out and 'Les mesures' in out
+
+
+def test_follow_arguments(local_capture, tmp_path, monkeypatch):
+    calls = []
+
+    def follow(file_path, interval, options):
+        calls.append((file_path, interval, options))
+        return projet_final.analyze_tcpdump(file_path, options=options)
+
+    monkeypatch.setattr(projet_final, 'follow_tcpdump', follow)
+    assert main([local_capture, '--follow', '--interval', '5', '--multiplier', '4', '--no-html',
+                 '--no-browser'] + _outputs(tmp_path)) == 0
+    assert calls == [(local_capture, 5, {'spike_multiplier': 4.0})]
+
+
+def test_missing_file(tmp_path, capsys):
+    assert main([str(tmp_path / 'absent.txt'), '--no-browser'] + _outputs(tmp_path)) == 1
+    assert "Erreur lors de l'analyse" in capsys.readouterr().out
+
+
+def test_batch(local_capture, tmp_path):
+    other = str(tmp_path / 'autre.txt')
+    shutil.copy(local_capture, other)
+    output_dir = str(tmp_path / 'lot')
+    assert main([local_capture, other, '--output-dir', output_dir, '--no-html']) == 0
+    assert sorted(os.listdir(output_dir)) == ['autre.txt.csv', 'capture.txt.csv', 'rapport_global.csv',
+                                              'synthese_fichiers.csv']
+    # Un fichier illisible : rapports écrits, mais code de retour en erreur
+    assert main([local_capture, str(tmp_path / 'absent.txt'), '--output-dir', output_dir, '--no-html']) == 1
+
+
+def test_query(local_capture, tmp_path, capsys, monkeypatch, opened):
+    database = str(tmp_path / 'capture.db')
+    assert main([local_capture, '--export', database, '--no-html', '--no-browser'] + _outputs(tmp_path)) == 0
+    capsys.readouterr()
+
+    assert main(['query', database, '--protocol', 'http', '--limit', '5']) == 0
+    rows = list(csv.reader(io.StringIO(capsys.readouterr().out)))
+    assert rows[0] == list(projet_final.PacketRecord._fields)
+    assert len(rows) == 6 and {row[6] for row in rows[1:]} == {'http'}
+
+    report = ['--report', '--no-browser', '--html', str(tmp_path / 'requete.html'),
+              '--csv', str(tmp_path / 'requete.csv')]
+    assert query_main([database, '--protocol', 'http', '--no-html'] + report) == 0
+    assert (tmp_path / 'requete.csv').exists() and not (tmp_path / 'requete.html').exists()
+    assert query_main([database, '--host', '203.0.113.250'] + report) == 1
+    assert 'Aucun paquet ne correspond' in capsys.readouterr().out
+    assert opened == []
+
+
+def test_query_errors(tmp_path, capsys):
+    assert query_main([str(tmp_path / 'absent.db')]) == 1
+    assert 'Base introuvable' in capsys.readouterr().out
+    with pytest.raises(SystemExit) as error:
+        query_main([str(tmp_path / 'absent.db'), '--from', '25h'])
+    assert error.value.code == 2
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+
+from export import BLOCK_ROWS, open_exporter
+from projet_final import analyze_tcpdump
+
+
+def _count(path, query):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(query).fetchone()[0]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize('mode', ['streaming', 'table'])
+def test_sqlite_export(capture, tmp_path, mode):
+    if mode == 'table':
+        pytest.importorskip('pandas')
+    database = str(tmp_path / 'capture.db')
+    stats = analyze_tcpdump(capture, mode, options={'export': database, 'export_batch_size': 3000})
+    packets = stats['network_stats']['packets_analyzed']
+    assert _count(database, 'SELECT COUNT(*) FROM packets') == packets
+    assert _count(database, 'SELECT COUNT(*) FROM blocks') == -(-packets // BLOCK_ROWS)
+    # Horodatages croissants dans l'ordre de la capture
+    assert _count(database, 'SELECT COUNT(*) FROM packets a JOIN packets b ON b.rowid = a.rowid + 1 '
+                            'WHERE b.timestamp_us < a.timestamp_us') == 0
+    assert _count(database, "SELECT COUNT(*) FROM packets WHERE protocol = 'http'") == \
+        stats['protocol_distribution']['http']
+
+
+def test_sqlite_append_reindexes_last_block(tmp_path):
+    database = str(tmp_path / 'append.db')
+    record = ('10:00:00.000001', 'IP', '10.0.0.1', '40000', '10.0.0.2', 'http', 'http', 'S', 0)
+    with open_exporter(database) as exporter:
+        for index in range(BLOCK_ROWS + 10):
+            exporter.add(record, index)
+    with open_exporter(database, append=True) as exporter:
+        for index in range(BLOCK_ROWS + 10, 2 * BLOCK_ROWS + 5):
+            exporter.add(('10:00:01.000001', 'IP', '10.0.0.3') + record[3:], index)
+    assert _count(database, 'SELECT COUNT(*) FROM packets') == 2 * BLOCK_ROWS + 5
+    assert _count(database, 'SELECT COUNT(*) FROM blocks') == 3
+    assert _count(database, 'SELECT MAX(max_us) FROM blocks') == 2 * BLOCK_ROWS + 4
+    assert _count(database, "SELECT COUNT(*) FROM postings WHERE host = '10.0.0.3'") == 2
+
+
+def test_unknown_format_and_arrow_append(tmp_path):
+    with pytest.raises(ValueError):
+        open_exporter(str(tmp_path / 'capture.csv'))
+    with pytest.raises(ValueError):
+        open_exporter(str(tmp_path / 'capture.parquet'), append=True)
+
+
+def test_parquet_export(capture, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'capture.parquet')
+    stats = analyze_tcpdump(capture, options={'export': path})
+    assert pq.read_table(path).num_rows == stats['network_stats']['packets_analyzed']
@@ -0,0 +1,97 @@
+import os
+
+from projet_final import FlowTable, PacketRecord, analyze_tcpdump
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECOND = 1000000
+
+
+def tcp(src, sport, dst, dport, flags):
+    return PacketRecord('12:00:00.000000', 'IP', src, str(sport), dst, str(dport), str(dport), flags, 0)
+
+
+def feed(table, packets):
+    """Paquets (secondes, record) -> anomalies signalées"""
+    anomalies = []
+    for seconds, record in packets:
+        anomalies += table.observe(record, int(seconds * SECOND)) or []
+    return anomalies
+
+
+def test_syn_flood_reported_once_per_episode():
+    table = FlowTable(syn_flood_threshold=5)
+    syns = [(i * 0.01, tcp(f'10.0.0.{i}', 4000, '10.0.1.1', 80, 'S')) for i in range(1, 20)]
+    anomalies = feed(table, syns)
+    assert [anomaly['type'] for anomaly in anomalies] == ['SYN Flood']
+    assert anomalies[0]['ip_source'] == '10.0.0.5'
+    assert anomalies[0]['details'] == 'SYN flood: 5 connexions à demi ouvertes vers 10.0.1.1'
+    # Les connexions aboutissent : l'épisode se termine, un nouveau flood est signalé à nouveau
+    feed(table, [(1, tcp(f'10.0.0.{i}', 4000, '10.0.1.1', 80, '.')) for i in range(1, 20)])
+    assert not table.half_open
+    assert len(feed(table, [(2 + i * 0.01, tcp(f'10.0.2.{i}', 4000, '10.0.1.1', 80, 'S'))
+                            for i in range(1, 6)])) == 1
+
+
+def test_completed_handshakes_are_not_a_flood():
+    table = FlowTable(syn_flood_threshold=5)
+    packets = []
+    for i in range(1, 20):
+        client = f'10.0.0.{i}'
+        packets += [(i, tcp(client, 4000, '10.0.1.1', 80, 'S')), (i, tcp('10.0.1.1', 80, client, 4000, 'S.')),
+                    (i, tcp(client, 4000, '10.0.1.1', 80, '.'))]
+    assert feed(table, packets) == []
+    assert len(table.flows) == 19 and not table.half_open
+
+
+def test_horizontal_and_vertical_scans():
+    table = FlowTable(scan_threshold=5)
+    horizontal = feed(table, [(i, tcp('10.9.9.9', 5000, f'10.0.0.{i}', 22, 'S')) for i in range(1, 8)])
+    assert [anomaly['details'] for anomaly in horizontal] == ['Balayage horizontal: 5 hôtes sondés sur le port 22']
+    vertical = feed(table, [(10 + port, tcp('10.8.8.8', 5000, '10.0.1.1', port, 'S')) for port in range(1, 8)])
+    assert [anomaly['details'] for anomaly in vertical] == ['Balayage vertical: 5 ports sondés sur 10.0.1.1']
+    assert {anomaly['type'] for anomaly in horizontal + vertical} == {'Balayage de ports'}
+
+
+def test_slow_scan_outside_window():
+    table = FlowTable(scan_threshold=5, scan_window=60)
+    assert feed(table, [(i * 30, tcp('10.9.9.9', 5000, f'10.0.0.{i}', 22, 'S')) for i in range(1, 8)]) == []
+
+
+def test_rst_storm():
+    table = FlowTable(rst_threshold=5, rst_window=10)
+    storm = feed(table, [(i, tcp('10.0.1.1', 80, f'10.0.0.{i}', 4000, 'R.')) for i in range(1, 10)])
+    assert [(anomaly['type'], anomaly['ip_source']) for anomaly in storm] == [('Tempête de RST', '10.0.1.1')]
+    slow = FlowTable(rst_threshold=5, rst_window=10)
+    assert feed(slow, [(i * 3, tcp('10.0.1.1', 80, f'10.0.0.{i}', 4000, 'R.')) for i in range(1, 10)]) == []
+
+
+def test_idle_flows_are_evicted():
+    table = FlowTable(timeout=10)
+    feed(table, [(0, tcp('10.0.0.1', 4000, '10.0.1.1', 80, 'S')), (5, tcp('10.0.0.2', 4000, '10.0.1.1', 80, 'S'))])
+    assert len(table.flows) == 2
+    feed(table, [(12, tcp('10.0.0.3', 4000, '10.0.1.2', 80, 'S'))])
+    assert list(table.flows) == [('10.0.0.2', '4000', '10.0.1.1', '80'), ('10.0.0.3', '4000', '10.0.1.2', '80')]
+    assert table.half_open == {'10.0.1.1': 1, '10.0.1.2': 1}
+    # Un paquet du flux le remet en fin de file : il survit à l'éviction suivante
+    feed(table, [(14, tcp('10.0.1.1', 80, '10.0.0.2', 4000, 'S.')), (20, tcp('10.0.0.4', 4000, '10.0.1.3', 80, 'S'))])
+    assert ('10.0.0.2', '4000', '10.0.1.1', '80') in table.flows
+    assert ('10.0.0.3', '4000', '10.0.1.2', '80') in table.flows
+    feed(table, [(23, tcp('10.0.0.5', 4000, '10.0.1.4', 80, 'S'))])
+    assert ('10.0.0.3', '4000', '10.0.1.2', '80') not in table.flows
+
+
+def test_max_flows_bounds_memory():
+    table = FlowTable(max_flows=10, syn_flood_threshold=1000, scan_threshold=1000)
+    for i in range(200):
+        feed(table, [(i * 0.001, tcp(f'10.0.{i // 250}.{i % 250}', 4000 + i, f'10.1.0.{i % 50}', 80 + i, 'S'))])
+        assert len(table.flows) <= 10
+        assert len(table.horizontal) <= 10 and len(table.vertical) <= 10
+    # Les demi-ouvertures des flux évincés sont rendues
+    assert sum(table.half_open.values()) == len(table.flows)
+
+
+def test_sample_capture_syn_flood():
+    # 81 SYN en 1 ms vers 184.107.43.74:http : au-dessus du seuil par défaut (50)
+    stats = analyze_tcpdump(os.path.join(ROOT, 'fichier1000.txt'))
+    floods = [anomaly for anomaly in stats['detected_anomalies'] if anomaly['type'] == 'SYN Flood']
+    assert [anomaly['details'] for anomaly in floods] == ['SYN flood: 50 connexions à demi ouvertes vers 184.107.43.74']
@@ -0,0 +1,25 @@
+from collections import Counter
+
+from benchmark import generate_capture
+from projet_final import analyze_tcpdump, follow_tcpdump
+
+
+def _anomaly_types(stats):
+    return Counter(anomaly['type'] for anomaly in stats['detected_anomalies'])
+
+
+def test_follow_matches_streaming_across_midnight(tmp_path):
+    # Trois blocs de lecture de 1 Mo, un intervalle par bloc (interval=0) : minuit est passé
+    # dans le premier, les suivants commencent après minuit
+    capture = str(tmp_path / 'midnight.txt')
+    generate_capture(capture, size=3 << 20, start='23:59:58', seed=3, dump=False)
+    streaming = analyze_tcpdump(capture)
+    calls = []
+    followed = follow_tcpdump(capture, interval=0, poll_interval=0.01, duration=1.0,
+                              callback=lambda stats, window: calls.append(stats))
+
+    assert len(calls) >= 3
+    assert followed['network_stats']['packets_analyzed'] == streaming['network_stats']['packets_analyzed']
+    assert followed['protocol_distribution'] == streaming['protocol_distribution']
+    assert _anomaly_types(followed) == _anomaly_types(streaming)
+    assert followed['timeseries']['packets'] == streaming['timeseries']['packets']
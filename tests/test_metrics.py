@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+
+from metrics import Metrics, measure_call, measure_stage
+from projet_final import analyze_tcpdump
+
+
+def test_stages_and_counters():
+    metrics = Metrics()
+    with metrics.stage('parse'):
+        pass
+    with metrics.stage('parse'):
+        pass
+    metrics.count('lines', 10)
+    other = Metrics()
+    other.add_time('parse', 1.0)
+    other.count('lines', 5)
+    metrics.merge(other)
+    assert metrics.stages['parse'] >= 1.0
+    assert metrics.counters == {'lines': 15}
+    assert measure_call(metrics, 'report', max, 1, 2) == 2
+    assert 'report' in metrics.stages
+
+
+def test_disabled_measure_is_a_no_op():
+    with measure_stage(None, 'parse') as value:
+        assert value is None
+    assert measure_call(None, 'report', len, 'abc') == 3
+
+
+def test_prometheus_text(tmp_path):
+    metrics = Metrics()
+    metrics.info = {'file': 'a "b".txt', 'mode': 'streaming', 'workers': 2}
+    metrics.add_time('analyze', 2.0)
+    metrics.count('packets', 100)
+    text = metrics.prometheus_text()
+    assert 'tcpdump_analyzer_stage_seconds{stage="analyze",file="a \\"b\\".txt",mode="streaming"} 2.000000' in text
+    assert 'tcpdump_analyzer_packets{file="a \\"b\\".txt",mode="streaming"} 100' in text
+    assert metrics.as_dict()['rates'] == {'packets_per_s': 50.0}
+    path = metrics.write_prometheus(str(tmp_path / 'analyzer.prom'))
+    assert open(path).read().startswith('# HELP')
+
+
+def test_profile_only_the_requested_stage(tmp_path):
+    metrics = Metrics(profile='stats')
+    assert metrics.write_profile(str(tmp_path / 'none.prof')) is None
+    with metrics.stage('parse'):
+        pass
+    assert metrics.profiler is None
+    with metrics.stage('stats'):
+        sorted(range(1000))
+    assert metrics.write_profile(str(tmp_path / 'stats.prof'))
+    assert 'function calls' in metrics.profile_summary()
+
+
+def test_analysis_metrics(capture, tmp_path):
+    stats = analyze_tcpdump(capture, options={'metrics': True})
+    metrics = stats['metrics']
+    assert {'analyze', 'read', 'parse', 'count', 'stats'} <= set(metrics.stages)
+    assert metrics.counters['packets'] == stats['network_stats']['packets_analyzed']
+    data = json.load(open(metrics.write_json(str(tmp_path / 'run.metrics.json'))))
+    assert data['counters']['packets'] == 20000
+
+
+def test_profiler_modules_load_lazily():
+    code = 'import sys, projet_final; print("cProfile" in sys.modules, "pstats" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=root).stdout
+    assert output.split() == ['False', 'False']
@@ -0,0 +1,61 @@
+import json
+from collections import Counter
+
+import pytest
+
+from projet_final import analyze_tcpdump
+
+
+def _anomalies(stats):
+    return sorted((anomaly['timestamp'], anomaly['type'], anomaly['ip_source'], anomaly['details'], anomaly['level'])
+                  for anomaly in stats['detected_anomalies'])
+
+
+@pytest.fixture(scope='module')
+def alert_rules(tmp_path_factory):
+    path = tmp_path_factory.mktemp('rules') / 'rules.json'
+    path.write_text(json.dumps({'rules': [
+        {'name': 'Drapeaux TCP suspects', 'flags': ['S', 'S.', 'SF', 'P.']},
+        {'name': 'SSH', 'dst_port': 'ssh', 'alert': True, 'level': 'FAIBLE'},
+        {'name': 'ARP', 'kind': 'ARP', 'length': '0-46', 'alert': True},
+        {'name': 'Ports hauts', 'src_port': '1024-65535', 'dst_port': '1024-65535'},
+    ]}))
+    return str(path)
+
+
+@pytest.mark.parametrize('rules', [False, True])
+def test_table_matches_streaming(capture, alert_rules, rules):
+    pytest.importorskip('pandas')
+    options = {'rules': alert_rules} if rules else None
+    streaming = analyze_tcpdump(capture, options=options)
+    table = analyze_tcpdump(capture, 'table', options=options)
+
+    assert table['network_stats'] == streaming['network_stats']
+    assert table['protocol_distribution'] == streaming['protocol_distribution']
+    assert table['rule_hits'] == streaming['rule_hits']
+    assert table['subnet_counts'] == streaming['subnet_counts']
+    # Les séries par protocole et par source du mode streaming ne commencent qu'au suivi de la clé
+    for key in ('bucket', 'start_us', 'packets', 'bytes'):
+        assert table['timeseries'][key] == streaming['timeseries'][key]
+    assert _anomalies(table) == _anomalies(streaming)
+    if rules:
+        assert Counter(anomaly['type'] for anomaly in table['detected_anomalies'])['SSH'] > 0
+
+
+def test_table_rejects_sketch(capture):
+    assert analyze_tcpdump(capture, 'table', options={'sketch': True}) is None
+
+
+def test_parallel_counters_match_streaming(capture, alert_rules):
+    # Les anomalies du mode parallel sont approchées aux limites des plages : seuls les compteurs sont comparés
+    options = {'rules': alert_rules}
+    streaming = analyze_tcpdump(capture, options=options)
+    parallel = analyze_tcpdump(capture, 'parallel', workers=2, options=options)
+
+    for key in ('packets_analyzed', 'packets_rate', 'services'):
+        assert parallel['network_stats'][key] == streaming['network_stats'][key]
+    assert parallel['protocol_distribution'] == streaming['protocol_distribution']
+    assert parallel['rule_hits'] == streaming['rule_hits']
+    assert parallel['subnet_counts'] == streaming['subnet_counts']
+    for key in ('start_us', 'packets', 'bytes'):
+        assert parallel['timeseries'][key] == streaming['timeseries'][key]
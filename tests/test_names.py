@@ -0,0 +1,83 @@
+import json
+
+from projet_final import PORT_NAMES, PacketRecord, _port_number, analyze_batch, analyze_tcpdump
+from names import NameResolver, read_hosts, read_services
+
+CAPTURE = """\
+10:00:00.000001 IP 10.0.0.1.40000 > 10.0.0.2.80: Flags [S], seq 1, win 64240, length 0
+10:00:00.000002 IP 10.0.0.1.40001 > 10.0.0.2.www: Flags [S], seq 1, win 64240, length 0
+10:00:00.000003 IP 10.0.0.1.40002 > 10.0.0.2.http: Flags [S], seq 1, win 64240, length 0
+10:00:00.000004 IP 10.0.0.1.40003 > 10.0.0.2.1234: Flags [S], seq 1, win 64240, length 0
+"""
+
+
+def _resolver(**kwargs):
+    return NameResolver(port_number=_port_number, port_names=PORT_NAMES, **kwargs)
+
+
+def test_services_are_canonical():
+    resolver = _resolver()
+    assert resolver.service('80') == resolver.service('www') == resolver.service('http') == 'http'
+    assert resolver.service('1234') == '1234'
+    assert resolver.service(None) is None
+
+
+def test_hosts_table_and_case(tmp_path):
+    hosts_file = tmp_path / 'hosts'
+    hosts_file.write_text('161.3.128.1 tc-f01.univ-st-etienne.fr tc-f01  # passerelle\n')
+    resolver = _resolver(hosts=read_hosts(hosts_file))
+    assert resolver.host('TC-F01.univ-st-etienne.fr.') == '161.3.128.1'
+    assert resolver.host('tc-f01') == '161.3.128.1'
+    assert resolver.host('BP-Linux8') == 'bp-linux8'
+    assert resolver.host('10.0.0.1') == '10.0.0.1'
+
+
+def test_services_table(tmp_path):
+    services_file = tmp_path / 'services'
+    services_file.write_text('gvcp 3956/udp gige\n# commentaire\n')
+    assert read_services(services_file) == {'gvcp': 3956, 'gige': 3956}
+
+
+def test_normalize_record():
+    resolver = _resolver()
+    record = PacketRecord('10:00:00.000001', 'IP', 'Host.', '40000', '10.0.0.2', 'www', 'www', 'S', 0)
+    normalized = resolver.normalize(record)
+    assert normalized.src_host == 'host'
+    assert normalized.dst_port == normalized.protocol == 'http'
+    unchanged = PacketRecord('10:00:00.000001', 'IP', '10.0.0.1', '40000', '10.0.0.2', 'http', 'http', 'S', 0)
+    assert resolver.normalize(unchanged) is unchanged
+
+
+def test_streaming_counts_normalized_protocols(tmp_path):
+    capture = tmp_path / 'capture.txt'
+    capture.write_text(CAPTURE)
+    stats = analyze_tcpdump(str(capture))
+    assert dict(stats['protocol_distribution']) == {'http': 3, '1234': 1}
+    assert stats['timeseries']['protocols'].keys() >= {'http'}
+
+
+def _named_capture(path, packets=400):
+    """Capture dont les sources sont des noms à résoudre ('localhost' est résolu sans réseau)"""
+    with open(path, 'w') as file:
+        for i in range(packets):
+            file.write(f'10:00:{i // 100:02d}.{i % 100:06d} IP localhost.{40000 + i} > 10.0.0.2.80: '
+                       f'Flags [S], seq 1, win 64240, length 0\n')
+
+
+def test_merge_resolutions():
+    resolver, worker = _resolver(), _resolver()
+    worker.resolved['localhost'] = '127.0.0.1'
+    resolver.merge(worker)
+    resolver.merge(resolver)
+    assert resolver.resolved == {'localhost': '127.0.0.1'} and resolver._dirty
+
+
+def test_name_cache_saved_in_parallel_and_batch(tmp_path):
+    captures = [str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')]
+    for path in captures:
+        _named_capture(path)
+    for run, cache in ((lambda options: analyze_tcpdump(captures[0], 'parallel', 2, options), 'parallel.json'),
+                       (lambda options: analyze_batch(captures, 2, options), 'lot.json')):
+        cache_file = str(tmp_path / cache)
+        run({'resolve_names': True, 'name_cache': cache_file})
+        assert json.load(open(cache_file, encoding='utf-8')) == {'localhost': '127.0.0.1'}
@@ -0,0 +1,37 @@
+from projet_final import analyze_tcpdump, decode_payload, follow_tcpdump
+
+
+def wants_http(record):
+    return record.dst_port == 'http'
+
+
+def inspect_http(record, payload):
+    if b'GET /api/' in payload:
+        return {'timestamp': record.timestamp, 'ip_source': record.src_host, 'type': 'Requête API',
+                'details': 'GET /api/', 'level': 'FAIBLE'}
+    return None
+
+
+OPTIONS = {'payload_rules': ((wants_http, inspect_http),)}
+
+
+def _api_requests(stats):
+    return sorted(anomaly['timestamp'] for anomaly in stats['detected_anomalies'] if anomaly['type'] == 'Requête API')
+
+
+def test_decode_payload():
+    dump = (b'\t0x0000:  4500 0054 0001 4000 4001 0000 0a00 010c  E..T..@.@.......\n'
+            b'\t0x0010:  0a00  ..\n')
+    assert decode_payload(dump, 0, len(dump)) == bytes.fromhex('450000540001400040010000 0a00010c 0a00')
+
+
+def test_payload_rules_in_every_text_mode(capture):
+    streaming = _api_requests(analyze_tcpdump(capture, options=OPTIONS))
+    assert streaming
+    assert _api_requests(analyze_tcpdump(capture, 'parallel', workers=2, options=OPTIONS)) == streaming
+    followed = follow_tcpdump(capture, interval=0, poll_interval=0.01, duration=0.5, callback=None, options=OPTIONS)
+    assert _api_requests(followed) == streaming
+
+
+def test_payload_rules_rejected_in_table_mode(capture):
+    assert analyze_tcpdump(capture, 'table', options=OPTIONS) is None
@@ -0,0 +1,120 @@
+import socket
+import struct
+import time
+
+import pytest
+
+import pcap_reader
+from pcap_reader import is_pcap_file, iter_pcap_packets
+from projet_final import analyze_tcpdump
+
+START = 1700000000   # horodatage Unix du premier paquet
+
+
+def _ethernet(ethertype, payload):
+    return b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02' + struct.pack('!H', ethertype) + payload
+
+
+def _ipv4(protocol, src, dst, payload):
+    header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(payload), 1, 0, 64, protocol, 0,
+                         socket.inet_aton(src), socket.inet_aton(dst))
+    return _ethernet(0x0800, header + payload)
+
+
+def _tcp(src, sport, dst, dport, flags, payload=b''):
+    return _ipv4(6, src, dst, struct.pack('!HHIIBBHHH', sport, dport, 1, 0, 5 << 4, flags, 64240, 0, 0) + payload)
+
+
+def _udp(src, sport, dst, dport, payload):
+    return _ipv4(17, src, dst, struct.pack('!HHHH', sport, dport, 8 + len(payload), 0) + payload)
+
+
+def _arp(sender, target):
+    return _ethernet(0x0806, struct.pack('!HHBBH6s4s6s4s', 1, 0x0800, 6, 4, 1, b'\x02' * 6,
+                                         socket.inet_aton(sender), b'\x00' * 6, socket.inet_aton(target)))
+
+
+# (décalage en µs, trame, ligne tcpdump équivalente sans l'horodatage)
+PACKETS = [
+    (0, _tcp('10.0.0.1', 40000, '10.0.0.2', 80, 0x02),
+     'IP 10.0.0.1.40000 > 10.0.0.2.http: Flags [S], seq 1, win 64240, length 0'),
+    (1500, _tcp('10.0.0.2', 80, '10.0.0.1', 40000, 0x12),
+     'IP 10.0.0.2.http > 10.0.0.1.40000: Flags [S.], seq 1, ack 2, win 64240, length 0'),
+    (2500, _tcp('10.0.0.1', 40000, '10.0.0.2', 80, 0x18, b'GET / HTTP/1.1\r\n\r\n'),
+     'IP 10.0.0.1.40000 > 10.0.0.2.http: Flags [P.], seq 1:19, ack 2, win 64240, length 18'),
+    (4000, _udp('10.0.0.1', 5353, '224.0.0.251', 5353, b'\x00' * 20),
+     'IP 10.0.0.1.mdns > 224.0.0.251.mdns: UDP, length 20'),
+    (7000, _arp('10.0.0.1', '10.0.0.3'),
+     'ARP, Request who-has 10.0.0.3 tell 10.0.0.1, length 28'),
+    (1000000, _ipv4(1, '10.0.0.1', '10.0.0.2', b'\x08\x00' + b'\x00' * 62),
+     'IP 10.0.0.1 > 10.0.0.2: ICMP echo request, id 1, seq 1, length 64'),
+]
+
+
+def _pcap(packets, magic=0xa1b2c3d4):
+    data = struct.pack('<IHHiIII', magic, 2, 4, 0, 0, 65535, 1)
+    for offset, frame, _ in packets:
+        seconds, micro = divmod(START * 1000000 + offset, 1000000)
+        data += struct.pack('<IIII', seconds, micro, len(frame), len(frame)) + frame
+    return data
+
+
+def _block(block_type, body):
+    length = 12 + len(body) + (-len(body)) % 4
+    return struct.pack('<II', block_type, length) + body + b'\x00' * ((-len(body)) % 4) + struct.pack('<I', length)
+
+
+def _pcapng(packets):
+    data = _block(0x0a0d0d0a, struct.pack('<IHHq', 0x1a2b3c4d, 1, 0, -1))
+    data += _block(1, struct.pack('<HHI', 1, 0, 65535))
+    for offset, frame, _ in packets:
+        stamp = START * 1000000 + offset
+        data += _block(6, struct.pack('<IIIII', 0, stamp >> 32, stamp & 0xffffffff, len(frame), len(frame)) + frame)
+    return data
+
+
+def _text(packets):
+    lines = []
+    for offset, _, line in packets:
+        seconds, micro = divmod(START * 1000000 + offset, 1000000)
+        lines.append(f"{time.strftime('%H:%M:%S', time.localtime(seconds))}.{micro:06d} {line}\n")
+    return ''.join(lines)
+
+
+def test_module_docstring():
+    assert pcap_reader.__doc__.startswith('Lecture directe')
+
+
+@pytest.mark.parametrize('build', [_pcap, _pcapng])
+def test_decoded_fields(tmp_path, build):
+    path = tmp_path / 'capture.cap'
+    path.write_bytes(build(PACKETS))
+    assert is_pcap_file(str(path))
+    packets = list(iter_pcap_packets(str(path), {80: 'http', 5353: 'mdns'}))
+    assert [timestamp for timestamp, _ in packets] == [line[:15] for line in _text(PACKETS).splitlines()]
+    fields = [fields for _, fields in packets]
+    assert fields[0] == ('IP', '10.0.0.1', '40000', '10.0.0.2', 'http', 'http', 'S', 0)
+    assert fields[2][6:] == ('P.', 18)
+    assert fields[3] == ('IP', '10.0.0.1', 'mdns', '224.0.0.251', 'mdns', 'mdns', None, 20)
+    assert fields[4] == ('ARP', None, None, None, None, 'ARP', None, 28)
+    assert fields[5] == ('IP', '10.0.0.1', None, '10.0.0.2', None, 'ICMP', None, 64)
+
+
+def test_pcap_matches_text(tmp_path):
+    binary, text = tmp_path / 'capture.pcap', tmp_path / 'capture.txt'
+    binary.write_bytes(_pcap(PACKETS))
+    text.write_text(_text(PACKETS))
+    from_pcap = analyze_tcpdump(str(binary), 'pcap')
+    from_text = analyze_tcpdump(str(text))
+    assert from_pcap['network_stats'] == from_text['network_stats']
+    assert from_pcap['protocol_distribution'] == from_text['protocol_distribution']
+    assert from_pcap['rule_hits'] == from_text['rule_hits']
+
+
+def test_text_file_is_rejected(tmp_path):
+    text = tmp_path / 'capture.txt'
+    text.write_text(_text(PACKETS))
+    assert not is_pcap_file(str(text))
+    with pytest.raises(ValueError, match="pas une capture pcap"):
+        list(iter_pcap_packets(str(text)))
+    assert analyze_tcpdump(str(text), 'pcap') is None
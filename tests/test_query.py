@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from benchmark import generate_capture
+from projet_final import analyze_query, analyze_tcpdump, query_packets
+from query import PacketStore
+from timestamps import MICROSECONDS_PER_DAY, format_us, parse_clock, timestamp_to_us
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    """Capture qui passe minuit, exportée en SQLite"""
+    directory = tmp_path_factory.mktemp('store')
+    capture = str(directory / 'midnight.txt')
+    generate_capture(capture, packets=30000, start='23:59:50', seed=2, dump=False)
+    database = str(directory / 'midnight.db')
+    analyze_tcpdump(capture, options={'export': database})
+    return database
+
+
+def _all_rows(database, where='1', parameters=()):
+    connection = sqlite3.connect(database)
+    try:
+        return connection.execute(f'SELECT timestamp, src_host, dst_port, protocol FROM packets '
+                                  f'WHERE {where} ORDER BY rowid', parameters).fetchall()
+    finally:
+        connection.close()
+
+
+def _selected(database, **filters):
+    return [(record.timestamp, record.src_host, record.dst_port, record.protocol)
+            for record in query_packets(database, **filters)]
+
+
+def test_clock_conversions():
+    assert parse_clock('18:01') == 18 * 3600 * 1000000 + 60 * 1000000
+    assert parse_clock('18:01:30.5') == timestamp_to_us('18:01:30.500000')
+    assert format_us(MICROSECONDS_PER_DAY + 1) == '00:00:00.000001'
+    for text in ('18', '18:61', '18:00:00:00', 'ab:cd'):
+        with pytest.raises(ValueError):
+            parse_clock(text)
+
+
+def test_host_filter(store):
+    host = _all_rows(store, 'src_host IS NOT NULL')[100][1]
+    expected = _all_rows(store, 'src_host = ? OR dst_host = ?', (host, host))
+    assert expected and _selected(store, host=host) == expected
+
+
+def test_port_name_or_number(store):
+    expected = _all_rows(store, "src_port = 'https' OR dst_port = 'https'")
+    assert expected
+    assert _selected(store, port='https') == _selected(store, port=443) == expected
+
+
+def test_time_range_across_midnight(store):
+    with PacketStore(store) as packets:
+        first, last = packets.time_bounds()
+        assert last > MICROSECONDS_PER_DAY > first
+        start_us, end_us = packets.resolve_clock(parse_clock('23:59:55')), packets.resolve_clock(parse_clock('00:00:05'))
+    expected = _all_rows(store, 'timestamp_us BETWEEN ? AND ?', (start_us, end_us))
+    assert expected[0][0] >= '23:59:55' and expected[-1][0] < '00:00:06'
+    assert _selected(store, start='23:59:55', end='00:00:05') == expected
+
+
+def test_combined_filters_and_report(store):
+    expected = _all_rows(store, "protocol = 'domain' AND timestamp_us >= ?",
+                         (MICROSECONDS_PER_DAY,))
+    assert expected
+    assert _selected(store, protocol='domain', start='00:00') == expected
+    stats = analyze_query(store, protocol='domain', start='00:00')
+    assert stats['network_stats']['packets_analyzed'] == len(expected)
+
+
+def test_sqlite_loads_lazily():
+    code = 'import sys, projet_final; print("sqlite3" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=root).stdout
+    assert output.split() == ['False']
@@ -0,0 +1,63 @@
+import csv
+import os
+
+import pytest
+
+from projet_final import analyze_tcpdump, generate_html_report, generate_reports, main
+
+pytest.importorskip('matplotlib')
+
+
+def test_generate_reports(capture, tmp_path):
+    stats = analyze_tcpdump(capture, options={'metrics': True})
+    html_file, csv_file = str(tmp_path / 'rapport.html'), str(tmp_path / 'rapport.csv')
+    outputs = generate_reports(stats, html_file, csv_file, open_browser=False,
+                               chart_cache_dir=str(tmp_path / 'charts'))
+    assert outputs[0] == csv_file
+    page = open(html_file, encoding='utf-8').read()
+    assert page.count('data:image/png;base64,') == 2
+    assert list(csv.reader(open(csv_file, encoding='utf-8')))
+    stages = stats['metrics'].stages
+    assert {'csv_report', 'protocol_chart', 'throughput_chart', 'html_report', 'reports'} <= set(stages)
+    # Les graphiques et le HTML sont produits l'un après l'autre dans le thread principal
+    assert stages['reports'] >= stages['protocol_chart'] + stages['throughput_chart'] + stages['html_report']
+
+
+def test_csv_only(capture, tmp_path):
+    csv_file = str(tmp_path / 'rapport.csv')
+    assert generate_reports(analyze_tcpdump(capture), csv_file=csv_file, html=False, open_browser=False) == [csv_file]
+
+
+def test_html_escapes_capture_fields(capture, tmp_path):
+    stats = analyze_tcpdump(capture)
+    stats['detected_anomalies'].append({'timestamp': '12:00:00.000000', 'ip_source': '<script>alert(1)</script>',
+                                        'type': 'Règle "x&y"', 'details': '<b>evil.example</b>', 'level': 'Élevé'})
+    html_file = str(tmp_path / 'rapport.html')
+    generate_html_report(stats, html_file, str(tmp_path / 'a"b.csv'), open_browser=False, chart='',
+                         throughput_chart='')
+    page = open(html_file, encoding='utf-8').read()
+    assert '<script>' not in page and '<b>' not in page
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in page
+    assert 'Règle &quot;x&amp;y&quot;' in page
+    assert 'href= "a&quot;b.csv"' in page
+
+
+@pytest.mark.parametrize('content', ['', 'pas une capture\n'])
+@pytest.mark.parametrize('mode', ['streaming', 'table', 'parallel'])
+def test_no_packet_is_an_error(tmp_path, capsys, content, mode):
+    path = tmp_path / 'vide.txt'
+    path.write_text(content)
+    html_file = tmp_path / 'rapport.html'
+    assert main([str(path), '--no-browser', '--mode', mode, '--workers', '1',
+                 '--html', str(html_file), '--csv', str(tmp_path / 'rapport.csv')]) == 1
+    assert 'aucun paquet analysé' in capsys.readouterr().out
+    assert not html_file.exists()
+
+
+def test_empty_stats_still_render(tmp_path):
+    path = tmp_path / 'vide.txt'
+    path.write_text('')
+    stats = analyze_tcpdump(str(path))
+    outputs = generate_reports(stats, str(tmp_path / 'rapport.html'), str(tmp_path / 'rapport.csv'),
+                               open_browser=False)
+    assert all(os.path.exists(output) for output in outputs)
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+import rules
+from projet_final import PacketRecord, _port_number
+from rules import DEFAULT_RULES, RuleSet, load_rules
+
+PACKET = PacketRecord('12:00:00.000000', 'IP', '10.0.0.5', '51000', '192.168.1.10', 'telnet', 'telnet', 'S', 60)
+
+
+def names(hits):
+    return [rule.name for rule in hits]
+
+
+def test_module_docstring():
+    assert rules.__doc__.startswith('Moteur de règles')
+
+
+def test_equality_and_ports():
+    ruleset = RuleSet([{'name': 'Telnet', 'dst_port': [23, 'telnet'], 'alert': True, 'level': 'ÉLEVÉ'},
+                       {'name': 'SYN', 'flags': ['S', 'S.']},
+                       {'name': 'Éphémère', 'src_port': '1024-65535'},
+                       {'name': 'HTTP', 'protocol': 'http'}], port_number=_port_number)
+    hits = ruleset.match(PACKET)
+    assert names(hits) == ['Telnet', 'SYN', 'Éphémère']
+    assert hits[0].alert and hits[0].level == 'ÉLEVÉ'
+    assert not hits[1].alert and hits[1].level == 'MOYEN'
+    assert names(ruleset.match(PACKET._replace(dst_port='23', src_port='80', flags='P.'))) == ['Telnet']
+    assert ruleset.match(PACKET._replace(dst_port='http', src_port='80', flags='.', protocol='www')) == ()
+
+
+def test_criteria_combine_with_and():
+    ruleset = RuleSet([{'name': 'SYN telnet', 'flags': 'S', 'dst_port': 23}], port_number=_port_number)
+    assert names(ruleset.match(PACKET)) == ['SYN telnet']
+    assert ruleset.match(PACKET._replace(flags='.')) == ()
+    assert ruleset.match(PACKET._replace(dst_port='22')) == ()
+
+
+def test_length_and_networks():
+    ruleset = RuleSet([{'name': 'Petit', 'length': '0-64'},
+                       {'name': 'Grand', 'length': [1000, 1500]},
+                       {'name': 'Interne', 'src': '10.0.0.0/8', 'dst': ['192.168.0.0/16', '172.16.0.0/12']}])
+    assert names(ruleset.match(PACKET)) == ['Petit', 'Interne']
+    assert names(ruleset.match(PACKET._replace(length=1200, dst_host='8.8.8.8'))) == ['Grand']
+    # Hôte sans adresse (nom) ou paquet sans longueur : les règles sur ce champ ne s'appliquent pas
+    assert ruleset.match(PACKET._replace(length=None, src_host='gateway.local')) == ()
+
+
+def test_fields_lists_consulted_attributes():
+    assert RuleSet(DEFAULT_RULES).fields == ('flags',)
+    ruleset = RuleSet([{'kind': 'ARP'}, {'dst_port': 23, 'src': '10.0.0.0/8'}])
+    assert set(ruleset.fields) == {'kind', 'dst_port', 'src_host'}
+    assert RuleSet([]).fields == ()
+
+
+def test_default_names_and_unknown_key():
+    assert RuleSet([{'kind': 'ARP'}]).rules[0].name == 'Règle 1'
+    with pytest.raises(ValueError, match='port'):
+        RuleSet([{'name': 'Faute', 'port': 23}])
+
+
+def test_many_rules():
+    ruleset = RuleSet([{'name': str(port), 'dst_port': port} for port in range(1, 500)], port_number=_port_number)
+    assert names(ruleset.match(PACKET)) == ['23']
+    assert ruleset.match(PACKET._replace(dst_port='8080')) == ()
+
+
+@pytest.mark.parametrize('content', [[{'name': 'A', 'kind': 'ARP'}], {'rules': [{'name': 'A', 'kind': 'ARP'}]}])
+def test_load_rules(tmp_path, content):
+    path = tmp_path / 'regles.json'
+    path.write_text(json.dumps(content), encoding='utf-8')
+    assert load_rules(str(path)) == [{'name': 'A', 'kind': 'ARP'}]
+
+
+def test_shipped_rules_compile():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'regles.json')
+    assert RuleSet(load_rules(path), port_number=_port_number).rules
@@ -0,0 +1,64 @@
+import random
+from collections import Counter
+
+import sketches
+from projet_final import analyze_tcpdump
+from sketches import HyperLogLog, SpaceSaving
+
+
+def test_module_docstring():
+    assert sketches.__doc__.startswith('Structures probabilistes')
+
+
+def test_hyperloglog_estimate():
+    for count in (10, 1000, 100000):
+        sketch = HyperLogLog(12)
+        for value in range(count):
+            sketch.add(f'10.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}')
+        assert abs(sketch.estimate() - count) <= 3 * sketch.relative_error * count + 1
+
+
+def test_hyperloglog_merge_is_union():
+    left, right, both = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    for value in range(5000):
+        (left if value % 2 else right).add(value)
+        both.add(value)
+    left.add(1)
+    assert left.merge(right).registers == both.registers
+
+
+def test_space_saving_keeps_heavy_hitters():
+    rng = random.Random(0)
+    stream = ['heavy-a'] * 3000 + ['heavy-b'] * 2000 + [f'noise-{rng.randrange(5000)}' for _ in range(20000)]
+    rng.shuffle(stream)
+    exact = Counter(stream)
+    summary = SpaceSaving(100)
+    for key in stream:
+        summary.add(key)
+    assert len(summary) == 100 and summary.total == len(stream)
+    top = summary.top(2)
+    assert [key for key, _, _ in top] == ['heavy-a', 'heavy-b']
+    for key, count, error in summary.top(100):
+        # Surestimation bornée par l'erreur du compteur, elle-même bornée par total / capacité
+        assert exact[key] <= count <= exact[key] + error
+        assert error <= summary.max_error
+
+
+def test_space_saving_merge():
+    left, right = SpaceSaving(10), SpaceSaving(10)
+    for index in range(1000):
+        left.add('a' if index % 3 else f'x{index}')
+        right.add('b' if index % 2 else f'y{index}')
+    merged = left.merge(right)
+    assert merged.total == 2000 and len(merged) == 10
+    assert {key for key, _, _ in merged.top(2)} == {'a', 'b'}
+
+
+def test_sketch_mode_estimates(capture):
+    exact = analyze_tcpdump(capture)
+    estimated = analyze_tcpdump(capture, options={'sketch': True, 'sketch_capacity': 50})
+    assert estimated['network_stats']['packets_analyzed'] == exact['network_stats']['packets_analyzed']
+    assert estimated['protocol_distribution'] == exact['protocol_distribution']
+    services = exact['network_stats']['services']['count']
+    assert abs(estimated['network_stats']['services']['count'] - services) <= 0.1 * services + 1
+    assert any(estimate['label'].startswith('Top talker') for estimate in estimated['estimates'])
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from projet_final import SpikeDetector, analyze_tcpdump
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('mode', ['streaming', 'table'])
+def test_named_source_reaches_the_detector(mode):
+    # ~80 SYN en 1 ms d'une source que tcpdump affiche par son nom
+    stats = analyze_tcpdump(os.path.join(ROOT, 'fichier1000.txt'), mode)
+    spikes = [anomaly for anomaly in stats['detected_anomalies'] if anomaly['type'] == 'Pic de Trafic']
+    assert [(anomaly['ip_source'], anomaly['window']) for anomaly in spikes] == [
+        ('190-0-175-100.gba.solunet.com.ar', 1)]
+
+
+START = 12 * 3600 * 1000000   # 12:00:00
+
+
+def _run(bursts, seconds=120, background=5, **kwargs):
+    """Trafic de fond (`background` sources à 1 paquet/s) plus des rafales {seconde: (source, paquets, écart en µs)}"""
+    events = [(START + second * 1000000 + k * 1000, f'10.0.0.{k + 1}')
+              for second in range(seconds) for k in range(background)]
+    for second, (source, packets, spread) in bursts.items():
+        events += [(START + second * 1000000 + 500000 + i * spread, source) for i in range(packets)]
+    detector = SpikeDetector(**kwargs)
+    spikes = []
+    for timestamp_us, source in sorted(events):
+        spikes += detector.observe(source, timestamp_us) or []
+    return spikes
+
+
+def test_burst_during_warm_up_is_reported_once():
+    spikes = _run({0: ('x', 30, 1000)})
+    assert len(spikes) == 1
+    assert spikes[0]['ip_source'] == 'x' and spikes[0]['window'] == 1
+    assert spikes[0]['details'].endswith('sur 1 s (depuis 12:00:00.000000)')
+
+
+def test_burst_after_warm_up_is_reported_once():
+    spikes = _run({70: ('x', 30, 1000)})
+    assert [(spike['window'], spike['timestamp'][:8]) for spike in spikes] == [(1, '12:01:10')]
+    assert 'depuis 12:01:10.000000' in spikes[0]['details']
+
+
+def test_separate_episodes():
+    spikes = _run({5: ('x', 30, 1000), 100: ('x', 30, 1000)}, seconds=200)
+    assert [spike['timestamp'][:8] for spike in spikes] == ['12:00:05', '12:01:40']
+
+
+def test_large_window_waits_for_its_duration():
+    # 3 paquets/s pendant 30 s : jamais assez sur 1 s, mais un pic sur 10 s,
+    # signalé une fois la fenêtre écoulée et daté du début de la capture au plus tôt
+    bursts = {second: ('x', 3, 100000) for second in range(30)}
+    spikes = _run(bursts, seconds=90)
+    assert [(spike['window'], spike['timestamp']) for spike in spikes] == [(10, '12:00:09.500000')]
+    # 28 paquets dans les 10 premières secondes, rapportés à la durée de la fenêtre
+    assert spikes[0]['details'] == 'Pic de trafic: 2.80 paquets/s sur 10 s (depuis 12:00:00.000000)'
+
+
+def test_steady_traffic_has_no_spike():
+    assert _run({}) == []
+    assert _run({10: ('x', 30, 1000)}, min_packets=50) == []
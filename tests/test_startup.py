@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules lourds chargés seulement par les étapes qui en ont besoin (mode table, graphiques,
+# export et requêtes, profil) : un rapport CSV en mode streaming ne doit en charger aucun
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'sqlite3', 'pyarrow', 'cProfile', 'pstats')
+REPORT = f'print("modules:", *(name for name in {HEAVY_MODULES!r} if name in sys.modules))'
+
+
+def _loaded(code, *args, cwd=ROOT):
+    result = subprocess.run([sys.executable, '-c', code, *args], capture_output=True, text=True, cwd=cwd,
+                            env={**os.environ, 'PYTHONPATH': ROOT})
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout.splitlines()[-1].split()[1:]
+
+
+def test_import_loads_no_heavy_module():
+    assert _loaded(f'import sys, projet_final; {REPORT}') == []
+
+
+def test_csv_only_run_loads_no_heavy_module(capture, tmp_path):
+    code = f'import sys, projet_final; code = projet_final.main(sys.argv[1:]); {REPORT}; sys.exit(code)'
+    assert _loaded(code, capture, '--no-html', '--no-browser', '--csv', str(tmp_path / 'rapport.csv'),
+                   cwd=str(tmp_path)) == []
+    assert (tmp_path / 'rapport.csv').exists()
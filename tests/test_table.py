@@ -0,0 +1,50 @@
+import pytest
+
+from projet_final import PacketRecord, PacketTable, analyze_tcpdump, build_packet_table, table_statistics
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+
+
+def _record(dst_port, flags='S', protocol=None):
+    return PacketRecord('10:00:00.000001', 'IP', '10.0.0.1', '40000', '10.0.0.2', dst_port,
+                        protocol or dst_port, flags, 0)
+
+
+def test_more_than_65536_services():
+    # Balayage de tous les ports, plus deux protocoles sans port : 65 537 codes de protocole
+    table = PacketTable()
+    for port in range(1, 65536):
+        table.append(_record(str(port)))
+    table.append(PacketRecord('10:00:00.000002', 'ARP', None, None, None, None, 'ARP', None, 28))
+    table.append(PacketRecord('10:00:00.000003', 'IP', '10.0.0.1', None, '10.0.0.2', None, 'ICMP', None, 64))
+
+    assert len(table.protocols) == 65537
+    assert table.protocols[table.protocol[-1]] == 'ICMP'
+    stats = table_statistics(table)
+    assert stats['packets'] == 65537
+    assert stats['service_count'] == 65535
+    assert stats['protocol_counts']['ICMP'] == 1
+
+
+def test_more_than_256_flag_combinations():
+    table = PacketTable()
+    for index in range(300):
+        table.append(_record('80', flags=f'S{index}'))
+    assert [table.flag_names[code] for code in table.flags[-2:]] == ['S298', 'S299']
+
+
+def test_codes_stay_compact():
+    table = PacketTable()
+    table.append(_record('80'))
+    assert table.protocol.typecode == 'H'
+    assert table.flags.typecode == 'B'
+
+
+def test_memory_usage_in_metrics(capture):
+    table = build_packet_table(capture)
+    stats = analyze_tcpdump(capture, 'table', options={'metrics': True})
+    assert stats['metrics'].counters['table_bytes'] == table.memory_usage()
+    # Environ 28 octets par paquet (colonnes de codes compactes)
+    assert 20 * len(table) <= table.memory_usage() <= 40 * len(table)
+    assert 'tcpdump_analyzer_table_bytes' in stats['metrics'].prometheus_text()
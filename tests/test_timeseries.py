@@ -0,0 +1,58 @@
+import timeseries
+from timeseries import Series, TimeSeries
+
+SECOND = 1000000
+
+
+def test_module_docstring():
+    assert timeseries.__doc__.startswith('Séries temporelles')
+
+
+def test_series_cover_and_merge():
+    series = Series(10)
+    series.add(12, 1, 100)
+    series.add(8, 2, 50)      # antérieur au début : la série est étendue vers la gauche
+    assert series.start == 8
+    assert list(series.packets) == [2, 0, 0, 0, 1]
+    other = Series(0)
+    other.add(0, 1, 10)
+    series.merge(other, shift=12)
+    assert list(series.bytes) == [50, 0, 0, 0, 110]
+    assert series.aligned(7, 4) == [0, 50, 0, 0]
+
+
+def test_totals_and_top_keys():
+    series = TimeSeries(bucket=1, tracked=3)
+    for second in range(5):
+        for _ in range(10):
+            series.add(second * SECOND, 'http', '10.0.0.1', 100)
+        series.add(second * SECOND + 1, 'domain', '10.0.0.2', 60)
+    summary = series.summary(top=1)
+    assert summary['start_us'] == 0 and summary['bucket'] == 1
+    assert summary['packets'] == [11] * 5
+    assert summary['bytes'] == [1060] * 5
+    assert summary['protocols'] == {'http': [1000] * 5}
+    assert summary['sources'] == {'10.0.0.1': [1000] * 5}
+
+
+def test_minute_buckets():
+    series = TimeSeries(bucket=60)
+    series.add(59 * SECOND, 'ARP', None, 28)
+    series.add(61 * SECOND, 'ARP', None, 28)
+    series.add(130 * SECOND, 'ARP', None, 28)
+    assert series.summary()['packets'] == [1, 1, 1]
+
+
+def test_merge_with_offset():
+    first, second = TimeSeries(), TimeSeries()
+    first.add(86399 * SECOND, 'http', 'a', 10)
+    second.add(0, 'http', 'a', 20)   # plage suivante, après minuit, sur sa propre horloge
+    first.merge(second, offset_us=86400 * SECOND)
+    summary = first.summary()
+    assert summary['start_us'] == 86399 * SECOND
+    assert summary['bytes'] == [10, 20]
+    assert summary['protocols'] == {'http': [10, 20]}
+
+
+def test_empty():
+    assert TimeSeries().summary() is None
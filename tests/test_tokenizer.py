@@ -0,0 +1,35 @@
+import pytest
+
+from projet_final import PacketRecord, tokenize_line
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('18:01:29.125510 ARP, Request who-has 161.3.128.106 tell 161.3.128.184, length 46',
+     PacketRecord('18:01:29.125510', 'ARP', None, None, None, None, 'ARP', None, 46)),
+    ('18:01:29.774509 STP 802.1w, Rapid STP, Flags [Learn, Forward], bridge-id 8080.4c:71:0c:ad:79:80.800e, length 42',
+     PacketRecord('18:01:29.774509', 'STP', None, None, None, None, 'STP', None, 42)),
+    ('18:01:29.487415 IP 161.3.129.167.65203 > broadcasthost.gvcp: UDP, length 8',
+     PacketRecord('18:01:29.487415', 'IP', '161.3.129.167', '65203', 'broadcasthost', 'gvcp', 'gvcp', None, 8)),
+    ('18:01:30.045829 IP laspi-p15.univ-st-etienne.fr.61315 > dcroa1.ujmse.local.domain: '
+     '6911+ PTR? 61.129.3.161.in-addr.arpa. (43)',
+     PacketRecord('18:01:30.045829', 'IP', 'laspi-p15.univ-st-etienne.fr', '61315', 'dcroa1.ujmse.local',
+                  'domain', 'domain', None, 43)),
+    ('11:42:04.766656 IP BP-Linux8.ssh > 192.168.190.130.50019: Flags [P.], seq 2243505564:2243505672, '
+     'ack 1972915080, win 312, options [nop,nop,TS val 102917262 ecr 377952805], length 108',
+     PacketRecord('11:42:04.766656', 'IP', 'BP-Linux8', 'ssh', '192.168.190.130', '50019', '50019', 'P.', 108)),
+    ('18:01:30.114599 IP met2-372.priv172.univ-st-etienne.fr.hsrp > 224.0.0.102.hsrp: HSRPv1',
+     PacketRecord('18:01:30.114599', 'IP', 'met2-372.priv172.univ-st-etienne.fr', 'hsrp', '224.0.0.102', 'hsrp',
+                  'hsrp', None, 0)),
+    ('10:00:00.000001 IP 10.0.0.1 > 10.0.0.2: ICMP echo request, id 1, seq 1, length 64',
+     PacketRecord('10:00:00.000001', 'IP', '10.0.0.1', None, '10.0.0.2', None, 'ICMP', None, 64)),
+    ('10:00:00.000001 IP6 fe80::1.546 > ff02::1:2.547: dhcp6 solicit',
+     PacketRecord('10:00:00.000001', 'IP6', 'fe80::1', '546', 'ff02::1:2', '547', '547', None, 0)),
+])
+def test_header_lines(line, expected):
+    assert tokenize_line(line) == expected
+
+
+@pytest.mark.parametrize('line', ['', '\t0x0000:  0001 0800 0604 0001 a4bb 6dc8 4f00 a103',
+                                  'tcpdump: listening on eth0', '18:01:29 ARP'])
+def test_not_a_header(line):
+    assert tokenize_line(line) is None
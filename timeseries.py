@@ -0,0 +1,173 @@
+"""Séries temporelles du trafic : paquets et octets par intervalle de temps (seconde, minute...),
+au total, par protocole et pour les principales sources. Chaque série est une paire de
+tableaux compacts (module array) indexés par intervalle, remplis en un seul passage."""
+
+from array import array
+from sketches import SpaceSaving
+
+
+class Series:
+    """Paquets et octets par intervalle, à partir de l'intervalle `start`"""
+
+    __slots__ = ('start', 'packets', 'bytes')
+
+    def __init__(self, start):
+        self.start = start
+        self.packets = array('q')
+        self.bytes = array('q')
+
+    def _cover(self, index):
+        """Étend les tableaux jusqu'à l'intervalle `index` et renvoie sa position"""
+        position = index - self.start
+        if position < 0:
+            # Intervalle antérieur au début de la série (paquets désordonnés, fusion de plages)
+            self.packets[0:0] = array('q', bytes(8 * -position))
+            self.bytes[0:0] = array('q', bytes(8 * -position))
+            self.start, position = index, 0
+        elif position >= len(self.packets):
+            missing = 8 * (position + 1 - len(self.packets))
+            self.packets.frombytes(bytes(missing))
+            self.bytes.frombytes(bytes(missing))
+        return position
+
+    def add(self, index, packets, octets):
+        position = index - self.start
+        if not 0 <= position < len(self.packets):
+            position = self._cover(index)
+        self.packets[position] += packets
+        self.bytes[position] += octets
+
+    def merge(self, other, shift=0):
+        """Ajoute la série `other`, décalée de `shift` intervalles"""
+        if not other.packets:
+            return self
+        self._cover(other.start + shift)
+        self._cover(other.start + shift + len(other.packets) - 1)
+        first = other.start + shift - self.start
+        for position, (packets, octets) in enumerate(zip(other.packets, other.bytes), first):
+            self.packets[position] += packets
+            self.bytes[position] += octets
+        return self
+
+    def aligned(self, start, size, column='bytes'):
+        """Valeurs de la colonne sur les intervalles [start, start + size), 0 hors de la série"""
+        values = [0] * size
+        column = getattr(self, column)
+        offset = self.start - start
+        for position in range(max(0, -offset), min(len(column), size - offset)):
+            values[position + offset] = column[position]
+        return values
+
+
+class TimeSeries:
+    """
+    Débit par intervalle de `bucket` secondes : au total, par protocole et par source.
+    Seuls les `tracked` protocoles et sources les plus actifs ont leur propre série
+    (Space-Saving) : une clé évincée perd sa série, une clé qui entre n'est comptée
+    qu'à partir de son arrivée. La mémoire dépend de la durée de la capture et de
+    `tracked`, pas du nombre de paquets.
+    """
+
+    def __init__(self, bucket=1, tracked=20):
+        self.bucket = bucket
+        self.bucket_us = int(bucket * 1000000)
+        self.total = None
+        self.protocols = SpaceSaving(tracked)
+        self.sources = SpaceSaving(tracked)
+        self.protocol_series = {}
+        self.source_series = {}
+        # Intervalle en cours : compteurs par clé [paquets, octets], versés dans les séries
+        # quand l'intervalle change (le classement et les tableaux ne sont pas touchés à chaque paquet)
+        self._index = None
+        self._protocols = {}
+        self._sources = {}
+
+    def add(self, timestamp_us, protocol, source, length):
+        index = timestamp_us // self.bucket_us
+        if index != self._index:
+            self._flush()
+            self._index = index
+        counts = self._protocols.get(protocol)
+        if counts is None:
+            counts = self._protocols[protocol] = [0, 0]
+        counts[0] += 1
+        counts[1] += length
+        if source is not None:
+            counts = self._sources.get(source)
+            if counts is None:
+                counts = self._sources[source] = [0, 0]
+            counts[0] += 1
+            counts[1] += length
+
+    def _flush(self):
+        """Verse les compteurs de l'intervalle en cours dans les séries"""
+        index = self._index
+        if index is None:
+            return
+        if self.total is None:
+            self.total = Series(index)
+        # Chaque paquet a un protocole : le total est la somme des compteurs par protocole
+        self.total.add(index, sum(packets for packets, _ in self._protocols.values()),
+                       sum(octets for _, octets in self._protocols.values()))
+        for ranking, series, pending in ((self.protocols, self.protocol_series, self._protocols),
+                                         (self.sources, self.source_series, self._sources)):
+            for key, (packets, octets) in pending.items():
+                evicted = ranking.add(key, packets)
+                if evicted is not None:
+                    del series[evicted]
+                entry = series.get(key)
+                if entry is None:
+                    entry = series[key] = Series(index)
+                entry.add(index, packets, octets)
+            pending.clear()
+        self._index = None
+
+    def merge(self, other, offset_us=0):
+        """Fusionne les séries d'une autre plage, dont l'horloge est décalée de `offset_us`"""
+        self._flush()
+        other._flush()
+        if other.total is None:
+            return self
+        shift = offset_us // self.bucket_us
+        if self.total is None:
+            self.total = Series(other.total.start + shift)
+        self.total.merge(other.total, shift)
+        for ranking, series, other_ranking, other_series in (
+                (self.protocols, self.protocol_series, other.protocols, other.protocol_series),
+                (self.sources, self.source_series, other.sources, other.source_series)):
+            ranking.merge(other_ranking)
+            for key in list(series):
+                if key not in ranking.counts:
+                    del series[key]
+            for key, entry in other_series.items():
+                if key in ranking.counts:
+                    if key in series:
+                        series[key].merge(entry, shift)
+                    else:
+                        series[key] = Series(entry.start + shift).merge(entry, shift)
+        return self
+
+    def summary(self, top=5):
+        """
+        Séries alignées sur la durée de la capture, pour les rapports :
+        {'bucket': secondes par intervalle, 'start_us': début du premier intervalle,
+         'packets': [...], 'bytes': [...], 'protocols': {protocole: [octets...]},
+         'sources': {source: [octets...]}} avec les `top` protocoles et sources les plus actifs.
+        """
+        self._flush()
+        if self.total is None:
+            return None
+        start, size = self.total.start, len(self.total.packets)
+        return {
+            'bucket': self.bucket,
+            'start_us': start * self.bucket_us,
+            'packets': self.total.packets.tolist(),
+            'bytes': self.total.bytes.tolist(),
+            'protocols': self._top(self.protocols, self.protocol_series, top, start, size),
+            'sources': self._top(self.sources, self.source_series, top, start, size),
+        }
+
+    @staticmethod
+    def _top(ranking, series, top, start, size):
+        keys = sorted(series, key=ranking.counts.get, reverse=True)[:top]
+        return {key: series[key].aligned(start, size) for key in keys}
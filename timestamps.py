@@ -0,0 +1,32 @@
+"""Horodatages de tcpdump ("HH:MM:SS.ffffff", heure de la journée) et microsecondes depuis
+minuit : conversions partagées par l'analyseur, l'export, les requêtes et le générateur de
+captures. Le passage de minuit est géré par TimestampClock (projet_final.py)."""
+
+MICROSECONDS_PER_DAY = 86400 * 1000000
+
+
+def timestamp_to_us(timestamp):
+    """Convertit "HH:MM:SS.ffffff" en microsecondes depuis minuit"""
+    return ((int(timestamp[0:2]) * 60 + int(timestamp[3:5])) * 60 + int(timestamp[6:8])) * 1000000 + int(timestamp[9:15])
+
+
+def format_us(us):
+    """Convertit des microsecondes en "HH:MM:SS.ffffff" (modulo 24 h, comme tcpdump)"""
+    seconds, micro = divmod(us % MICROSECONDS_PER_DAY, 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    return f'{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}.{micro:06d}'
+
+
+def parse_clock(text):
+    """"HH:MM", "HH:MM:SS" ou "HH:MM:SS.ffffff" -> microsecondes depuis minuit"""
+    fields = text.split(':')
+    if not 2 <= len(fields) <= 3:
+        raise ValueError(f"heure invalide: {text}")
+    hours, minutes, *rest = fields
+    seconds, _, fraction = (rest[0] if rest else '0').partition('.')
+    if not (hours.isdigit() and minutes.isdigit() and seconds.isdigit() and (fraction.isdigit() or not fraction)):
+        raise ValueError(f"heure invalide: {text}")
+    if int(minutes) > 59 or int(seconds) > 59:
+        raise ValueError(f"heure invalide: {text}")
+    micro = int(fraction.ljust(6, '0')[:6]) if fraction else 0
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000000 + micro